@@ -0,0 +1,239 @@
+# benchmarks/alt_bench.py
+#
+# ALT landmarks (routing.landmarks) on each fake town:
+#   • preprocessing time and memory per landmark, "avoid" vs "farthest"
+#   • point queries, node‑ and edge‑based: settled nodes and latency of plain
+#     Dijkstra vs landmark A* – route costs must be identical
+#   • generate_k_shortest_routes: the previous Yen's (graph deepcopy per spur,
+#     reproduced below) vs the current one without and with landmarks
+#   • snapshot round trip keeps the tables
+#   • edge‑based k‑shortest after restricting the first junction turn of
+#     some routes: no returned route may take a restricted (a, b, c) triple,
+#     and routes come out in non‑decreasing cost (transition penalties included)
+#
+#   python -m benchmarks.alt_bench                      # defaults: a couple of minutes
+#   python -m benchmarks.alt_bench --queries 200 --k-queries 10 --legacy-queries 2
+#   python -m benchmarks.alt_bench --towns grid --landmarks 4 8 16 32
+
+import argparse
+import heapq
+import os
+import random
+import tempfile
+import time
+from copy import deepcopy
+
+from core.logger import configure, get_metrics
+from routing.graph_builder import JUNCTION_TURN, CarlaGraph
+from routing.landmarks import SELECTIONS, compute_landmarks
+from routing.route_gen import RouteGenerator
+from routing.snapshot import load_snapshot, save_snapshot
+from utils.fake_map import TOWNS
+
+
+def legacy_k_shortest(gen, start_id, end_id, k):
+    """Yen's as it was: spurs off the base route only, deepcopy of the graph per spur."""
+    base = gen.dijkstra(start_id, end_id, draw=False)
+    if not base:
+        return []
+    routes, candidates = [base], []
+    for _ in range(1, k):
+        for j in range(len(base) - 1):
+            root = base[:j + 1]
+            graph = deepcopy(gen.graph.graph)
+            for r in routes:
+                if r[:j + 1] == root and len(r) > j + 1:
+                    graph[r[j]] = [(n, d) for n, d in graph[r[j]] if n != r[j + 1]]
+            seen, heap, alt = set(), [(0.0, root[-1], [])], None
+            while heap:
+                cost, cur, path = heapq.heappop(heap)
+                if cur in seen:
+                    continue
+                seen.add(cur)
+                path = path + [cur]
+                if cur == end_id:
+                    alt = path
+                    break
+                for n, d in graph.get(cur, []):
+                    if n not in seen:
+                        heapq.heappush(heap, (cost + d, n, path))
+            if alt:
+                full = root[:-1] + alt
+                if all(full != c[1] for c in candidates) and full not in routes:
+                    candidates.append((gen.compute_route_distance(full), full))
+        if not candidates:
+            break
+        candidates.sort(key=lambda c: c[0])
+        routes.append(candidates.pop(0)[1])
+    return routes
+
+
+def settled(name):
+    return get_metrics().counters.get((name, ()), 0)
+
+
+def point_queries(graph, pairs, edge_based):
+    gen = RouteGenerator(graph, edge_based=edge_based)
+    get_metrics().reset()
+    lat, costs = [], []
+    for a, b in pairs:
+        t0 = time.perf_counter()
+        r  = gen.dijkstra(a, b, draw=False)
+        lat.append(time.perf_counter() - t0)
+        costs.append(round(gen.compute_route_distance(r), 6))
+    lat.sort()
+    return settled("search_settled_nodes"), lat[len(lat) // 2] * 1e3, sum(lat), costs
+
+
+def k_shortest(graph, pairs, k, legacy=False, edge_based=False):
+    gen  = RouteGenerator(graph, edge_based=edge_based)
+    loc  = lambda nid: graph.get_waypoint(nid).location
+    get_metrics().reset()
+    out  = []
+    t0   = time.perf_counter()
+    for a, b in pairs:
+        out.append(legacy_k_shortest(gen, a, b, k) if legacy
+                   else gen.generate_k_shortest_routes(loc(a), loc(b), k=k))
+    return time.perf_counter() - t0, settled("spur_settled_nodes"), out
+
+
+def restrict_first_turns(graph, pairs):
+    """
+    Forbid the first junction turn of each pair's edge‑based route, unless
+    that leaves the pair without a route (one‑way towns); triples added.
+    """
+    gen, added = RouteGenerator(graph, edge_based=True), 0
+    for a, b in pairs:
+        route = gen.dijkstra(a, b, draw=False)
+        turns = [(u, v) for u, v in zip(route[:-1], route[1:])
+                 if graph.edge_type(u, v) == JUNCTION_TURN and u[2] != v[2]]
+        if not turns:
+            continue
+        u, v = turns[0]
+        out  = next((n[2] for n in route[route.index(v):] if not graph.get_waypoint(n).is_junction),
+                    None)
+        if out is None:
+            continue
+        before = set(graph.turn_restrictions)
+        n = graph.restrict_turn(u[2], out)
+        if gen.dijkstra(a, b, draw=False):
+            added += n
+        else:
+            graph.turn_restrictions = before
+            graph.weights_version += 1
+    return added
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--towns",     nargs="+", default=sorted(TOWNS), choices=sorted(TOWNS))
+    ap.add_argument("--landmarks", type=int, nargs="+", default=[16])
+    ap.add_argument("--queries",   type=int, default=100)
+    ap.add_argument("--k",         type=int, default=3)
+    ap.add_argument("--k-queries", type=int, default=4)
+    ap.add_argument("--legacy-queries", type=int, default=0,
+                    help="pairs for the deepcopy Yen's (seconds per pair, off by default)")
+    ap.add_argument("--seed",      type=int, default=0)
+    args = ap.parse_args()
+    configure(level="ERROR")
+    failed = []
+
+    for town in args.towns:
+        graph = CarlaGraph(TOWNS[town]())
+        graph.build_graph()
+        rng   = random.Random(args.seed)
+        nodes = sorted(graph.node_lookup)
+        gen   = RouteGenerator(graph, edge_based=False)
+        pairs, dead = [], 0                       # reachable pairs (one‑way towns have dead ones)
+        while len(pairs) < args.queries:
+            a, b = rng.sample(nodes, 2)
+            if gen.dijkstra(a, b, draw=False):
+                pairs.append((a, b))
+            else:
+                dead += 1
+        print(f"\n🗺️  {town}: {len(nodes):,} nodes, {sum(map(len, graph.graph.values())):,} edges, "
+              f"{dead} unreachable pairs skipped")
+
+        base = {eb: point_queries(graph, pairs, eb) for eb in (False, True)}
+        print(f"{'landmarks':>9} {'select':>8} {'prep s':>7} {'KB/lmk':>7} {'search':>6} "
+              f"{'settled':>9} {'÷':>5} {'p50 ms':>7} {'speed‑up':>8} {'same':>5}")
+        for eb in (False, True):
+            s, p50, _, _ = base[eb]
+            print(f"{'–':>9} {'–':>8} {'–':>7} {'–':>7} {'edge' if eb else 'node':>6} "
+                  f"{s:>9,} {1.0:>5.1f} {p50:>7.3f} {1.0:>7.1f}× {'':>5}")
+        best = None
+        for count in args.landmarks:
+            for selection in SELECTIONS:
+                t0 = time.perf_counter()
+                graph.landmarks = compute_landmarks(graph, count, selection, seed=args.seed)
+                prep = time.perf_counter() - t0
+                per  = graph.landmarks.nbytes / max(1, len(graph.landmarks)) / 1024
+                for eb in (False, True):
+                    s, p50, total, costs = point_queries(graph, pairs, eb)
+                    s0, p0, total0, costs0 = base[eb]
+                    print(f"{count:>9} {selection:>8} {prep:>7.2f} {per:>7.1f} "
+                          f"{'edge' if eb else 'node':>6} {s:>9,} {s0 / s:>5.1f} {p50:>7.3f} "
+                          f"{total0 / total:>7.1f}× {'✓' if costs == costs0 else '✗':>5}")
+                if best is None or s < best[0]:
+                    best = (s, graph.landmarks)
+
+        kp, lp = pairs[:args.k_queries], pairs[:args.legacy_queries]
+        graph.landmarks = None
+        t_new, s_new, new = k_shortest(graph, kp, args.k)
+        graph.landmarks = best[1]
+        t_alt, s_alt, alt = k_shortest(graph, kp, args.k)
+        cost  = lambda routes: [[round(gen.compute_route_distance(r), 6) for r in rs] for rs in routes]
+        t_new, t_alt = t_new / len(kp), t_alt / len(kp)
+        print(f"k‑shortest (k={args.k}) per pair: {t_new * 1e3:.1f} ms → with {len(best[1])} "
+              f"{best[1].selection} landmarks {t_alt * 1e3:.1f} ms ({t_new / t_alt:.1f}×); "
+              f"spur settled {s_new:,} → {s_alt:,}; same routes {'✓' if cost(new) == cost(alt) else '✗'}")
+        if lp:
+            graph.landmarks = None
+            t_old, _, old = k_shortest(graph, lp, args.k, legacy=True)
+            graph.landmarks = best[1]
+            loops = sum(len(set(r)) != len(r) for rs in old for r in rs)
+            t_old = t_old / len(lp)
+            print(f"   deepcopy Yen's {t_old * 1e3:.0f} ms per pair ({loops} looping routes in "
+                  f"{len(lp)} pairs): current {t_old / t_new:.0f}×, with landmarks {t_old / t_alt:.0f}× faster")
+
+        path = os.path.join(tempfile.mkdtemp(), f"{town}.pkl")
+        graph.landmarks = None
+        save_snapshot(graph, path)
+        plain = os.path.getsize(path)
+        graph.landmarks = best[1]
+        save_snapshot(graph, path)
+        loaded = load_snapshot(path)
+        ok = loaded.landmarks is not None and loaded.landmarks.valid_for(loaded) and \
+            (loaded.landmarks.to_lm == best[1].to_lm).all()
+        print(f"snapshot: {plain / 2**20:.2f} MB → {os.path.getsize(path) / 2**20:.2f} MB with "
+              f"landmarks, round trip {'✓' if ok else '✗'}")
+        os.remove(path)
+
+        # restrictions only add cost: the landmark bounds must stay in use
+        added = restrict_first_turns(graph, kp)
+        alt_on = graph.landmarks.valid_for(graph)
+        egen  = RouteGenerator(graph, edge_based=True)
+        t_lm, _, routes = k_shortest(graph, kp, args.k, edge_based=True)
+        graph.landmarks = None
+        t_plain, _, plain_routes = k_shortest(graph, kp, args.k, edge_based=True)
+        graph.landmarks = best[1]
+        ecost = lambda rss: [[round(egen.compute_route_cost(r), 6) for r in rs] for rs in rss]
+        same  = ecost(routes) == ecost(plain_routes)
+        taking   = sum(any(t in graph.turn_restrictions for t in zip(r, r[1:], r[2:]))
+                       for rs in routes for r in rs)
+        unsorted = sum(cs != sorted(cs) for cs in ecost(routes))     # rounded: ties differ by 1e‑13
+        total    = sum(map(len, routes))
+        ok = not taking and not unsorted and alt_on and same
+        print(f"edge‑based k‑shortest with {added} restricted triples: {total} routes, "
+              f"{taking} take a restricted turn, {unsorted} pairs out of cost order; landmarks "
+              f"{'still used' if alt_on else 'DISABLED'} ({t_plain / max(t_lm, 1e-9):.1f}× faster, "
+              f"same routes {'✓' if same else '✗'}) {'✅' if ok else '❌'}")
+        if not ok:
+            failed.append(town)
+
+    if failed:
+        raise SystemExit(f"❌ k‑shortest check failed with turn restrictions: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/debug_draw_bench.py
+#
+# Debug‑draw traffic for graph.visualize() + a search with draw=True:
+# direct per‑node RPCs (old behaviour) vs the queued / culled renderer.
+#   python -m benchmarks.debug_draw_bench --size 8 --latency 0.0002
+
+import argparse
+import time
+
+import config
+from carla_interface.debug_renderer import DebugRenderer, _renderers
+from core.logger import configure
+from routing.graph_builder import CarlaGraph
+from routing.route_gen import RouteGenerator
+from utils.fake_map import grid_town
+
+
+class _SlowDebug:
+    """world.debug with a per‑call RPC delay."""
+    def __init__(self, latency):
+        self.latency, self.calls = latency, 0
+
+    def _rpc(self, *args, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    draw_string = draw_line = draw_point = _rpc
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size",    type=int,   default=6)
+    ap.add_argument("--latency", type=float, default=0.0002, help="seconds per draw RPC")
+    ap.add_argument("--radius",  type=float, default=150.0)
+    args = ap.parse_args()
+    configure(level="WARNING")
+
+    world = grid_town(args.size, args.size)
+    graph = CarlaGraph(world)
+    graph.build_graph()
+    nodes = sorted(graph.node_lookup)
+    a, b  = nodes[0], nodes[-1]
+
+    # old behaviour: one blocking RPC per primitive
+    world.debug = _SlowDebug(args.latency)
+    t0 = time.perf_counter()
+    for wp in graph.node_lookup.values():
+        world.debug.draw_string(wp.location, 'O')
+    direct_calls, direct_s = world.debug.calls, time.perf_counter() - t0
+    print(f"direct draw     : {direct_calls:6,} RPCs  {direct_s:6.2f} s blocking")
+
+    # renderer: enqueue only, background thread drains with culling
+    world.debug = _SlowDebug(args.latency)
+    renderer = _renderers[id(world)] = DebugRenderer(world, radius=args.radius)
+    t0 = time.perf_counter()
+    graph.visualize()
+    RouteGenerator(graph, world).dijkstra(a, b, draw=True)
+    enqueue_s = time.perf_counter() - t0
+    renderer.close()
+    print(f"renderer        : {world.debug.calls:6,} RPCs  {enqueue_s * 1000:6.1f} ms on caller  "
+          f"{renderer.stats()}")
+
+    # global switch off: nothing is built or queued
+    config.DEBUG_DRAW = False
+    _renderers.clear()
+    t0 = time.perf_counter()
+    graph.visualize()
+    RouteGenerator(graph, world).dijkstra(a, b, draw=True)
+    print(f"DEBUG_DRAW=False: {(time.perf_counter() - t0) * 1000:6.1f} ms (search only)")
+
+
+if __name__ == "__main__":
+    main()
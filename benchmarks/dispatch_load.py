@@ -0,0 +1,237 @@
+# benchmarks/dispatch_load.py
+#
+# Open‑loop load generator for the dispatch API (core.dispatch_server).
+#   • ride requests come from RequestManager over the fake town's spawn
+#     points, arriving as a Poisson process at a fixed rate per step
+#   • every 200 is followed by POST /release so the fleet stays dispatchable
+#   • the rate is ramped step by step; each step reports p50 / p99 latency and
+#     the status mix (200 / 404 / 503 shed / 504 deadline)
+#   • by default the server's route cache is filled first (one dispatch per
+#     spawn point) so steps measure steady state; --no-cache measures cold
+#     routing on every request
+#   • max sustainable rate = highest step with p99 ≤ --slo-ms and less than
+#     1 % of requests shed or expired
+# The server runs in a child process (own interpreter, own GIL) unless --url
+# points at one that is already up.
+#
+#   python -m benchmarks.dispatch_load --rates 5 10 20 40 80 --step 10
+#   python -m benchmarks.dispatch_load --no-cache --rates 2 4 6 8
+#   python -m benchmarks.dispatch_load --url http://127.0.0.1:8765 --rates 50
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from core.request_manager import RequestManager
+from utils.fake_map import TOWNS
+
+
+class Client:
+    """Small keep‑alive HTTP/1.1 client with a bounded connection pool."""
+
+    def __init__(self, host, port, max_conns=256):
+        self.host, self.port = host, port
+        self.max_conns = max_conns
+        self._idle     = []
+        self._open     = 0
+        self._free     = asyncio.Condition()
+
+    async def _acquire(self):
+        async with self._free:
+            while not self._idle and self._open >= self.max_conns:
+                await self._free.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+        try:
+            return await asyncio.open_connection(self.host, self.port)
+        except OSError:
+            async with self._free:
+                self._open -= 1
+                self._free.notify()
+            raise
+
+    async def _release(self, conn, reuse):
+        async with self._free:
+            if reuse:
+                self._idle.append(conn)
+            else:
+                conn[1].close()
+                self._open -= 1
+            self._free.notify()
+
+    async def request(self, method, path, payload=None):
+        conn = await self._acquire()
+        reader, writer = conn
+        body = json.dumps(payload).encode() if payload is not None else b""
+        try:
+            writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                         f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+                         .encode() + body)
+            await writer.drain()
+            status  = int((await reader.readline()).split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            data = await reader.readexactly(int(headers.get("content-length", 0)))
+        except (OSError, IndexError, ValueError, asyncio.IncompleteReadError):
+            await self._release(conn, reuse=False)
+            return 0, None
+        await self._release(conn, reuse=True)
+        return status, json.loads(data) if headers.get("content-type", "").startswith("application/json") else data
+
+    async def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+def _xyz(loc):
+    return [round(loc.x, 2), round(loc.y, 2), round(loc.z, 2)]
+
+
+async def run_step(client, requests, rate, duration, deadline_ms, rng):
+    """Poisson arrivals at `rate`/s for `duration` s; returns per‑step stats."""
+    latencies, statuses, tasks = [], {}, []
+
+    async def one():
+        pickup, dropoff = requests.generate_request()
+        t0 = time.perf_counter()
+        status, body = await client.request("POST", "/dispatch",
+                                            {"pickup": _xyz(pickup), "dropoff": _xyz(dropoff),
+                                             "deadline_ms": deadline_ms})
+        ms = (time.perf_counter() - t0) * 1000.0
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == 200:
+            latencies.append(ms)
+            await client.request("POST", "/release", {"taxi": body["taxi"]})
+
+    start = time.perf_counter()
+    next_at = start
+    while next_at - start < duration:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one()))
+        next_at += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    total = len(tasks)
+    lat   = sorted(latencies)
+    pct   = lambda q: lat[min(len(lat) - 1, int(math.ceil(q * len(lat))) - 1)] if lat else float("nan")
+    return {"rate": rate, "sent": total, "achieved_rps": round(statuses.get(200, 0) / elapsed, 1),
+            "p50_ms": round(statistics.median(lat), 1) if lat else float("nan"),
+            "p99_ms": round(pct(0.99), 1), "statuses": dict(sorted(statuses.items())),
+            "dropped": (statuses.get(503, 0) + statuses.get(504, 0) + statuses.get(0, 0)) / max(total, 1)}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(args):
+    port = _free_port()
+    cmd  = [sys.executable, "-m", "core.dispatch_server", "--port", str(port),
+            "--town", args.town, "--size", str(args.size), "--taxis", str(args.taxis),
+            "--workers", str(args.workers), "--queue", str(args.queue)]
+    if args.no_cache:
+        cmd.append("--no-cache")
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return proc, "127.0.0.1", port
+
+
+async def wait_ready(client, timeout=120.0):
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        try:
+            status, _ = await client.request("GET", "/health")
+            if status == 200:
+                return True
+        except OSError:
+            pass
+        await asyncio.sleep(0.2)
+    return False
+
+
+async def run(args):
+    proc = None
+    if args.url:
+        host, _, port = args.url.split("://")[-1].partition(":")
+        port = int(port or 80)
+    else:
+        proc, host, port = spawn_server(args)
+    client = Client(host, port)
+    try:
+        if not await wait_ready(client):
+            raise SystemExit("dispatch server did not come up")
+        world    = TOWNS[args.town](args.size, args.size) if args.town == "grid" else TOWNS[args.town]()
+        requests = RequestManager(world.get_map().get_spawn_points())
+        random.seed(args.seed)
+        rng      = random.Random(args.seed)
+
+        if not args.no_cache:
+            # one dispatch per spawn point fills the route cache for every taxi
+            for sp in requests.spawn_points:
+                status, body = await client.request("POST", "/dispatch",
+                                                    {"pickup": _xyz(sp.location), "deadline_ms": 60_000})
+                if status == 200:
+                    await client.request("POST", "/release", {"taxi": body["taxi"]})
+        print(f"{'rate/s':>7}{'sent':>6}{'ok/s':>7}{'p50 ms':>9}{'p99 ms':>9}  statuses")
+        steps = []
+        for rate in args.rates:
+            r = await run_step(client, requests, rate, args.step, args.deadline_ms, rng)
+            steps.append(r)
+            print(f"{r['rate']:>7}{r['sent']:>6}{r['achieved_rps']:>7}{r['p50_ms']:>9}"
+                  f"{r['p99_ms']:>9}  {r['statuses']}")
+        _, health = await client.request("GET", "/health")
+    finally:
+        await client.close()
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    ok = [r for r in steps if r["p99_ms"] <= args.slo_ms and r["dropped"] < 0.01]
+    best = max(ok, key=lambda r: r["rate"]) if ok else None
+    print(f"server: {health}")
+    if best:
+        print(f"✅ max sustainable ≈ {best['rate']} req/s "
+              f"(p99 {best['p99_ms']} ms ≤ {args.slo_ms} ms, {best['dropped']:.1%} dropped)")
+    else:
+        print(f"❌ no step met p99 ≤ {args.slo_ms} ms with < 1% dropped")
+    return steps
+
+
+def main():
+    ap = argparse.ArgumentParser(description="dispatch API load generator")
+    ap.add_argument("--url",         default=None, help="existing server, e.g. http://127.0.0.1:8765")
+    ap.add_argument("--town",        default="grid")
+    ap.add_argument("--size",        type=int, default=6)
+    ap.add_argument("--taxis",       type=int, default=20)
+    ap.add_argument("--workers",     type=int, default=4)
+    ap.add_argument("--queue",       type=int, default=256)
+    ap.add_argument("--rates",       type=float, nargs="+", default=[5, 10, 20, 40, 80, 160])
+    ap.add_argument("--step",        type=float, default=10.0, help="seconds per rate step")
+    ap.add_argument("--deadline-ms", type=float, default=1000.0)
+    ap.add_argument("--slo-ms",      type=float, default=250.0, help="p99 target")
+    ap.add_argument("--seed",        type=int, default=0)
+    ap.add_argument("--no-cache",    action="store_true", help="server routes every request cold")
+    args = ap.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# benchmarks/fleet_follower_bench.py
+#
+# Vectorised fleet pure pursuit (carla_interface.fleet_follower) vs one
+# taxi_agent.PurePursuitFollower object per vehicle.
+#   • routes: densified node routes on a fake town, vehicles start on them
+#     with per‑vehicle lookahead (4–8 m) and target speed (20–40 km/h)
+#   • both controllers drive the same headless bodies (core.kinematic_fleet);
+#     the scalar follower sees each body through a small vehicle adapter
+#   • equivalence: closed loop, per‑tick controls of both must agree
+#   • step time per tick at 10 / 100 / 1,000 vehicles (control only – the
+#     body update is reported separately)
+#
+#   python -m benchmarks.fleet_follower_bench --sizes 10 100 1000
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from carla_interface.fleet_follower import FleetFollower
+from carla_interface.taxi_agent import PurePursuitFollower
+from core.kinematic_fleet import KinematicFleet
+from core.logger import configure
+from routing.graph_builder import CarlaGraph
+from routing.route_gen import RouteGenerator
+from utils.fake_map import FakeLocation, FakeRotation, FakeTransform, grid_town
+from utils.helpers import to_xy
+
+
+class _Body:
+    """carla.Vehicle face of slot i of a KinematicFleet, for the scalar follower."""
+
+    def __init__(self, fleet, i):
+        self.fleet, self.i, self.control = fleet, i, None
+
+    def get_transform(self):
+        f, i = self.fleet, self.i
+        return FakeTransform(FakeLocation(f.x[i], f.y[i], 0.0), FakeRotation(yaw=f.yaw[i]))
+
+    def get_velocity(self):
+        f, i = self.fleet, self.i
+        rad = np.radians(f.yaw[i])
+        return FakeLocation(f.speed[i] * np.cos(rad), f.speed[i] * np.sin(rad), 0.0)
+
+    def apply_control(self, control):
+        self.control = control
+
+
+def make_routes(world, n_routes, seed):
+    graph = CarlaGraph(world)
+    graph.build_graph()
+    rng   = random.Random(seed)
+    nodes = sorted(graph.node_lookup)
+    gen   = RouteGenerator(graph, edge_based=False)
+    routes = []
+    while len(routes) < n_routes:
+        r = gen.dijkstra(rng.choice(nodes), rng.choice(nodes), draw=False)
+        if len(r) > 20:
+            routes.append([to_xy(w) for w in gen.route_waypoints(r, spacing=2.0)])
+    return routes
+
+
+def setup(routes, n, seed):
+    """Per‑vehicle (route, lookahead, target kph, start pose)."""
+    rng, out = random.Random(seed), []
+    for _ in range(n):
+        r  = rng.choice(routes)
+        k  = rng.randrange(0, len(r) - 10)
+        (x0, y0), (x1, y1) = r[k], r[k + 1]
+        yaw = float(np.degrees(np.arctan2(y1 - y0, x1 - x0)))
+        out.append((r[k:], rng.uniform(4.0, 8.0), rng.uniform(20.0, 40.0), (x0, y0, yaw)))
+    return out
+
+
+def build(spec):
+    body  = KinematicFleet(*zip(*(s[3] for s in spec)))
+    fleet = FleetFollower()
+    for i, (route, la, kph, _) in enumerate(spec):
+        fleet.add(i, route, lookahead=la, target_kph=kph)
+    return body, fleet
+
+
+def equivalence(spec, ticks, dt):
+    body, fleet = build(spec)
+    proxies = [_Body(body, i) for i in range(len(spec))]
+    scalar  = [PurePursuitFollower(p, None, route, lookahead=la, target_kph=kph)
+               for p, (route, la, kph, _) in zip(proxies, spec)]
+    worst, mismatched = 0.0, 0
+    for _ in range(ticks):
+        alive = np.array([f.tick() for f in scalar])
+        ctrl  = fleet.step(*body.poses())
+        mismatched += int((alive != ctrl.active).sum())
+        for i in np.flatnonzero(alive & ctrl.active):
+            c = proxies[i].control
+            worst = max(worst, abs(c.steer - ctrl.steer[i]), abs(c.throttle - ctrl.throttle[i]))
+        body.apply(ctrl, dt)
+    return worst, mismatched, int(ctrl.active.sum())
+
+
+def time_scalar(spec, ticks, dt):
+    body, fleet = build(spec)
+    proxies = [_Body(body, i) for i in range(len(spec))]
+    scalar  = [PurePursuitFollower(p, None, route, lookahead=la, target_kph=kph)
+               for p, (route, la, kph, _) in zip(proxies, spec)]
+    total = 0.0
+    for _ in range(ticks):
+        t0 = time.perf_counter()
+        for f in scalar:
+            f.tick()
+        total += time.perf_counter() - t0
+        body.apply(fleet.step(*body.poses()), dt)     # same trajectory as the vector run
+    return total / ticks
+
+
+def time_vector(spec, ticks, dt):
+    body, fleet = build(spec)
+    ctl = phys = 0.0
+    for _ in range(ticks):
+        t0   = time.perf_counter()
+        ctrl = fleet.step(*body.poses())
+        t1   = time.perf_counter()
+        body.apply(ctrl, dt)
+        ctl  += t1 - t0
+        phys += time.perf_counter() - t1
+    return ctl / ticks, phys / ticks
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes",  type=int, nargs="+", default=[10, 100, 1000])
+    ap.add_argument("--ticks",  type=int, default=200)
+    ap.add_argument("--dt",     type=float, default=0.05)
+    ap.add_argument("--routes", type=int, default=40)
+    ap.add_argument("--seed",   type=int, default=0)
+    args = ap.parse_args()
+    configure(level="WARNING")
+
+    routes = make_routes(grid_town(6, 6), args.routes, args.seed)
+    print(f"{len(routes)} routes, {sum(map(len, routes)) / len(routes):.0f} points each (2 m spacing)")
+
+    worst, mismatched, alive = equivalence(setup(routes, 50, args.seed), 600, args.dt)
+    print(f"equivalence (50 vehicles × 600 ticks): max |Δcontrol| {worst:.2e}, "
+          f"finish‑tick mismatches {mismatched}, still driving {alive}")
+
+    print(f"{'vehicles':>8} {'scalar ms':>10} {'vector ms':>10} {'speed‑up':>9} {'µs/veh':>7} {'body ms':>8}")
+    for n in args.sizes:
+        spec = setup(routes, n, args.seed + n)
+        s    = time_scalar(spec, min(args.ticks, 50 if n >= 1000 else args.ticks), args.dt)
+        v, p = time_vector(spec, args.ticks, args.dt)
+        print(f"{n:>8} {s * 1e3:>10.3f} {v * 1e3:>10.3f} {s / v:>8.1f}× {v / n * 1e6:>7.2f} {p * 1e3:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/graph_registry_bench.py
+#
+# Map rotation through GraphRegistry vs rebuilding the graph on every switch.
+# Snapshots for a handful of fake towns are built once into a temp dir; the
+# rotation then loads them lazily under a memory budget small enough to force
+# LRU evictions.
+#   python -m benchmarks.graph_registry_bench --budget-mb 8 64 --rounds 3
+
+import argparse
+import tempfile
+import threading
+import time
+
+from core.logger import configure
+from routing.graph_builder import CarlaGraph
+from routing.graph_registry import GraphRegistry
+from utils.fake_map import grid_town, highway_town, ring_town
+
+TOWNS = {
+    "FakeGrid6x6":     lambda: grid_town(6, 6, lanes=2),
+    "FakeGrid8x8":     lambda: grid_town(8, 8),
+    "FakeRing24":      lambda: ring_town(24),
+    "FakeHighway3x5":  lambda: highway_town(lanes=3, exits=5),
+}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--resolution", type=float, default=2.0)
+    ap.add_argument("--budget-mb",  type=float, nargs="+", default=[8.0, 64.0])
+    ap.add_argument("--rounds",     type=int,   default=3)
+    ap.add_argument("--threads",    type=int,   default=4, help="concurrent dispatchers per switch")
+    args = ap.parse_args()
+    configure(level="WARNING")
+
+    # baseline: every map switch rebuilds from the (fake) simulator
+    t0 = time.perf_counter()
+    for _ in range(args.rounds):
+        for make in TOWNS.values():
+            CarlaGraph(make(), resolution=args.resolution).build_graph()
+    rebuild_s = time.perf_counter() - t0
+    switches  = args.rounds * len(TOWNS)
+    print(f"rebuild per switch : {rebuild_s / switches * 1000:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # first contact with each map builds + saves its snapshot
+        prebuild = GraphRegistry(tmp, memory_budget_mb=0)
+        for name, make in TOWNS.items():
+            prebuild.get(name, args.resolution, world=make())
+        print("snapshots built    :", {k: v["load_s"] for k, v in prebuild.stats()["loads"].items()})
+
+        # another build config must not pick up these snapshots
+        other = GraphRegistry(tmp, memory_budget_mb=0, penalties={"u_turn": 80.0})
+        name  = next(iter(TOWNS))
+        try:
+            other.get(name, args.resolution)
+            stale = True
+        except FileNotFoundError:
+            stale = False
+        print(f"other build config : {other.fingerprint} vs {prebuild.fingerprint}, "
+              f"existing snapshot {'LOADED ❌' if stale else 'ignored ✅'}")
+        if stale:
+            raise SystemExit("❌ snapshot built under another config was loaded")
+
+        for budget in args.budget_mb:
+            registry = GraphRegistry(tmp, memory_budget_mb=budget)
+            t0 = time.perf_counter()
+            for _ in range(args.rounds):
+                for name in TOWNS:
+                    # several dispatchers asking at once share one load
+                    seen = []
+                    workers = [threading.Thread(target=lambda: seen.append(
+                                   registry.get(name, args.resolution)))
+                               for _ in range(args.threads)]
+                    for w in workers:
+                        w.start()
+                    for w in workers:
+                        w.join()
+                    assert all(g is seen[0] for g in seen), "dispatchers got different graphs"
+            registry_s = time.perf_counter() - t0
+            stats = registry.stats()
+            print(f"\nbudget {budget:g} MB  : {registry_s / switches * 1000:8.1f} ms per switch "
+                  f"(speed‑up ×{rebuild_s / registry_s:.1f}), resident {stats['resident_mb']} MB, "
+                  f"evictions={stats['evictions']}")
+            for key, s in stats["loads"].items():
+                hits = stats["resident"].get(key, {}).get("hits", "-")
+                print(f"   {key:<22} load {s['load_s'] * 1000:7.1f} ms   {s['size_mb']:6.2f} MB"
+                      f"   hits={hits}")
+
+if __name__ == "__main__":
+    main()
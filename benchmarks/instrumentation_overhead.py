@@ -0,0 +1,71 @@
+# benchmarks/instrumentation_overhead.py
+#
+# Cost of core.logger spans / counters: recording vs no‑op registry, plus a
+# sampled profile of a headless run.
+#   python -m benchmarks.instrumentation_overhead --calls 200000
+
+import argparse
+import time
+
+from core import logger
+
+
+def per_call(n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with logger.span("bench"):
+            pass
+        logger.incr("bench_calls")
+    return (time.perf_counter() - t0) / n * 1e9
+
+
+def per_call_guarded(n):
+    """The hot‑loop form: test logger.ENABLED before touching span / incr."""
+    t0 = time.perf_counter()
+    for _ in range(n):
+        if logger.ENABLED:
+            with logger.span("bench"):
+                pass
+            logger.incr("bench_calls")
+    return (time.perf_counter() - t0) / n * 1e9
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls",   type=int, default=200_000)
+    ap.add_argument("--profile", default=None, help="write collapsed stacks here")
+    args = ap.parse_args()
+    logger.configure(level="WARNING")
+
+    t0 = time.perf_counter()
+    for _ in range(args.calls):
+        pass
+    empty = (time.perf_counter() - t0) / args.calls * 1e9
+
+    logger.configure(metrics=True)
+    on = per_call(args.calls)
+    logger.configure(metrics=False)
+    off = per_call(args.calls)
+    guarded = per_call_guarded(args.calls)
+    print(f"empty loop      : {empty:6.0f} ns/iter")
+    print(f"metrics enabled : {on:6.0f} ns/iter (span + counter)")
+    print(f"metrics no‑op   : {off:6.0f} ns/iter")
+    print(f"no‑op, guarded  : {guarded:6.0f} ns/iter (if logger.ENABLED)")
+
+    if args.profile:
+        from routing.synthetic import grid_graph
+        from routing.route_gen import RouteGenerator
+
+        graph = grid_graph(40, 40)
+        nodes = graph.get_all_nodes()
+        with logger.SamplingProfiler(interval=0.002) as prof:
+            rg = RouteGenerator(graph)
+            for i in range(200):
+                rg.dijkstra(nodes[i], nodes[-1 - i], draw=False)
+        prof.write_collapsed(args.profile)
+        for stack, count in prof.top(3):
+            print(f"{count:5d}  {stack[-100:]}")
+
+
+if __name__ == "__main__":
+    main()
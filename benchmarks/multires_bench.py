@@ -0,0 +1,137 @@
+# benchmarks/multires_bench.py
+#
+# Fixed 2 m graph vs coarse graph + on‑demand route densification:
+#   • build time, node / edge count and approximate resident size
+#   • end‑to‑end plan time: snap OD → Dijkstra → follower waypoints
+#   • geometry check: every densified point lies within --tol of the lane
+#     centre‑lines sampled by the fine graph
+#   • coverage check: a coarse graph must route every OD the fine one does;
+#     "no in" counts nodes nothing leads to (unreachable on a directed graph)
+#   python -m benchmarks.multires_bench --coarse 10 15 20 --size 6
+
+import argparse
+import math
+import random
+import time
+from collections import defaultdict
+
+from core.logger import configure
+from routing.graph_builder import CarlaGraph
+from routing.graph_registry import graph_nbytes
+from routing.route_gen import RouteGenerator
+from utils.fake_map import FakeLocation, grid_town
+
+CELL = 10.0
+
+
+def lane_segments(fine):
+    """Consecutive same‑lane sample pairs of the fine graph, bucketed on a grid."""
+    index, seen = defaultdict(list), set()
+    for nid, edges in fine.graph.items():
+        for nb, _ in edges:
+            if nb[2:] != nid[2:] or (nb, nid) in seen:   # lateral / junction edge, or duplicate
+                continue
+            seen.add((nid, nb))
+            a = (nid[0] / 10.0, nid[1] / 10.0)
+            b = (nb[0] / 10.0,  nb[1] / 10.0)
+            for cx in range(int(min(a[0], b[0]) // CELL), int(max(a[0], b[0]) // CELL) + 1):
+                for cy in range(int(min(a[1], b[1]) // CELL), int(max(a[1], b[1]) // CELL) + 1):
+                    index[(cx, cy)].append((a, b))
+    return index
+
+
+def _seg_dist(p, a, b):
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    l2 = dx * dx + dy * dy
+    t  = 0.0 if not l2 else max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / l2))
+    return math.hypot(p[0] - a[0] - t * dx, p[1] - a[1] - t * dy)
+
+
+def deviation(points, index):
+    out = []
+    for p in points:
+        cx, cy = int(p[0] // CELL), int(p[1] // CELL)
+        best = math.inf
+        for ix in (cx - 1, cx, cx + 1):
+            for iy in (cy - 1, cy, cy + 1):
+                for a, b in index.get((ix, iy), ()):
+                    best = min(best, _seg_dist(p, a, b))
+        out.append(best)
+    return out
+
+
+def build(world, resolution):
+    t0    = time.perf_counter()
+    graph = CarlaGraph(world, resolution=resolution)
+    graph.build_graph()
+    return graph, time.perf_counter() - t0
+
+
+def plan(graph, od, spacing):
+    """Follower waypoints per OD ([] when unroutable) and mean plan time."""
+    route_gen = RouteGenerator(graph)
+    t0, routes = time.perf_counter(), []
+    for a, b in od:
+        route = route_gen.find_shortest_route(a, b)
+        routes.append(route_gen.route_waypoints(route, spacing=spacing) if route else [])
+    return routes, (time.perf_counter() - t0) / len(od)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size",    type=int,   default=6)
+    ap.add_argument("--fine",    type=float, default=2.0)
+    ap.add_argument("--coarse",  type=float, nargs="+", default=[10.0, 15.0, 20.0])
+    ap.add_argument("--spacing", type=float, default=2.0, help="follower waypoint spacing")
+    ap.add_argument("--queries", type=int,   default=30)
+    ap.add_argument("--tol",     type=float, default=0.5, help="max lateral error (m)")
+    ap.add_argument("--seed",    type=int,   default=0)
+    args = ap.parse_args()
+    configure(level="WARNING")
+
+    world = grid_town(args.size, args.size)
+    fine, fine_s = build(world, args.fine)
+    rng   = random.Random(args.seed)
+    nodes = sorted(fine.node_lookup)
+    od    = [tuple(FakeLocation(*(v / 10.0 for v in rng.choice(nodes)[:2])) for _ in range(2))
+             for _ in range(args.queries)]
+    index = lane_segments(fine)
+
+    print(f"{'graph':<10}{'nodes':>8}{'edges':>8}{'MB':>8}{'build s':>9}"
+          f"{'plan ms':>9}{'wps/route':>10}{'p95 dev':>9}{'max dev':>9}{'no route':>9}{'no in':>7}")
+    rows = [("fixed", fine, fine_s, args.fine)]
+    for res in args.coarse:
+        rows.append((f"{res:g} m", *build(world, res), res))
+
+    failed, lost, routed = False, {}, None
+    for name, graph, build_s, res in rows:
+        routes, plan_s = plan(graph, od, args.spacing)
+        ok   = [r for r in routes if r]
+        dev  = sorted(deviation([(wp.x, wp.y)
+                                 for r in ok for wp in r], index))
+        p95  = dev[int(0.95 * (len(dev) - 1))] if dev else 0.0
+        wps  = sum(len(r) for r in ok) / len(ok) if ok else 0.0
+        here = {i for i, r in enumerate(routes) if r}
+        into = {v for edges in graph.graph.values() for v, _ in edges}
+        print(f"{name:<10}{len(graph.node_lookup):>8,}{sum(len(e) for e in graph.graph.values()):>8,}"
+              f"{graph_nbytes(graph) / 2**20:>8.2f}{build_s:>9.2f}{plan_s * 1000:>9.2f}"
+              f"{wps:>10.0f}{p95:>9.2f}{(dev[-1] if dev else 0.0):>9.2f}"
+              f"{len(routes) - len(here):>9}{len(graph.node_lookup.keys() - into):>7}")
+        if routed is None:                          # the fine graph comes first
+            routed = here
+            continue
+        if routed - here:
+            lost[name] = len(routed - here)
+        failed |= p95 > args.tol
+    if lost:
+        print(f"❌ coarse graphs lose ODs the {args.fine:g} m graph routes: "
+              + ", ".join(f"{name}: {n}" for name, n in lost.items()))
+    if failed or lost:
+        raise SystemExit(f"❌ densified routes deviate more than {args.tol} m (p95)" if failed
+                         else "❌ coarse graph coverage check failed")
+    print(f"✅ densified routes within {args.tol} m of the lane centre‑lines (p95), "
+          f"every OD of the fine graph routed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/node_record_bench.py
+#
+# NodeRecord (routing.node_record) vs keeping live waypoints in node_lookup.
+#   • memory of the node table: tracemalloc over building {nid: waypoint}
+#     from the map vs {nid: NodeRecord}
+#   • attribute access: the reads extract_features / get_closest_node /
+#     the follower do per node (x, y, z, yaw, junction, speed limit)
+#   • nearest‑node scan and extract_features over the same routes
+# utils.fake_map waypoints build a fresh Transform per .transform access, as
+# carla.Waypoint does; real proxies additionally pin simulator‑side lane data,
+# so the memory figure here is a lower bound for CARLA.
+#
+#   python -m benchmarks.node_record_bench --size 10 --lanes 2
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from core.logger import configure
+from routing.extract_features import extract_features
+from routing.graph_builder import CarlaGraph
+from routing.node_record import NodeRecord
+from routing.route_gen import RouteGenerator
+from utils.fake_map import FakeLocation, grid_town
+
+
+def traced(build):
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size
+
+
+def best_of(fn, repeats=5):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def read_live(wps):
+    s = 0.0
+    for wp in wps:
+        t = wp.transform
+        s += t.location.x + t.location.y + t.location.z + t.rotation.yaw
+        s += wp.speed_limit if wp.is_junction else 0.0
+    return s
+
+
+def read_records(recs):
+    s = 0.0
+    for r in recs:
+        s += r.x + r.y + r.z + r.yaw
+        s += r.speed_limit if r.is_junction else 0.0
+    return s
+
+
+def nearest_live(live, location):
+    """get_closest_node as it was: Location.distance per waypoint proxy."""
+    best, best_d = None, float("inf")
+    for nid, wp in live.items():
+        d = location.distance(wp.transform.location)
+        if d < best_d:
+            best, best_d = nid, d
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size",    type=int, default=10)
+    ap.add_argument("--lanes",   type=int, default=2)
+    ap.add_argument("--queries", type=int, default=20)
+    ap.add_argument("--seed",    type=int, default=0)
+    args = ap.parse_args()
+    configure(level="WARNING")
+
+    world = grid_town(args.size, args.size, lanes=args.lanes)
+    graph = CarlaGraph(world)
+    graph.build_graph()
+    fmap  = world.get_map()
+
+    live, live_b = traced(lambda: {graph._id(wp): wp for wp in fmap.generate_waypoints(graph.resolution)})
+    recs, rec_b  = traced(lambda: {nid: NodeRecord.from_waypoint(wp) for nid, wp in live.items()})
+    n = len(live)
+    print(f"town: {args.size}x{args.size} grid, {args.lanes} lanes, {n:,} sampled nodes")
+    print(f"node table      live waypoints {live_b / 2**20:7.2f} MB ({live_b / n:5.0f} B/node)   "
+          f"NodeRecord {rec_b / 2**20:6.2f} MB ({rec_b / n:4.0f} B/node)   ×{live_b / rec_b:.1f} smaller")
+
+    wps, rows = list(live.values()), list(recs.values())
+    t_live = best_of(lambda: read_live(wps))
+    t_rec  = best_of(lambda: read_records(rows))
+    print(f"attribute reads live {t_live / n * 1e9:7.0f} ns/node   record {t_rec / n * 1e9:5.0f} ns/node"
+          f"   ×{t_live / t_rec:.1f}")
+
+    rng   = random.Random(args.seed)
+    nodes = sorted(graph.node_lookup)
+    locs  = [FakeLocation(*(v / 10.0 for v in rng.choice(nodes)[:2])) for _ in range(args.queries)]
+    t_live = best_of(lambda: [nearest_live(live, l) for l in locs], repeats=2) / len(locs)
+    t_rec  = best_of(lambda: [graph.get_closest_node(l) for l in locs], repeats=2) / len(locs)
+    print(f"nearest node    live {t_live * 1000:7.2f} ms      record {t_rec * 1000:6.2f} ms"
+          f"        ×{t_live / t_rec:.1f}")
+
+    rg     = RouteGenerator(graph)
+    routes = [r for r in (rg.dijkstra(rng.choice(nodes), rng.choice(nodes), draw=False)
+                          for _ in range(args.queries)) if len(r) > 1]
+    t_rec = best_of(lambda: [extract_features(r, graph, world, {}) for r in routes]) / len(routes)
+    print(f"extract_features  {t_rec * 1000:.3f} ms/route on records "
+          f"({sum(map(len, routes)) / len(routes):.0f} nodes/route)")
+
+    live_wp = graph.live_waypoint(nodes[0])
+    print(f"live_waypoint(nid) on demand: road {live_wp.road_id} lane {live_wp.lane_id} "
+          f"s={live_wp.s:.1f} ↔ record s={graph.get_waypoint(nodes[0]).s:.1f}")
+
+
+if __name__ == "__main__":
+    main()
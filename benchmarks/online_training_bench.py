@@ -0,0 +1,99 @@
+# benchmarks/online_training_bench.py
+#
+# Full refit vs incremental update as the ride log grows.
+# Rides arrive in batches; after each batch we time
+#   • full refit   – ETAModel / XGBETAModel .train() on every row so far
+#   • incremental  – OnlineTrainer.run_once() on just the new rows
+# and record wall time, peak traced memory and hold‑out MAE.
+#   python -m benchmarks.online_training_bench --batches 5 --batch-rows 20000
+#   python -m benchmarks.online_training_bench --learner xgb --max-trees 200   # hits the tree cap
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from core.logger import configure
+from routing.evaluation import append_ride_log
+from routing.synthetic import synthetic_ride
+
+
+def timed(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 2**20
+
+
+def mae(model_predict, X, y):
+    pred = model_predict(X)
+    return sum(abs(p - t) for p, t in zip(pred, y)) / len(y)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batches",    type=int, default=5)
+    ap.add_argument("--batch-rows", type=int, default=20000)
+    ap.add_argument("--learner",    choices=("sgd", "xgb"), default="sgd")
+    ap.add_argument("--max-trees",  type=int, default=None, help="xgb tree cap (refit on reservoir)")
+    ap.add_argument("--seed",       type=int, default=0)
+    args = ap.parse_args()
+    configure(level="WARNING")
+
+    try:
+        from data.models.online_trainer import LEARNERS, OnlineTrainer
+        if args.learner == "xgb":
+            from data.models.xgboost_eta_model import XGBETAModel as FullModel
+        else:
+            from data.models.eta_model import ETAModel as FullModel
+    except ImportError as e:
+        raise SystemExit(f"skipped: missing dependency {e.name}")
+
+    rng     = random.Random(args.seed)
+    holdout = [synthetic_ride(rng) for _ in range(2000)]
+    hX, hy  = [r[0] for r in holdout], [r[1] for r in holdout]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "ride_log.jsonl")
+        learner  = LEARNERS[args.learner]()
+        if args.max_trees and args.learner == "xgb":
+            learner.max_trees = args.max_trees
+        trainer  = OnlineTrainer(log_path, os.path.join(tmp, "online"),
+                                 learner=learner, segment_store=None)
+        X_all, y_all = [], []
+        print(f"{'rows':>8} | {'full s':>8}{'full MB':>9}{'full MAE':>10} | "
+              f"{'incr s':>8}{'incr MB':>9}{'incr MAE':>10}{'refits':>7}")
+        for _ in range(args.batches):
+            for _ in range(args.batch_rows):
+                x, t = synthetic_ride(rng)
+                append_ride_log(x, t, log_path)
+                X_all.append(x)
+                y_all.append(t)
+
+            full = FullModel()
+            full_s, full_mb = timed(lambda: full.train(X_all, y_all))
+            incr_s, incr_mb = timed(trainer.run_once)
+            pipe = trainer.learner.pipeline()
+            print(f"{len(y_all):>8,} | {full_s:>8.2f}{full_mb:>9.1f}"
+                  f"{mae(full.pipeline.predict, hX, hy):>10.2f} | "
+                  f"{incr_s:>8.2f}{incr_mb:>9.1f}{mae(pipe.predict, hX, hy):>10.2f}"
+                  f"{getattr(trainer.learner, 'refits', '–'):>7}")
+
+        # hot reload: an estimator on the publish dir follows new versions
+        from routing.ai_router import ETAEstimator
+        est = ETAEstimator(os.path.join(tmp, "online"), reload_interval=0.0)
+        before = est.version
+        for _ in range(args.batch_rows):
+            append_ride_log(*synthetic_ride(rng), log_path)
+        trainer.run_once()
+        est.predict_eta(hX[0])
+        print(f"hot reload: {before} → {est.version}")
+
+
+if __name__ == "__main__":
+    main()
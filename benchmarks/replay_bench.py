@@ -0,0 +1,127 @@
+# benchmarks/replay_bench.py
+#
+# Record / replay round trip for core.trace + core.replay.
+#   • core.headless_sim.traced_run stands in for CARLA: taxis, moving
+#     background cars, Poisson ride requests from spawn points, weather that
+#     drifts every few minutes, all ticked at --hz for --minutes of sim time;
+#     dispatch and best‑of‑k trip route decisions (Dispatcher.plan_ride under
+#     the --k policy) are made live and recorded
+#   • the trace is replayed twice – decisions must match the live ones and
+#     each other exactly (ETAs within f32 rounding)
+#   • a changed model (heavier junction delay) is replayed and diffed to show
+#     the regression report, and a graph edit is caught by the hash check
+#   • a short k > 1 run scored by a feature‑vector model (the ETAEstimator
+#     path, whose features are cached per route) is recorded uncached and
+#     replayed with and without a RouteCache – all three must agree
+# Reports trace size, bytes per tick, record and replay wall time.
+#
+#   python -m benchmarks.replay_bench --minutes 60 --hz 10 --taxis 20 --background 60
+
+import argparse
+import os
+import tempfile
+import time
+
+from core.headless_sim import traced_run
+from core.logger import configure
+from core.replay import diff, replay, summarize
+from core.trace import TraceReader, decision_policy
+from routing.graph_builder import CarlaGraph
+from routing.route_cache import RouteCache
+from routing.segment_eta import SegmentETA
+from utils.fake_map import grid_town
+
+
+class FeatureETA:
+    """ETAEstimator stand‑in: a fixed linear model on extract_features' vector."""
+
+    def predict_eta(self, fv):
+        distance, turns, junctions, avg_delay, avg_speed, _, weather, lights = fv
+        return distance / max(avg_speed / 3.6, 1.0) + 3.0 * turns + 1.5 * junctions + \
+            0.2 * avg_delay + 8.0 * lights + 5.0 * weather
+
+
+def feature_model_check(graph, args):
+    """(live vs cached replay changes, live vs uncached, requests, rides not on the shortest route)"""
+    path = os.path.join(tempfile.mkdtemp(), "features.trace")
+    traced_run(graph, path, minutes=10, hz=2, taxis=args.taxis, background=0, rate=args.rate,
+               seed=args.seed + 1, model=FeatureETA(), policy=decision_policy(max(args.k, 2)),
+               cache=False)
+    reader   = TraceReader(path)
+    live     = reader.decisions()
+    cached   = replay(reader, graph, model=FeatureETA(), cache=RouteCache())[0]
+    uncached = replay(reader, graph, model=FeatureETA(), cache=False)[0]
+    shortest = replay(reader, graph, model=FeatureETA(), cache=False,
+                      policy={"k": 1, "selector": "min_eta"})[0]
+    detours  = sum(a.route_hash != b.route_hash for a, b in zip(uncached, shortest))
+    return (len(diff(live, cached, eta_tol=1e-5)), len(diff(live, uncached, eta_tol=1e-5)),
+            len(live), detours)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size",       type=int,   default=8)
+    ap.add_argument("--minutes",    type=float, default=60)
+    ap.add_argument("--hz",         type=float, default=10)
+    ap.add_argument("--taxis",      type=int,   default=20)
+    ap.add_argument("--background", type=int,   default=60)
+    ap.add_argument("--rate",       type=float, default=240, help="ride requests per hour")
+    ap.add_argument("--k",          type=int,   default=3, help="trip route alternatives")
+    ap.add_argument("--seed",       type=int,   default=0)
+    args = ap.parse_args()
+    configure(level="ERROR")
+
+    graph = CarlaGraph(grid_town(args.size, args.size))
+    graph.build_graph()
+    path  = os.path.join(tempfile.mkdtemp(), "run.trace")
+
+    rec_s, counts = traced_run(graph, path, args.minutes, args.hz, args.taxis, args.background,
+                               args.rate, args.seed, policy=decision_policy(args.k))
+    size  = os.path.getsize(path)
+    ticks = counts[1]
+    print(f"run: {args.minutes:.0f} sim min @ {args.hz:g} Hz, {args.taxis} taxis + "
+          f"{args.background} background cars, {counts[2]} requests")
+    print(f"trace   {size / 2**20:6.2f} MB  ({size / ticks:5.1f} B/tick, "
+          f"{size / ticks / (args.taxis + args.background):4.1f} B/actor‑tick)   "
+          f"recorded in {rec_s:.1f}s incl. live dispatch")
+
+    reader = TraceReader(path)
+    print(f"policy  {reader.meta['policy']}")
+    t0 = time.perf_counter()
+    n  = sum(1 for _ in reader)
+    print(f"scan    {n:,} records in {time.perf_counter() - t0:.2f}s")
+
+    live  = reader.decisions()
+    cache = RouteCache()
+    first, cold  = replay(reader, graph, cache=cache)
+    second, warm = replay(reader, graph, cache=cache)
+    for label, st in (("cold", cold), ("warm", warm)):
+        print(f"replay  {label}: {st['requests']} requests in {st['seconds']:6.2f}s "
+              f"({st['ticks_decoded']} of {st['ticks']:,} ticks decoded)   "
+              f"×{args.minutes * 60 / st['seconds']:.0f} real time")
+    same_runs = first == second
+    vs_live   = diff(live, first, eta_tol=1e-5)
+    print(f"determinism  replay == replay: {same_runs}   live vs replay changes: {len(vs_live)}")
+
+    heavier, st = replay(reader, graph, model=SegmentETA.free_flow(graph, junction_s=12.0), cache=cache)
+    changes     = diff(first, heavier)
+    print(f"junction delay 4 s → 12 s: {len(changes)} changes {summarize(changes)} "
+          f"in {st['seconds']:.2f}s (shared route cache)")
+
+    u, edges = next(iter(graph.graph.items()))
+    graph.set_edge_weight(u, edges[0][0], edges[0][1] + 50.0)
+    try:
+        replay(reader, graph)
+        print("graph check   edit NOT detected")
+    except ValueError:
+        print("graph check   edited graph rejected (hash mismatch)")
+
+    vs_cached, vs_uncached, n, detours = feature_model_check(graph, args)
+    print(f"feature model k={max(args.k, 2)}  {n} requests, {detours} trips off the shortest route; "
+          f"live vs replay changes: cached {vs_cached}, uncached {vs_uncached}")
+    if not same_runs or vs_live or vs_cached or vs_uncached:
+        raise SystemExit("❌ replay is not deterministic")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# benchmarks/ride_analytics_bench.py
+#
+# Throughput, memory bound and attribution accuracy of routing.ride_analytics.
+#   • a synthetic ride log is written in the format routing.evaluation
+#     streams: routes from a compiled fake town, two maps, two model versions
+#     (v1 under‑predicts by 12 %, v2 is calibrated), rush‑hour slowdown,
+#     baseline / best‑possible times; --segment-share of rows carry segments
+#   • a few "slow" lanes (+12 s per traversal, e.g. a badly timed light) are
+#     planted – attribution should put their edges at the top of segments.csv
+#     (scored per lane: consecutive edges of a lane are inseparable)
+#   • each size is aggregated in a fresh process; peak RSS shows memory does
+#     not grow with the number of rides
+#
+#   python -m benchmarks.ride_analytics_bench --sizes 100000 1000000
+#   python -m benchmarks.ride_analytics_bench --sizes 1000000 10000000     # ~2.5 GB log
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from core.logger import configure
+from routing.graph_builder import CarlaGraph
+from routing.ride_analytics import RideAnalytics, iter_rows
+from routing.shared_graph import SharedGraph, compile_shared
+from utils.fake_map import grid_town
+
+RUSH = {7, 8, 9, 16, 17, 18}
+
+
+def make_routes(shared, n, rng):
+    routes, size = [], len(shared)
+    while len(routes) < n:
+        p = shared.shortest_path(rng.randrange(size), rng.randrange(size))
+        if len(p) > 10:
+            routes.append(p)
+    return routes
+
+
+def write_log(path, shared, rides, segment_share, seed):
+    rng    = random.Random(seed)
+    npr    = np.random.default_rng(seed)
+    routes = make_routes(shared, 3000, rng)
+    times  = np.asarray(shared.edge_times(None), dtype=float)
+    indptr, indices = np.asarray(shared.indptr), np.asarray(shared.indices)
+    xs, ys = np.asarray(shared.xs), np.asarray(shared.ys)
+    ids    = np.asarray(shared.node_ids)
+    lane   = [tuple(ids[u, 2:4]) for u in np.repeat(np.arange(len(ids)), np.diff(indptr))]
+    counts = {}
+    for ln in lane:
+        counts[ln] = counts.get(ln, 0) + 1
+    slow   = set(rng.sample(sorted(ln for ln, c in counts.items() if c >= 10), 10))
+    delay  = np.array([12.0 / counts[ln] if ln in slow else 0.0 for ln in lane])
+
+    def edge(u, v):
+        k = indptr[u] + int(np.flatnonzero(indices[indptr[u]:indptr[u + 1]] == v)[0])
+        return k
+
+    info = []                                 # per route: modelled s, true s, metres, segments json
+    for r in routes:
+        eids  = [edge(u, v) for u, v in zip(r[:-1], r[1:])]
+        model = float(times[eids].sum())
+        true  = model + float(delay[eids].sum())
+        dist  = float(sum(np.hypot(xs[v] - xs[u], ys[v] - ys[u]) for u, v in zip(r[:-1], r[1:])))
+        segs  = ",".join(f"[{xs[u]:.1f},{ys[u]:.1f},{xs[v]:.1f},{ys[v]:.1f}]" for u, v in zip(r[:-1], r[1:]))
+        info.append((model, true, dist, f"[{segs}]"))
+
+    block = 100_000
+    with open(path, "w") as f:
+        for start in range(0, rides, block):
+            n      = min(block, rides - start)
+            ridx   = npr.integers(0, len(info), n)
+            hour   = npr.integers(0, 24, n)
+            rush   = np.isin(hour, list(RUSH))
+            noise  = npr.lognormal(0.0, 0.12, n)
+            model2 = npr.random(n) < 0.5
+            maps   = np.where(npr.random(n) < 0.6, "Town04", "Town01")
+            base_f = npr.uniform(0.95, 1.3, n)
+            best_f = npr.uniform(0.8, 1.0, n)
+            segd   = npr.random(n) < segment_share
+            lines  = []
+            for i in range(n):
+                model, true, dist, segs = info[ridx[i]]
+                actual = true * (1.3 if rush[i] else 1.0) * noise[i]
+                pred   = model * (1.0 if model2[i] else 0.88) * (1.3 if rush[i] else 1.0)
+                lines.append(
+                    f'{{"features":[{dist:.1f},3,2,2.5,30.0,{hour[i]},0,1],"actual_time":{actual:.2f},'
+                    f'"ride_id":{start + i},"predicted_eta":{pred:.2f},'
+                    f'"baseline_time":{actual * base_f[i]:.2f},"best_possible_time":{actual * best_f[i]:.2f},'
+                    f'"map":"{maps[i]}","model_version":"{"v2" if model2[i] else "v1"}"'
+                    + (f',"segments":{segs}' if segd[i] else "") + "}\n")
+            f.write("".join(lines))
+    return slow, lane
+
+
+def peak_rss_mb():
+    """VmHWM – unlike ru_maxrss it is not inherited from the forked parent image."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def aggregate(path, graph_path, rows, out_dir, queue):
+    configure(level="WARNING")
+    t0    = time.perf_counter()
+    stats = RideAnalytics(SharedGraph(graph_path))
+    left  = rows
+    for chunk in iter_rows(path):
+        stats.add_rows(chunk[:left])
+        left -= len(chunk)
+        if left <= 0:
+            break
+    secs    = time.perf_counter() - t0
+    summary = stats.write(out_dir)
+    rows    = stats.segments(top=stats.edges.n_edges)
+    top     = [(r["edge"], r["lift_s"], r["rides"]) for r in rows]
+    queue.put((secs, peak_rss_mb(), summary, top,
+               stats.grouped(("model",)), stats.calibration_fit()))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes",         type=int, nargs="+", default=[100_000, 1_000_000])
+    ap.add_argument("--segment-share", type=float, default=0.2)
+    ap.add_argument("--seed",          type=int, default=0)
+    args = ap.parse_args()
+    configure(level="WARNING")
+
+    tmp   = tempfile.mkdtemp()
+    graph = CarlaGraph(grid_town(6, 6))
+    graph.build_graph()
+    gpath  = compile_shared(graph, "analytics_grid6", root=tmp)
+    shared = SharedGraph(gpath)
+    log    = os.path.join(tmp, "ride_log.jsonl")
+    t0     = time.perf_counter()
+    slow, lane = write_log(log, shared, max(args.sizes), args.segment_share, args.seed)
+    print(f"log: {max(args.sizes):,} rides, {os.path.getsize(log) / 2**20:.0f} MB "
+          f"(written in {time.perf_counter() - t0:.0f}s), {len(slow)} planted slow lanes")
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'rides':>11} {'seconds':>8} {'rides/s':>9} {'peak RSS MB':>12} {'groups':>7} "
+          f"{'slow lanes in top‑10 lanes':>27}")
+    for n in sorted(args.sizes):
+        q = ctx.Queue()
+        p = ctx.Process(target=aggregate, args=(log, gpath, n, os.path.join(tmp, f"out{n}"), q))
+        p.start()
+        secs, rss, summary, top, by_model, fit = q.get()
+        p.join()
+        by_lane = {}                              # lane → [Σ lift·rides, rides]
+        for e, lift, rides in top:
+            acc = by_lane.setdefault(lane[e], [0.0, 0])
+            acc[0] += lift * rides
+            acc[1] += rides
+        ranked = sorted(by_lane, key=lambda ln: -by_lane[ln][0] / by_lane[ln][1])[:len(slow)]
+        print(f"{n:>11,} {secs:>8.1f} {n / secs:>9,.0f} {rss:>12.0f} {summary['groups']:>7} "
+              f"{len(slow & set(ranked)):>21} / {len(slow)}")
+    for row in by_model:
+        print(f"   model {row['model']}: MAE {row['mae_s']}s bias {row['bias_s']}s "
+              f"p90 {row['p90_abs_s']}s, slope/intercept {fit[row['model']]}")
+    print(f"tables: {sorted(os.listdir(os.path.join(tmp, f'out{max(args.sizes)}')))}")
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/route_cache_bench.py
+#
+# Zipf‑skewed OD workload against RouteGenerator with and without RouteCache.
+#   python -m benchmarks.route_cache_bench --queries 5000 --zipf 1.1
+# A second "worker" then reuses the first one's SQLite tier with a cold LRU.
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from core.logger import configure
+from core.trace import graph_hash
+from routing.route_cache import RouteCache
+from routing.route_gen import RouteGenerator
+from routing.synthetic import grid_graph
+
+
+def zipf_workload(nodes, n_pairs, n_queries, s, seed):
+    rng     = random.Random(seed)
+    pairs   = [tuple(rng.sample(nodes, 2)) for _ in range(n_pairs)]
+    weights = [1.0 / (rank ** s) for rank in range(1, n_pairs + 1)]
+    return rng.choices(pairs, weights=weights, k=n_queries)
+
+
+def run(route_gen, workload):
+    t0 = time.perf_counter()
+    for s, e in workload:
+        route_gen.dijkstra(s, e, draw=False)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--grid",    type=int,   default=40)
+    ap.add_argument("--pairs",   type=int,   default=2000)
+    ap.add_argument("--queries", type=int,   default=5000)
+    ap.add_argument("--zipf",    type=float, default=1.1)
+    ap.add_argument("--lru",     type=int,   default=500)
+    ap.add_argument("--seed",    type=int,   default=0)
+    args = ap.parse_args()
+    configure(level="WARNING")
+
+    graph    = grid_graph(args.grid, args.grid)
+    workload = zipf_workload(graph.get_all_nodes(), args.pairs, args.queries,
+                             args.zipf, args.seed)
+
+    base = run(RouteGenerator(graph), workload)
+    print(f"no cache      : {base:7.2f} s   {args.queries / base:8.0f} q/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "routes.sqlite")
+
+        cache = RouteCache(max_entries=args.lru)
+        t = run(RouteGenerator(graph, cache=cache), workload)
+        print(f"LRU only      : {t:7.2f} s   {args.queries / t:8.0f} q/s   {cache.stats()}")
+
+        cache = RouteCache(max_entries=args.lru, db_path=db)
+        t = run(RouteGenerator(graph, cache=cache), workload)
+        print(f"LRU + SQLite  : {t:7.2f} s   {args.queries / t:8.0f} q/s   {cache.stats()}")
+        cache.close()
+
+        # another worker attaching to the warm shared tier
+        cache = RouteCache(max_entries=args.lru, db_path=db)
+        t = run(RouteGenerator(graph, cache=cache), workload)
+        print(f"warm worker   : {t:7.2f} s   {args.queries / t:8.0f} q/s   {cache.stats()}")
+
+        # re‑weight one edge: every cached route now misses
+        a = workload[0][0]
+        b, d = graph.get_neighbors(a)[0]
+        graph.set_edge_weight(a, b, d * 2)
+        dropped = cache.invalidate(graph)
+        print(f"after re‑weight: dropped {dropped} LRU entries, {cache.stats()}")
+
+        # weights_id after a re‑weight: weights pass only, no full content hash
+        t0 = time.perf_counter()
+        for i in range(20):
+            graph.set_edge_weight(a, b, d * (3 + i))
+            cache.weights_id(graph)
+        t_id = (time.perf_counter() - t0) / 20
+        t0 = time.perf_counter()
+        graph_hash(graph)
+        t_full = time.perf_counter() - t0
+        print(f"weights_id refresh: {t_id * 1e3:.2f} ms (full graph_hash {t_full * 1e3:.2f} ms)")
+        graph.set_edge_weight(a, b, d)
+
+        # dispatcher threads sharing the one SQLite connection
+        errors = []
+
+        def hammer(seed):
+            try:
+                for s, e in zipf_workload(graph.get_all_nodes(), 50, 200, args.zipf, seed):
+                    key = cache.key("routes", s, e, cache.weights_id(graph))
+                    cache.put(key, [s, e])
+                    cache.get(key)
+                cache.invalidate(graph)
+            except Exception as exc:
+                errors.append(repr(exc))
+
+        threads = [threading.Thread(target=hammer, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        print(f"8 threads on one cache: {'✅ no errors' if not errors else '❌ ' + errors[0]}")
+        cache.close()
+        if errors:
+            raise SystemExit(1)
+
+        # two workers whose weights_version counters agree but whose weights
+        # don't: the shared tier must not hand one the other's route
+        db2    = os.path.join(tmp, "routes2.sqlite")
+        g1, g2 = grid_graph(args.grid, args.grid), grid_graph(args.grid, args.grid)
+        s, e   = workload[0]
+        route  = RouteGenerator(g1).dijkstra(s, e, draw=False)
+        g1.set_edge_weight(route[0], route[1], 1e6)          # worker 1: first edge closed
+        other  = next(n for n in g2.get_all_nodes() if n not in route)
+        g2.set_edge_weight(other, g2.get_neighbors(other)[0][0], 1e6)
+        w1, w2 = RouteCache(db_path=db2), RouteCache(db_path=db2)
+        r1 = RouteGenerator(g1, cache=w1).dijkstra(s, e, draw=False)
+        r2 = RouteGenerator(g2, cache=w2).dijkstra(s, e, draw=False)
+        ok = r2 == RouteGenerator(g2).dijkstra(s, e, draw=False) and r1 != r2
+        print(f"equal versions ({g1.weights_version} == {g2.weights_version}), different "
+              f"weights: {'✅ no cross‑worker reuse' if ok else '❌ stale route served'}")
+        w1.close()
+        w2.close()
+
+
+if __name__ == "__main__":
+    main()
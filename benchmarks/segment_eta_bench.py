@@ -0,0 +1,146 @@
+# benchmarks/segment_eta_bench.py
+#
+# Whole‑route ETA model (RandomForest on extract_features, as ETAEstimator
+# serves it) vs the per‑segment engine (routing.segment_eta) on a fake town
+# with a synthetic per‑edge ground truth: congested roads, rush hour, rain,
+# junction and lane‑change delays.
+#   • hold‑out MAE of both
+#   • latency of one candidate ETA, and of scoring k candidates at once
+#   • true travel time of shortest‑distance vs predicted‑fastest routes
+#   python -m benchmarks.segment_eta_bench --rides 3000 --size 5
+
+import argparse
+import math
+import random
+import statistics
+import time
+
+from core.logger import configure
+from routing.extract_features import extract_features
+from routing.graph_builder import JUNCTION_TURN, LANE_CHANGE, CarlaGraph, node_position
+from routing.route_gen import RouteGenerator
+from routing.segment_eta import SegmentETA
+from utils.fake_map import grid_town
+
+
+class GroundTruth:
+    """Per‑edge travel time the synthetic rides are drawn from."""
+
+    def __init__(self, graph, seed):
+        rng = random.Random(seed)
+        roads = {u[2] for u in graph.graph}
+        self.graph     = graph
+        self.road_flow = {r: rng.uniform(0.5, 1.0) for r in roads}     # share of the limit
+        self.rush_jam  = {r: rng.choice((1.0, 1.0, 1.8)) for r in roads}
+
+    def edge_time(self, u, v, context):
+        hour, weather = context
+        wp     = self.graph.get_waypoint(u)
+        length = math.dist(node_position(u), node_position(v))
+        speed  = wp.speed_limit / 3.6 * self.road_flow[u[2]]
+        t      = length / speed
+        if hour in (7, 8, 17, 18):
+            t *= self.rush_jam[u[2]]
+        if weather == 2:
+            t *= 1.25
+        kind = self.graph.edge_type(u, v)
+        t += 4.0 if kind == JUNCTION_TURN else 0.0
+        t += 2.0 if kind == LANE_CHANGE else 0.0
+        return t
+
+    def route_time(self, route, context, rng=None):
+        t = sum(self.edge_time(a, b, context) for a, b in zip(route[:-1], route[1:]))
+        return t + (rng.gauss(0, 3) if rng else 0.0)
+
+
+def whole_route_row(route, graph, world, context):
+    f = extract_features(route, graph, world, {})
+    f[5], f[6] = context                     # simulated hour / weather, not wall‑clock
+    return f
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size",    type=int, default=5)
+    ap.add_argument("--lanes",   type=int, default=2)
+    ap.add_argument("--rides",   type=int, default=3000)
+    ap.add_argument("--k",       type=int, default=5, help="candidates scored per dispatch")
+    ap.add_argument("--seed",    type=int, default=0)
+    args = ap.parse_args()
+    configure(level="WARNING")
+
+    world = grid_town(args.size, args.size, lanes=args.lanes)
+    graph = CarlaGraph(world)
+    graph.build_graph()
+    truth = GroundTruth(graph, args.seed)
+    rng   = random.Random(args.seed)
+    nodes = sorted(graph.node_lookup)
+    rg    = RouteGenerator(graph)
+
+    rides = []
+    while len(rides) < args.rides:
+        route = rg.dijkstra(*rng.sample(nodes, 2), draw=False)
+        if len(route) > 1:
+            ctx = (rng.randint(0, 23), rng.choice((0, 0, 1, 2)))
+            rides.append((route, ctx, truth.route_time(route, ctx, rng)))
+    split = int(0.8 * len(rides))
+    train, test = rides[:split], rides[split:]
+
+    seg = SegmentETA(graph)
+    t0  = time.perf_counter()
+    seg.fit(train)
+    seg_fit = time.perf_counter() - t0
+    seg_mae = statistics.fmean(abs(seg.route_eta(r, c) - t) for r, c, t in test)
+
+    try:
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler
+    except ImportError as e:
+        whole = None
+        print(f"whole‑route model skipped (missing dependency: {e.name})")
+    else:
+        whole = Pipeline([("scaler", StandardScaler()),
+                          ("model", RandomForestRegressor(n_estimators=100, random_state=42))])
+        t0 = time.perf_counter()
+        whole.fit([whole_route_row(r, graph, world, c) for r, c, _ in train], [t for *_, t in train])
+        whole_fit = time.perf_counter() - t0
+        whole_mae = statistics.fmean(abs(whole.predict([whole_route_row(r, graph, world, c)])[0] - t)
+                                     for r, c, t in test)
+
+    def per_call(fn, items):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(item)
+        return (time.perf_counter() - t0) / len(items) * 1000.0
+
+    sample = test[:200]
+    groups = [sample[i:i + args.k] for i in range(0, len(sample) - args.k + 1, args.k)]
+    print(f"{'engine':<14}{'fit s':>8}{'MAE s':>8}{'1 route ms':>12}{f'{args.k} routes ms':>13}")
+    if whole is not None:
+        one = per_call(lambda x: whole.predict([whole_route_row(x[0], graph, world, x[1])]), sample)
+        k   = per_call(lambda g: whole.predict([whole_route_row(r, graph, world, c) for r, c, _ in g]),
+                       groups)
+        print(f"{'whole‑route':<14}{whole_fit:>8.2f}{whole_mae:>8.2f}{one:>12.3f}{k:>13.3f}")
+    one = per_call(lambda x: seg.route_eta(x[0], x[1]), sample)
+    k   = per_call(lambda g: seg.routes_eta([r for r, *_ in g], g[0][1]), groups)
+    print(f"{'per‑segment':<14}{seg_fit:>8.2f}{seg_mae:>8.2f}{one:>12.3f}{k:>13.3f}")
+
+    # context bucket switch cost, then fastest routes on predicted seconds
+    t0 = time.perf_counter()
+    seg.edge_times((8, 2))
+    print(f"edge‑time refresh on bucket change: {(time.perf_counter() - t0) * 1000:.2f} ms "
+          f"for {len(seg.edge_id):,} edges")
+    ctx   = (8, 0)
+    fast  = RouteGenerator(seg.time_graph(ctx))
+    gains = []
+    for route, _, _ in test[:100]:
+        alt = fast.dijkstra(route[0], route[-1], draw=False)
+        if alt:
+            gains.append(truth.route_time(route, ctx) - truth.route_time(alt, ctx))
+    print(f"rush hour, fastest‑by‑prediction vs shortest route: "
+          f"{statistics.fmean(gains):+.1f} s true time saved on average")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# benchmarks/shared_workers_bench.py
+#
+# Per‑worker memory and startup of dispatch worker processes, three ways:
+#   pickle  each worker loads the graph snapshot and builds its own ETA model
+#           (what a ProcessPoolExecutor of Dispatchers does today)
+#   fork    the parent loads once, workers are forked: copy‑on‑write, but
+#           every object a search touches gets its refcount written, so the
+#           pages holding it become private to the worker
+#   shared  workers attach to routing.shared_graph arrays (mmap, /dev/shm)
+# Every worker answers the same batch of dispatch queries before it reports,
+# then waits until all workers have reported, so shared pages really are
+# shared when RSS / PSS / USS are read from /proc/self/smaps_rollup.
+#   PSS = RSS with shared pages split between their users; USS = private.
+#   Σ PSS over the workers is what the fleet of workers really costs.
+#
+#   python -m benchmarks.shared_workers_bench --workers 1 8 32 --size 8
+
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from core.logger import configure
+
+_fork_state = None           # parent‑loaded graph inherited by forked workers
+
+
+def _memory_kb():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {"rss": fields.get("Rss", 0), "pss": fields.get("Pss", 0),
+            "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)}
+
+
+def _dict_state(snapshot):
+    """Graph + ETA model as a Dispatcher process holds them (dicts of tuples)."""
+    from core.headless_sim import reverse_adjacency
+    from routing.segment_eta import SegmentETA
+    from routing.snapshot import load_snapshot
+
+    graph = load_snapshot(snapshot)
+    model = SegmentETA.free_flow(graph)
+    times = model.time_graph(None).graph
+    return graph, model, reverse_adjacency(times)
+
+
+def _queries(nodes, count, seed):
+    rng = random.Random(seed)
+    return [(rng.choice(nodes), rng.sample(nodes, 20)) for _ in range(count)]
+
+
+def _worker(mode, path, launched, queries, results, go):
+    configure(level="WARNING")
+    if mode == "shared":
+        from routing.shared_graph import SharedGraph
+        shared = SharedGraph(path)
+        run = lambda target, sources: shared.times_to(target, sources)
+    else:
+        from core.headless_sim import shortest_distances
+        graph, model, rev = _fork_state if mode == "fork" else _dict_state(path)
+        nodes = sorted(graph.node_lookup)
+        run = lambda target, sources: shortest_distances(
+            rev, nodes[target], targets=[nodes[s] for s in sources])
+    ready = time.time() - launched
+    for target, sources in queries:
+        run(target, sources)
+    results.put(dict(_memory_kb(), startup_s=ready))
+    go.wait()
+
+
+def measure(mode, path, workers, queries):
+    global _fork_state
+    ctx = multiprocessing.get_context("fork" if mode == "fork" else "spawn")
+    if mode == "fork" and _fork_state is None:
+        _fork_state = _dict_state(path)
+    results, go = ctx.Queue(), ctx.Event()
+    t0    = time.time()
+    procs = [ctx.Process(target=_worker, args=(mode, path, t0, queries, results, go))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    wall = time.time() - t0
+    go.set()
+    for p in procs:
+        p.join()
+    mb = lambda key: statistics.fmean(r[key] for r in rows) / 1024.0
+    return {"mode": mode, "workers": workers, "wall_s": wall,
+            "startup_s": statistics.fmean(r["startup_s"] for r in rows),
+            "rss_mb": mb("rss"), "pss_mb": mb("pss"), "uss_mb": mb("uss"),
+            "total_pss_mb": sum(r["pss"] for r in rows) / 1024.0}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size",    type=int, default=8)
+    ap.add_argument("--lanes",   type=int, default=2)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    ap.add_argument("--modes",   nargs="+", default=["pickle", "fork", "shared"],
+                    choices=["pickle", "fork", "shared"])
+    ap.add_argument("--queries", type=int, default=20)
+    args = ap.parse_args()
+    configure(level="WARNING")
+
+    from routing.graph_builder import CarlaGraph
+    from routing.segment_eta import SegmentETA
+    from routing.shared_graph import compile_shared
+    from routing.snapshot import save_snapshot
+    from utils.fake_map import grid_town
+
+    world = grid_town(args.size, args.size, lanes=args.lanes)
+    graph = CarlaGraph(world)
+    graph.build_graph()
+    tmp      = tempfile.mkdtemp(prefix="shared_bench_")
+    snapshot = os.path.join(tmp, "graph.pkl")
+    save_snapshot(graph, snapshot)
+    t0     = time.perf_counter()
+    shared = compile_shared(graph, f"bench_grid{args.size}", model=SegmentETA.free_flow(graph))
+    compile_s = time.perf_counter() - t0
+    nodes   = sorted(graph.node_lookup)
+    queries = _queries(list(range(len(nodes))), args.queries, seed=0)
+    print(f"graph: {len(nodes)} nodes, {sum(len(e) for e in graph.graph.values())} edges; "
+          f"snapshot {os.path.getsize(snapshot) / 2**20:.1f} MB, "
+          f"shared arrays compiled in {compile_s:.2f} s\n")
+
+    print(f"{'mode':<8}{'workers':>8}{'startup s':>11}{'all up s':>10}"
+          f"{'RSS MB':>9}{'PSS MB':>9}{'USS MB':>9}{'Σ PSS MB':>10}")
+    for n in args.workers:
+        for mode in args.modes:
+            r = measure(mode, snapshot if mode != "shared" else shared, n, queries)
+            print(f"{r['mode']:<8}{r['workers']:>8}{r['startup_s']:>11.2f}{r['wall_s']:>10.2f}"
+                  f"{r['rss_mb']:>9.1f}{r['pss_mb']:>9.1f}{r['uss_mb']:>9.1f}{r['total_pss_mb']:>10.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+# benchmarks/suite.py
+#
+# Reproducible benchmarks for the routing / dispatch / ETA hot paths.
+#
+#   python -m benchmarks.suite --network grid --size 6 --out bench_baseline.json
+#   python -m benchmarks.suite --network grid --size 6 --compare bench_baseline.json
+#   python -m benchmarks.suite --snapshot data/graphs/Town04_2.0_<fingerprint>.pkl
+#   python -m benchmarks.suite --network grid --size 6 --landmarks 16
+#
+# Networks are synthetic fake‑map towns (grid / ring / highway) built through
+# the real CarlaGraph.build_graph, or a saved graph snapshot.  Every stage runs
+# a seeded workload after a short warm‑up, --repeats times, and records the
+# median over the repeats of its latency percentiles (also relative to a
+# calibration workload timed alongside, see _calibrate), throughput and peak
+# traced memory.  --compare refuses baselines of another network / size /
+# lanes / resolution and exits with status 1 when a stage's p50 latency or
+# peak memory grows by more than --threshold over the baseline; p99 only
+# gates stages with at least MIN_P99_SAMPLES latencies per pass, otherwise it
+# is reported without failing.  The suite re‑executes itself with a fixed
+# PYTHONHASHSEED: string hashing moves dict / set layouts between processes,
+# which alone shifts some stages' latency by up to 2×.
+
+import argparse
+import gc
+import heapq
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from core.fleet_manager import FleetManager
+from core.logger import configure
+from routing.extract_features import extract_features
+from routing.graph_builder import CarlaGraph
+from routing.landmarks import compute_landmarks
+from routing.route_gen import RouteGenerator
+from routing.snapshot import load_snapshot
+from utils.fake_map import TOWNS, FakeMap, FakeWorld
+
+STAGES = ("build", "dijkstra", "k_shortest", "features", "eta", "dispatch")
+META_KEYS       = ("network", "size", "lanes", "resolution", "hash_seed")   # must match to compare
+HASH_SEED       = "0"
+MIN_P99_SAMPLES = 200          # below this per pass p99 is the tail of a handful of samples
+
+
+# ---------------------------------------------------------------------------
+# Measurement helpers
+# ---------------------------------------------------------------------------
+
+def _percentile(sorted_vals, q):
+    if not sorted_vals:
+        return None
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+def _pass(fn, items):
+    gc.collect()
+    gc.disable()
+    try:
+        return _timed_pass(fn, items)
+    finally:
+        gc.enable()
+
+
+# A fixed dict / heap workload in the style of the graph searches.  The
+# benchmark hosts are shared vCPUs whose speed drifts by up to 2× within a
+# few seconds, so each pass also times this workload between its items and
+# reports p50 / p99 in units of it (p50_rel / p99_rel): the host speed cancels out.
+_CALIB_OPS   = [((i * 7919) % 5003, (i * 104729) % 997 / 997.0) for i in range(2000)]
+_CALIB_EVERY = 0.005           # s of stage work between two calibration samples
+
+
+def _calibrate():
+    dist, heap = {}, []
+    s = time.perf_counter()
+    for k, v in _CALIB_OPS:
+        dist[k] = dist.get(k, 0.0) + v
+        heapq.heappush(heap, (dist[k], k))
+        if len(heap) > 64:
+            heapq.heappop(heap)
+    return time.perf_counter() - s
+
+
+def _timed_pass(fn, items):
+    lat, calib = [], [_calibrate()]
+    wall, since = 0.0, 0.0
+    for item in items:
+        s = time.perf_counter()
+        fn(item)
+        dt = time.perf_counter() - s
+        lat.append(dt)
+        wall  += dt
+        since += dt
+        if since >= _CALIB_EVERY:
+            calib.append(_calibrate())
+            since = 0.0
+    lat.sort()
+    unit = statistics.median(calib)
+    return {
+        "p50_rel":        _percentile(lat, 0.50) / unit if lat else None,
+        "p99_rel":        _percentile(lat, 0.99) / unit if lat else None,
+        "p50_ms":         _percentile(lat, 0.50),
+        "p90_ms":         _percentile(lat, 0.90),
+        "p99_ms":         _percentile(lat, 0.99),
+        "mean_ms":        sum(lat) / len(lat) if lat else None,
+        "throughput_ops": len(items) / wall if wall else None,
+    }
+
+
+def measure(fn, items, mem_items=20, repeats=5, warmup=3):
+    """
+    Latency per item, throughput, and peak traced memory: `warmup` untimed
+    calls, then `repeats` timed passes over `items`; each figure is the
+    median over the passes.
+    """
+    for item in items[:warmup]:
+        fn(item)
+    passes = [_pass(fn, items) for _ in range(max(1, repeats))]
+
+    tracemalloc.start()
+    for item in items[:mem_items]:
+        fn(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    def median(key, scale=1.0, digits=4):
+        vals = [p[key] for p in passes if p[key] is not None]
+        return round(statistics.median(vals) * scale, digits) if vals else None
+
+    return {
+        "ops":            len(items),
+        "repeats":        len(passes),
+        "p50_rel":        median("p50_rel"),
+        "p99_rel":        median("p99_rel"),
+        "p50_ms":         median("p50_ms", 1000.0),
+        "p90_ms":         median("p90_ms", 1000.0),
+        "p99_ms":         median("p99_ms", 1000.0),
+        "mean_ms":        median("mean_ms", 1000.0),
+        "throughput_ops": median("throughput_ops", digits=2),
+        "peak_mem_kb":    round(peak / 1024.0, 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Workload setup
+# ---------------------------------------------------------------------------
+
+def make_world(args):
+    town = TOWNS[args.network]
+    if args.network == "grid":
+        return town(rows=args.size, cols=args.size, lanes=args.lanes)
+    if args.network == "ring":
+        return town(segments=args.size * 4, lanes=args.lanes)
+    return town(exits=args.size, lanes=max(args.lanes, 2))
+
+
+def make_graph(args):
+    if args.snapshot:
+        return load_snapshot(args.snapshot, world=FakeWorld(FakeMap([], name="snapshot"))), None
+    world = make_world(args)
+    graph = CarlaGraph(world, resolution=args.resolution)
+    graph.build_graph()
+    return graph, world
+
+
+def od_pairs(graph, n, rng):
+    nodes = sorted(graph.node_lookup)
+    return [tuple(rng.sample(nodes, 2)) for _ in range(n)]
+
+
+def make_eta_model(args, feature_rows, rng):
+    """ETAEstimator from --model, or one trained on synthetic labels."""
+    try:
+        from routing.ai_router import ETAEstimator
+        if args.model:
+            return ETAEstimator(args.model), None
+        from data.models.eta_model import ETAModel
+    except ImportError as e:
+        return None, f"missing dependency: {e.name}"
+
+    X = [row for row in feature_rows if row] or [[100.0, 1, 1, 2.5, 30.0, 8, 0, 0]]
+    X = [list(rng.choice(X)) for _ in range(400)]
+    for row in X:
+        row[0] *= rng.uniform(0.5, 1.5)
+    y = [row[0] / 8.0 + 6.0 * row[1] + 4.0 * row[2] + rng.gauss(0, 3) for row in X]
+    model = ETAModel()
+    model.train(X, y)
+    path = os.path.join(tempfile.mkdtemp(), "bench_eta.pkl")
+    model.save(path)
+    return ETAEstimator(path), None
+
+
+class _BenchTaxi:
+    def __init__(self, tid, location):
+        self.id, self._loc = tid, location
+
+    def get_location(self):
+        return self._loc
+
+
+class _Ride:
+    def __init__(self, pickup):
+        self.pickup = pickup
+
+
+# ---------------------------------------------------------------------------
+# Suite
+# ---------------------------------------------------------------------------
+
+def run_suite(args):
+    rng     = random.Random(args.seed)
+    results = {}
+    stages  = args.stages
+
+    if "build" in stages and not args.snapshot:
+        results["build"] = measure(lambda _: CarlaGraph(make_world(args),
+                                                        args.resolution).build_graph(),
+                                   list(range(args.build_repeat)), mem_items=1,
+                                   repeats=args.repeats, warmup=0)
+
+    graph, world = make_graph(args)
+    if args.landmarks and graph.landmarks is None:
+        graph.landmarks = compute_landmarks(graph, args.landmarks)
+    world     = world or graph.world
+    route_gen = RouteGenerator(graph)
+    pairs     = od_pairs(graph, args.queries, rng)
+    loc       = lambda nid: graph.get_waypoint(nid).location
+
+    if "dijkstra" in stages:
+        results["dijkstra"] = measure(lambda p: route_gen.dijkstra(p[0], p[1], draw=False), pairs,
+                                      repeats=args.repeats, warmup=args.warmup)
+
+    if "k_shortest" in stages:
+        kpairs = pairs[:args.k_queries]
+        results["k_shortest"] = measure(
+            lambda p: route_gen.generate_k_shortest_routes(loc(p[0]), loc(p[1]), k=args.k),
+            kpairs, mem_items=2, repeats=args.repeats, warmup=min(1, args.warmup))
+
+    routes = [r for r in (route_gen.dijkstra(a, b, draw=False) for a, b in pairs[:args.feature_queries])
+              if len(r) > 1]
+    feats  = [extract_features(r, graph, world, {}) for r in routes]
+    if "features" in stages:
+        results["features"] = measure(lambda r: extract_features(r, graph, world, {}), routes,
+                                      repeats=args.repeats, warmup=args.warmup)
+
+    model = None
+    if "eta" in stages or "dispatch" in stages:
+        model, reason = make_eta_model(args, feats, rng)
+        if model is None:
+            for stage in ("eta", "dispatch"):
+                if stage in stages:
+                    results[stage] = {"skipped": reason}
+
+    if model is not None and "eta" in stages:
+        results["eta"] = measure(model.predict_eta, feats * max(1, args.eta_repeat),
+                                 repeats=args.repeats, warmup=args.warmup)
+
+    if model is not None and "dispatch" in stages:
+        from core.dispatcher import Dispatcher
+
+        nodes = sorted(graph.node_lookup)
+        taxis = [_BenchTaxi(i, loc(rng.choice(nodes))) for i in range(args.fleet)]
+        fleet = FleetManager(taxis)
+        disp  = Dispatcher(fleet, graph, route_gen, world, {}, model=model)
+        rides = [_Ride(loc(rng.choice(nodes))) for _ in range(args.dispatch_queries)]
+
+        def one(ride):
+            disp.dispatch(ride)
+            fleet.available = set(fleet.taxis)
+
+        results["dispatch"] = measure(one, rides, mem_items=3,
+                                      repeats=args.repeats, warmup=args.warmup)
+
+    return {
+        "meta": {
+            "network":    "snapshot:" + args.snapshot if args.snapshot else args.network,
+            "size":       args.size,
+            "lanes":      args.lanes,
+            "resolution": args.resolution,
+            "seed":       args.seed,
+            "hash_seed":  os.environ.get("PYTHONHASHSEED"),
+            "nodes":      len(graph.node_lookup),
+            "edges":      sum(len(e) for e in graph.graph.values()),
+            "python":     platform.python_version(),
+            "machine":    platform.machine(),
+            "commit":     _git_commit(),
+            "timestamp":  round(time.time()),
+        },
+        "stages": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    (regressions, notes) as human‑readable lines; regressions fail the run.
+    p50 and peak memory always gate; p99 only with MIN_P99_SAMPLES per pass
+    in both runs, else a p99 slowdown is a note.  Latencies compare host‑speed
+    normalised (*_rel) when both reports have them, milliseconds otherwise.
+    """
+    mismatch = [f"{k}: {baseline.get('meta', {}).get(k)!r} vs {current['meta'].get(k)!r}"
+                for k in META_KEYS if baseline.get("meta", {}).get(k) != current["meta"].get(k)]
+    if mismatch:
+        raise ValueError("baseline was run on another workload (" + ", ".join(mismatch) + ")")
+    regressions, notes = [], []
+    for stage, base in baseline.get("stages", {}).items():
+        cur = current["stages"].get(stage)
+        if not cur or "skipped" in cur or "skipped" in base:
+            continue
+        gate_p99 = min(base.get("ops", 0), cur.get("ops", 0)) >= MIN_P99_SAMPLES
+        for metric in ("p50", "p99", "peak_mem_kb"):
+            if metric != "peak_mem_kb":
+                rel    = f"{metric}_rel"
+                metric = rel if base.get(rel) and cur.get(rel) else f"{metric}_ms"
+            b, c = base.get(metric), cur.get(metric)
+            if b and c and c > b * (1.0 + threshold):
+                line = f"{stage}.{metric}: {b} → {c} (+{(c / b - 1) * 100:.0f}%)"
+                if metric.startswith("p99") and not gate_p99:
+                    notes.append(line + f" – not gated, {cur.get('ops')} samples per pass")
+                else:
+                    regressions.append(line)
+    return regressions, notes
+
+
+def _print_table(report):
+    print(f"{'stage':<11}{'ops':>6}{'p50 ms':>11}{'p99 ms':>11}{'ops/s':>11}{'peak KB':>11}")
+    for stage, r in report["stages"].items():
+        if "skipped" in r:
+            print(f"{stage:<11}  skipped ({r['skipped']})")
+            continue
+        print(f"{stage:<11}{r['ops']:>6}{r['p50_ms']:>11}{r['p99_ms']:>11}"
+              f"{r['throughput_ops']:>11}{r['peak_mem_kb']:>11}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="routing / dispatch / ETA benchmarks")
+    ap.add_argument("--network",    choices=sorted(TOWNS), default="grid")
+    ap.add_argument("--snapshot",   default=None, help="saved graph snapshot instead of a fake town")
+    ap.add_argument("--size",       type=int,   default=5)
+    ap.add_argument("--lanes",      type=int,   default=1)
+    ap.add_argument("--resolution", type=float, default=2.0)
+    ap.add_argument("--seed",       type=int,   default=42)
+    ap.add_argument("--stages",     nargs="+",  default=list(STAGES), choices=STAGES)
+    ap.add_argument("--queries",          type=int, default=200)
+    ap.add_argument("--k",                type=int, default=3)
+    ap.add_argument("--k-queries",        type=int, default=6)
+    ap.add_argument("--landmarks",        type=int, default=0,
+                    help="ALT landmarks for a built town (snapshots use their own)")
+    ap.add_argument("--feature-queries",  type=int, default=50)
+    ap.add_argument("--eta-repeat",       type=int, default=10)
+    ap.add_argument("--dispatch-queries", type=int, default=20)
+    ap.add_argument("--fleet",            type=int, default=10)
+    ap.add_argument("--build-repeat",     type=int, default=3)
+    ap.add_argument("--repeats",          type=int, default=5,
+                    help="timed passes per stage; the median is reported")
+    ap.add_argument("--warmup",           type=int, default=3, help="untimed calls per stage")
+    ap.add_argument("--model",      default=None, help="ETA model .pkl (default: train a small one)")
+    ap.add_argument("--out",        default=None, help="write results as a baseline JSON file")
+    ap.add_argument("--compare",    default=None, help="baseline JSON to compare against")
+    ap.add_argument("--threshold",  type=float, default=0.25, help="allowed relative slowdown")
+    args = ap.parse_args()
+    if os.environ.get("PYTHONHASHSEED") is None:
+        os.execve(sys.executable, [sys.executable, "-m", "benchmarks.suite", *sys.argv[1:]],
+                  dict(os.environ, PYTHONHASHSEED=HASH_SEED))
+    configure(level="WARNING", metrics=False)
+
+    report = run_suite(args)
+    _print_table(report)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 baseline written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        try:
+            regressions, notes = compare(report, baseline, args.threshold)
+        except ValueError as e:
+            raise SystemExit(f"❌ refusing to compare with {args.compare}: {e}")
+        for n in notes:
+            print("⚠️  " + n)
+        if regressions:
+            print("❌ regressions over baseline:")
+            for r in regressions:
+                print("   " + r)
+            raise SystemExit(1)
+        print(f"✅ no stage regressed more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# benchmarks/turn_routing_bench.py
+#
+# Edge‑typed, direction‑aware graph vs the old undirected one on a fake town:
+#   • route quality: edges driven against the lane, lane changes per route
+#   • query time: node‑based vs edge‑based (line‑graph) search on the typed
+#     graph; exits 1 when the edge‑based p50 exceeds --max-factor × node‑based
+#   • a turn restriction the edge‑based search honours
+#   python -m benchmarks.turn_routing_bench --size 5 --lanes 2 --queries 100
+
+import argparse
+import math
+import random
+import time
+
+from core.logger import configure
+from routing.graph_builder import CarlaGraph, JUNCTION_TURN
+from routing.route_gen import RouteGenerator
+from utils.fake_map import grid_town
+
+NO_PENALTIES = {k: 0.0 for k in ("forward", "lane_change", "junction_turn", "u_turn",
+                                 "turn_straight", "turn_right", "turn_left")}
+
+
+def against_lane(graph, a, b):
+    """True when a→b stays on one lane but runs opposite to its heading."""
+    if a[2:] != b[2:]:
+        return False
+    yaw = math.radians(graph.get_waypoint(a).yaw)
+    return math.cos(yaw) * (b[0] - a[0]) + math.sin(yaw) * (b[1] - a[1]) < 0
+
+
+def quality(graph, routes):
+    backwards = lane_changes = bad_routes = 0
+    for route in routes:
+        rev = sum(against_lane(graph, a, b) for a, b in zip(route[:-1], route[1:]))
+        backwards   += rev
+        bad_routes  += rev > 0
+        lane_changes += sum(a[2] == b[2] and a[3] != b[3] for a, b in zip(route[:-1], route[1:]))
+    n = max(1, len(routes))
+    return bad_routes / n, backwards / n, lane_changes / n
+
+
+def timed_routes(route_gen, pairs):
+    lat, routes = [], []
+    for a, b in pairs:
+        t0 = time.perf_counter()
+        routes.append(route_gen.dijkstra(a, b, draw=False))
+        lat.append(time.perf_counter() - t0)
+    lat.sort()
+    return routes, lat[len(lat) // 2] * 1000, lat[int(0.99 * (len(lat) - 1))] * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size",       type=int,   default=5)
+    ap.add_argument("--lanes",      type=int,   default=2)
+    ap.add_argument("--queries",    type=int,   default=100)
+    ap.add_argument("--seed",       type=int,   default=0)
+    ap.add_argument("--max-factor", type=float, default=3.0,
+                    help="allowed edge‑based / node‑based p50 ratio")
+    args = ap.parse_args()
+    configure(level="ERROR")
+
+    world = grid_town(args.size, args.size, lanes=args.lanes)
+    legacy = CarlaGraph(world, directed=False, penalties=NO_PENALTIES)
+    legacy.build_graph()
+    typed = CarlaGraph(world)
+    typed.build_graph()
+
+    rng   = random.Random(args.seed)
+    nodes = sorted(set(legacy.node_lookup) & set(typed.node_lookup))
+    pairs = [tuple(rng.sample(nodes, 2)) for _ in range(args.queries)]
+
+    print(f"{'graph / search':<26}{'p50 ms':>9}{'p99 ms':>9}{'bad %':>8}"
+          f"{'rev/route':>11}{'LC/route':>10}")
+    results = {}
+    for name, graph, edge_based in (("undirected / node", legacy, False),
+                                    ("typed / node",      typed,  False),
+                                    ("typed / edge",      typed,  True)):
+        routes, p50, p99 = timed_routes(RouteGenerator(graph, edge_based=edge_based), pairs)
+        bad, rev, lc = quality(graph, [r for r in routes if r])
+        results[name] = p50
+        print(f"{name:<26}{p50:>9.2f}{p99:>9.2f}{bad * 100:>8.1f}{rev:>11.2f}{lc:>10.2f}")
+
+    factor = results["typed / edge"] / results["typed / node"]
+    print(f"edge‑based / node‑based p50: ×{factor:.2f} (limit ×{args.max_factor})")
+
+    # turn restriction: ban the first junction turn of some route, re‑plan
+    edge_rg, node_rg = RouteGenerator(typed, edge_based=True), RouteGenerator(typed, edge_based=False)
+    for a, b in pairs:
+        route = edge_rg.dijkstra(a, b, draw=False)
+        turns = [(u, v) for u, v in zip(route[:-1], route[1:])
+                 if typed.edge_type(u, v) == JUNCTION_TURN and u[2] != v[2]]
+        if not turns:
+            continue
+        u, v = turns[0]
+        out_road = next(n[2] for n in route[route.index(v):] if not typed.get_waypoint(n).is_junction)
+        added = typed.restrict_turn(u[2], out_road)
+        detour   = edge_rg.dijkstra(a, b, draw=False)
+        ignoring = node_rg.dijkstra(a, b, draw=False)
+        uses = lambda r: any(r[i:i + 3] == list(t) for t in typed.turn_restrictions
+                             for i in range(len(r) - 2))
+        print(f"restrict road {u[2]} → {out_road} ({added} triples): "
+              f"edge‑based uses it={uses(detour)} ({len(route)}→{len(detour)} nodes), "
+              f"node‑based uses it={uses(ignoring)}")
+        break
+
+    if factor > args.max_factor:
+        raise SystemExit(f"❌ edge‑based search slower than ×{args.max_factor}")
+
+
+if __name__ == "__main__":
+    main()
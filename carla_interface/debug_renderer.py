@@ -0,0 +1,214 @@
+# carla_interface/debug_renderer.py
+#
+# Queued, throttled replacement for direct world.debug.draw_* calls.
+#   • callers only enqueue primitives (no RPC on the routing hot path)
+#   • a background thread drains the queue at most `max_per_tick` RPCs per tick
+#   • primitives farther than `radius` from the spectator are culled
+#   • polylines are simplified (Douglas–Peucker) before they are queued
+#   • config.DEBUG_DRAW = False → get_renderer() returns a shared no‑op
+#
+#   renderer = get_renderer(world)
+#   renderer.polyline(points, color=(0, 255, 0), life_time=10.0)
+
+import math
+import threading
+import time
+from collections import deque
+
+import config
+from core.logger import get_logger, incr
+
+try:
+    import carla
+    _Location, _Color = carla.Location, carla.Color
+except ImportError:
+    from utils.fake_map import FakeLocation as _Location
+    carla  = None
+    _Color = lambda r, g, b: (r, g, b)
+
+log = get_logger("debug_draw")
+
+
+def _xyz(p):
+    if hasattr(p, "x"):                 # Location / NodeRecord
+        return (p.x, p.y, p.z)
+    if hasattr(p, "transform"):         # live carla.Waypoint
+        p = p.transform.location
+        return (p.x, p.y, p.z)
+    return (p[0], p[1], p[2] if len(p) > 2 else 0.0)
+
+
+def simplify(points, tolerance):
+    """Douglas–Peucker on (x, y, z) tuples; keeps both end points."""
+    if tolerance <= 0 or len(points) < 3:
+        return list(points)
+    keep  = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        a, b = stack.pop()
+        ax, ay = points[a][0], points[a][1]
+        bx, by = points[b][0], points[b][1]
+        dx, dy = bx - ax, by - ay
+        norm   = math.hypot(dx, dy) or 1e-9
+        worst, idx = 0.0, None
+        for i in range(a + 1, b):
+            d = abs(dy * (points[i][0] - ax) - dx * (points[i][1] - ay)) / norm
+            if d > worst:
+                worst, idx = d, i
+        if idx is not None and worst > tolerance:
+            keep[idx] = True
+            stack.append((a, idx))
+            stack.append((idx, b))
+    return [p for p, k in zip(points, keep) if k]
+
+
+class DebugRenderer:
+    enabled = True
+
+    def __init__(self, world, radius=None, max_per_tick=None, tick_interval=0.05,
+                 tolerance=0.5, max_queue=50_000, background=True):
+        self.world         = world
+        self.radius        = radius if radius is not None else config.DEBUG_DRAW_RADIUS
+        self.max_per_tick  = max_per_tick or config.DEBUG_DRAW_MAX_PER_TICK
+        self.tick_interval = tick_interval
+        self.tolerance     = tolerance
+        self.queue         = deque(maxlen=max_queue)   # oldest dropped on overflow
+        self.drawn = self.culled = self.expired = 0
+        self._stop   = threading.Event()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, name="debug-renderer",
+                                            daemon=True)
+            self._thread.start()
+
+    # ---------- enqueue (cheap, no RPC) -----------------------------------------
+
+    # items: (kind, p, p2/text, color, thickness, life_time, queued_at, cull)
+
+    def string(self, location, text, color=(255, 255, 255), life_time=5.0, z=0.0,
+               cull=True):
+        x, y, zz = _xyz(location)
+        self.queue.append(("s", (x, y, zz + z), text, color, None, life_time,
+                           time.monotonic(), cull))
+
+    def line(self, a, b, color=(0, 255, 0), thickness=0.1, life_time=5.0, z=0.0,
+             cull=True):
+        ax, ay, az = _xyz(a)
+        bx, by, bz = _xyz(b)
+        self.queue.append(("l", (ax, ay, az + z), (bx, by, bz + z), color, thickness,
+                           life_time, time.monotonic(), cull))
+
+    def points(self, locations, text="O", color=(0, 255, 0), life_time=5.0, z=0.0):
+        now = time.monotonic()
+        for loc in locations:
+            x, y, zz = _xyz(loc)
+            self.queue.append(("s", (x, y, zz + z), text, color, None, life_time, now, True))
+
+    def polyline(self, points, color=(0, 255, 0), thickness=0.1, life_time=5.0, z=0.0,
+                 cull=True):
+        pts = simplify([_xyz(p) for p in points], self.tolerance)
+        now = time.monotonic()
+        for a, b in zip(pts[:-1], pts[1:]):
+            self.queue.append(("l", (a[0], a[1], a[2] + z), (b[0], b[1], b[2] + z),
+                               color, thickness, life_time, now, cull))
+
+    # ---------- drain -----------------------------------------------------------
+
+    def _center(self):
+        try:
+            loc = self.world.get_spectator().get_transform().location
+            return loc.x, loc.y
+        except AttributeError:          # no spectator (fake world / headless)
+            return None
+
+    def flush(self, budget=None):
+        """Issue up to `budget` draw RPCs; returns how many were drawn."""
+        budget = budget or self.max_per_tick
+        center = self._center() if self.radius else None
+        r2     = self.radius * self.radius if self.radius else None
+        now    = time.monotonic()
+        debug  = self.world.debug
+        drawn  = 0
+        while drawn < budget and self.queue:
+            kind, p, other, color, thick, life, queued, cull = self.queue.popleft()
+            remaining = life - (now - queued)
+            if remaining <= 0:                              # life time already over
+                self.expired += 1
+                continue
+            if cull and center is not None and \
+               (p[0] - center[0]) ** 2 + (p[1] - center[1]) ** 2 > r2:
+                self.culled += 1
+                continue
+            if kind == "s":
+                debug.draw_string(_Location(*p), other, draw_shadow=False,
+                                  color=_Color(*color), life_time=remaining)
+            else:
+                debug.draw_line(_Location(*p), _Location(*other), thickness=thick,
+                                color=_Color(*color), life_time=remaining)
+            drawn += 1
+        self.drawn += drawn
+        incr("debug_draw_rpcs", drawn)
+        return drawn
+
+    def _run(self):
+        while not self._stop.wait(self.tick_interval):
+            if self.queue:
+                try:
+                    self.flush()
+                except RuntimeError as e:    # simulator went away
+                    log.warning("debug draw failed", error=str(e))
+                    self.queue.clear()
+
+    def close(self, drain=True):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        while drain and self.queue:
+            self.flush()
+
+    def stats(self):
+        return {"queued": len(self.queue), "drawn": self.drawn,
+                "culled": self.culled, "expired": self.expired}
+
+
+class NullRenderer:
+    """Shared no‑op used when config.DEBUG_DRAW is False."""
+    enabled = False
+
+    def string(self, *args, **kwargs):
+        pass
+
+    def line(self, *args, **kwargs):
+        pass
+
+    def points(self, *args, **kwargs):
+        pass
+
+    def polyline(self, *args, **kwargs):
+        pass
+
+    def flush(self, budget=None):
+        return 0
+
+    def close(self, drain=True):
+        pass
+
+    def stats(self):
+        return {}
+
+
+NULL_RENDERER = NullRenderer()
+_renderers    = {}
+_lock         = threading.Lock()
+
+
+def get_renderer(world):
+    """One renderer per world; NULL_RENDERER when drawing is switched off."""
+    if not config.DEBUG_DRAW or world is None:
+        return NULL_RENDERER
+    with _lock:
+        renderer = _renderers.get(id(world))
+        if renderer is None:
+            renderer = _renderers[id(world)] = DebugRenderer(world)
+        return renderer
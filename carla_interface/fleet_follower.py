@@ -0,0 +1,150 @@
+# carla_interface/fleet_follower.py
+#
+# Pure pursuit for a whole fleet in one NumPy step.
+#   • same control law as taxi_agent.PurePursuitFollower: drop route points
+#     closer than the lookahead, steer = 2·y_v / L², fixed throttle below the
+#     target speed – lookahead and target speed are per‑vehicle arrays
+#   • every route lives in one flat (n, 2) array; a vehicle owns [start, end)
+#     of it plus a cursor, so nothing is popped from Python lists
+#   • step() takes pose arrays (x, y, yaw°, speed) and returns throttle / steer
+#     / brake arrays and the still‑driving mask, one row per vehicle
+#   • poses come from one world snapshot (CARLA) or core.kinematic_fleet
+#     (headless); commands() turns a step into ApplyVehicleControl commands
+#     for client.apply_batch – one RPC per tick for the whole fleet
+#
+#   fleet = FleetFollower()
+#   for v, route in zip(vehicles, routes):
+#       fleet.add(v.id, route, target_kph=30)
+#   while fleet.active.any():
+#       world.tick()
+#       ctrl = fleet.step(*fleet.poses(world.get_snapshot()))
+#       client.apply_batch(fleet.commands(ctrl))
+
+from collections import namedtuple
+
+import numpy as np
+
+from utils.helpers import to_xy
+
+try:
+    import carla
+except ImportError:          # headless: controls come back as arrays only
+    carla = None
+
+Controls = namedtuple("Controls", "throttle steer brake active")
+
+
+class FleetFollower:
+    def __init__(self, lookahead=6.0, target_kph=25, throttle=0.6):
+        self.default_lookahead = lookahead
+        self.default_kph       = target_kph
+        self.throttle_value    = throttle
+        self.ids       = []                      # slot → actor id
+        self.slot      = {}                      # actor id → slot
+        self._pts      = np.zeros((0, 2))        # all routes, back to back
+        self._dead     = 0                       # points of replaced routes
+        self.start     = np.zeros(0, dtype=np.int64)
+        self.end       = np.zeros(0, dtype=np.int64)
+        self.cursor    = np.zeros(0, dtype=np.int64)
+        self.lookahead = np.zeros(0)
+        self.target_v  = np.zeros(0)             # m/s
+        self.active    = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ---------- routes ----------------------------------------------------------
+
+    def add(self, vehicle_id, route, lookahead=None, target_kph=None):
+        """Start (or replace) a vehicle's route; returns its slot."""
+        pts = np.asarray([to_xy(p) for p in route], dtype=float).reshape(-1, 2)
+        s   = self.slot.get(vehicle_id)
+        if s is None:
+            s = self.slot[vehicle_id] = len(self.ids)
+            self.ids.append(vehicle_id)
+            grow = lambda a, v: np.append(a, np.asarray([v], dtype=a.dtype))
+            self.start, self.end, self.cursor = (grow(a, 0) for a in (self.start, self.end, self.cursor))
+            self.lookahead, self.target_v = grow(self.lookahead, 0.0), grow(self.target_v, 0.0)
+            self.active = grow(self.active, False)
+        else:
+            self._dead += int(self.end[s] - self.start[s])
+        base = len(self._pts)
+        self._pts = np.concatenate([self._pts, pts])
+        self.start[s] = self.cursor[s] = base
+        self.end[s]       = base + len(pts)
+        self.lookahead[s] = self.default_lookahead if lookahead is None else lookahead
+        self.target_v[s]  = (self.default_kph if target_kph is None else target_kph) / 3.6
+        self.active[s]    = len(pts) > 0
+        if self._dead > len(self._pts) // 2:
+            self._compact()
+        return s
+
+    def remove(self, vehicle_id):
+        """Stop steering a vehicle (its slot stays, braking, until re‑added)."""
+        s = self.slot[vehicle_id]
+        self.active[s] = False
+
+    def _compact(self):
+        keep = [np.arange(a, b) for a, b in zip(self.start, self.end)]
+        lens = np.array([len(k) for k in keep], dtype=np.int64)
+        new_start = np.r_[0, np.cumsum(lens)[:-1]].astype(np.int64)
+        self.cursor = new_start + (self.cursor - self.start)
+        self._pts   = self._pts[np.concatenate(keep)] if keep else self._pts[:0]
+        self.start, self.end = new_start, new_start + lens
+        self._dead  = 0
+
+    # ---------- control ---------------------------------------------------------
+
+    def step(self, x, y, yaw, speed):
+        """
+        One control step for every slot.  x, y (m), yaw (degrees), speed (m/s)
+        are arrays in slot order.  Finished / removed vehicles brake.
+        """
+        pts, cursor, end = self._pts, self.cursor, self.end
+        la2 = self.lookahead * self.lookahead
+
+        # advance cursors past every point inside the lookahead circle
+        idx = np.flatnonzero(self.active)
+        while idx.size:
+            c    = cursor[idx]
+            near = (pts[c, 0] - x[idx]) ** 2 + (pts[c, 1] - y[idx]) ** 2 < la2[idx]
+            idx  = idx[near]
+            cursor[idx] += 1
+            done = cursor[idx] >= end[idx]
+            self.active[idx[done]] = False
+            idx  = idx[~done]
+
+        n, act = len(self.ids), self.active
+        throttle, steer, brake = np.zeros(n), np.zeros(n), np.where(act, 0.0, 1.0)
+        idx = np.flatnonzero(act)
+        if idx.size:
+            tgt  = pts[cursor[idx]]
+            dx   = tgt[:, 0] - x[idx]
+            dy   = tgt[:, 1] - y[idx]
+            rad  = np.radians(yaw[idx])
+            y_v  = -np.sin(rad) * dx + np.cos(rad) * dy
+            steer[idx]    = np.clip(2.0 * y_v / la2[idx], -1.0, 1.0)
+            throttle[idx] = np.where(speed[idx] < self.target_v[idx], self.throttle_value, 0.0)
+        return Controls(throttle, steer, brake, act.copy())
+
+    # ---------- CARLA I/O -------------------------------------------------------
+
+    def poses(self, snapshot):
+        """(x, y, yaw°, speed) arrays from one carla.WorldSnapshot – no per‑actor RPCs."""
+        n = len(self.ids)
+        x, y, yaw, speed = np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n)
+        for i, vid in enumerate(self.ids):
+            actor = snapshot.find(vid)
+            if actor is None:                    # destroyed: stop steering it
+                self.active[i] = False
+                continue
+            t, v = actor.get_transform(), actor.get_velocity()
+            x[i], y[i], yaw[i] = t.location.x, t.location.y, t.rotation.yaw
+            speed[i] = (v.x * v.x + v.y * v.y) ** 0.5
+        return x, y, yaw, speed
+
+    def commands(self, controls):
+        """[carla.command.ApplyVehicleControl] for client.apply_batch(_sync)."""
+        apply, vc = carla.command.ApplyVehicleControl, carla.VehicleControl
+        return [apply(vid, vc(throttle=float(t), steer=float(s), brake=float(b)))
+                for vid, t, s, b in zip(self.ids, controls.throttle, controls.steer, controls.brake)]
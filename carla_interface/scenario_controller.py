@@ -1,6 +1,10 @@
 from carla import Vehicle, Transform
 import random
 
+from core.logger import get_logger
+
+log = get_logger("scenario")
+
 def spawn_background_vehicles(world, client, traffic_manager, count=20):
     blueprint_library = world.get_blueprint_library()
     vehicle_bps = blueprint_library.filter('vehicle.*')
@@ -21,5 +25,5 @@ def spawn_background_vehicles(world, client, traffic_manager, count=20):
         except:
             continue
 
-    print(f"🚗 Spawned {len(vehicles)} background vehicles.")
+    log.info("spawned background vehicles", count=len(vehicles))
     return vehicles
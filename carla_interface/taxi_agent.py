@@ -1,17 +1,27 @@
 # carla_interface/taxi_agent.py   (works on CARLA 0.9.10‑0.9.12)
+from __future__ import annotations
 import math, time
-import carla
+
+from utils.helpers import to_xy
+
+try:
+    import carla
+    VehicleControl = carla.VehicleControl
+except ImportError:          # headless: benchmarks drive utils.fake_map bodies
+    carla = None
+    from utils.fake_map import FakeVehicleControl as VehicleControl
 
 
 # ---------------------------------------------------------------------------
 # Local planner: very small pure‑pursuit controller
+# (carla_interface.fleet_follower runs the same law for a whole fleet at once)
 # ---------------------------------------------------------------------------
 
 class PurePursuitFollower:
     def __init__(self, vehicle, world, route, lookahead=6.0, target_kph=25):
         self.vehicle    = vehicle
         self.world      = world
-        self.route      = route[:]            # list[carla.Waypoint]
+        self.route      = [to_xy(p) for p in route]   # NodeRecords / waypoints → (x, y)
         self.lookahead  = lookahead
         self.target_v   = target_kph / 3.6    # m/s
 
@@ -19,7 +29,8 @@ class PurePursuitFollower:
         if not self.route:
             return None
         loc = self.vehicle.get_transform().location
-        while self.route and loc.distance(self.route[0].transform.location) < self.lookahead:
+        while self.route and math.hypot(self.route[0][0] - loc.x,
+                                        self.route[0][1] - loc.y) < self.lookahead:
             self.route.pop(0)
         return self.route[0] if self.route else None
 
@@ -29,7 +40,7 @@ class PurePursuitFollower:
             return False
 
         loc = self.vehicle.get_transform().location
-        dx, dy = wp.transform.location.x - loc.x, wp.transform.location.y - loc.y
+        dx, dy = wp[0] - loc.x, wp[1] - loc.y
 
         yaw = math.radians(self.vehicle.get_transform().rotation.yaw)
         x_v =  math.cos(yaw)*dx + math.sin(yaw)*dy
@@ -42,8 +53,7 @@ class PurePursuitFollower:
         speed = math.hypot(vel.x, vel.y)
         throttle = 0.6 if speed < self.target_v else 0.0
 
-        self.vehicle.apply_control(carla.VehicleControl(throttle=throttle,
-                                                        steer=steer))
+        self.vehicle.apply_control(VehicleControl(throttle=throttle, steer=steer))
         return True
 
 
@@ -0,0 +1,65 @@
+# config.py
+#
+# Process‑wide switches.  Environment variables override the defaults.
+
+import os
+
+# CARLA debug drawing (graph nodes, search frontier, routes).  When False the
+# renderer is a no‑op singleton and routing code skips building primitives.
+DEBUG_DRAW = os.environ.get("TAXI_DEBUG_DRAW", "1") == "1"
+
+# Only primitives within this radius (m) of the spectator are drawn.
+DEBUG_DRAW_RADIUS = float(os.environ.get("TAXI_DEBUG_DRAW_RADIUS", "200"))
+
+# Upper bound on draw RPCs issued per renderer tick.
+DEBUG_DRAW_MAX_PER_TICK = int(os.environ.get("TAXI_DEBUG_DRAW_MAX_PER_TICK", "300"))
+
+# Prebuilt graph snapshots, one file per (map, resolution): <dir>/<map>_<res>.pkl
+GRAPH_SNAPSHOT_DIR = os.environ.get("TAXI_GRAPH_SNAPSHOT_DIR", os.path.join("data", "graphs"))
+
+# Resident graphs are evicted least‑recently‑used above this many MB.
+GRAPH_MEMORY_BUDGET_MB = float(os.environ.get("TAXI_GRAPH_MEMORY_BUDGET_MB", "1024"))
+
+# Search graph sampling (m).  Coarse values (10–20) keep graphs small; routes
+# are then densified to FOLLOW_SPACING along the chosen path only.
+GRAPH_RESOLUTION = float(os.environ.get("TAXI_GRAPH_RESOLUTION", "2.0"))
+FOLLOW_SPACING   = float(os.environ.get("TAXI_FOLLOW_SPACING", "2.0"))
+
+# Routing cost = edge length (m) + these penalties (m‑equivalents).  Junction
+# entries add the turn_* term for the connector's direction.
+EDGE_PENALTIES = {
+    "forward":        0.0,
+    "lane_change":    8.0,
+    "junction_turn":  3.0,
+    "u_turn":        40.0,
+    "turn_straight":  0.0,
+    "turn_right":     2.0,
+    "turn_left":      6.0,
+}
+
+# Extra cost for consecutive edge‑type pairs in the edge‑based search
+# (None = forbidden), e.g. no zig‑zag lane changes, no U‑turn after a lane change.
+TRANSITION_PENALTIES = {
+    ("lane_change", "lane_change"): 10.0,
+    ("lane_change", "u_turn"):      None,
+    ("u_turn",      "lane_change"): None,
+    ("u_turn",      "u_turn"):      None,
+}
+
+# RouteGenerator uses the edge‑based (line‑graph) search by default.
+EDGE_BASED_ROUTING = os.environ.get("TAXI_EDGE_BASED_ROUTING", "1") == "1"
+
+# Trip routes: the k shortest pickup → dropoff routes are scored by the ETA
+# model and the fastest is driven (Dispatcher.plan_ride).
+ROUTE_ALTERNATIVES = int(os.environ.get("TAXI_ROUTE_ALTERNATIVES", "3"))
+
+# ALT landmarks computed when a graph snapshot is built (0 = plain Dijkstra)
+# and how they are picked: "avoid" or "farthest" (routing.landmarks).
+ALT_LANDMARKS = int(os.environ.get("TAXI_ALT_LANDMARKS", "16"))
+ALT_SELECTION = os.environ.get("TAXI_ALT_SELECTION", "avoid")
+
+# Compiled graph / model arrays shared by dispatch worker processes (memory
+# mapped).  /dev/shm keeps them in RAM without touching disk.
+SHARED_GRAPH_DIR = os.environ.get(
+    "TAXI_SHARED_GRAPH_DIR",
+    "/dev/shm/taxi_graphs" if os.path.isdir("/dev/shm") else os.path.join("data", "shared_graphs"))
@@ -0,0 +1,164 @@
+# core/demand.py
+#
+# Pluggable ride‑demand generators.  All of them expose
+#   • generate_request(now)       → (pickup, dropoff)         (one request)
+#   • requests_between(t0, t1)    → [(t, pickup, dropoff), …] (arrivals)
+# so RequestManager, the headless simulator and the rebalancer can swap them.
+
+import json
+import math
+import random
+
+from routing.graph_builder import node_position
+
+MAX_DROPOFF_REDRAWS = 32     # then the farthest node from the pickup is the dropoff
+
+
+class DemandGenerator:
+    """Poisson arrivals with an hour‑of‑day rate profile (thinning)."""
+
+    def __init__(self, rate_per_hour=120.0, hourly_profile=None,
+                 start_hour=8, seed=None):
+        self.rng            = random.Random(seed)
+        self.rate_per_hour  = rate_per_hour
+        self.hourly_profile = hourly_profile or [1.0] * 24
+        self.start_hour     = start_hour
+        self._peak          = rate_per_hour * max(self.hourly_profile)
+        self._next_t        = None
+
+    def hour_at(self, now):
+        return int(self.start_hour + now // 3600) % 24
+
+    def rate_at(self, now):
+        return self.rate_per_hour * self.hourly_profile[self.hour_at(now)]
+
+    def sample(self, now):
+        raise NotImplementedError
+
+    def generate_request(self, now=0.0):
+        return self.sample(now)
+
+    def requests_between(self, t0, t1):
+        if self._peak <= 0:
+            return []
+        if self._next_t is None:
+            self._next_t = t0 + self.rng.expovariate(self._peak / 3600.0)
+
+        requests = []
+        while self._next_t < t1:
+            t = self._next_t
+            if self.rng.random() * self._peak <= self.rate_at(t):
+                pickup, dropoff = self.sample(t)
+                requests.append((t, pickup, dropoff))
+            self._next_t = t + self.rng.expovariate(self._peak / 3600.0)
+        return requests
+
+
+class UniformDemand(DemandGenerator):
+    """Original behaviour: pickup and dropoff drawn uniformly from `points`."""
+
+    def __init__(self, points, **kwargs):
+        super().__init__(**kwargs)
+        self.points = list(points)
+
+    def sample(self, now):
+        a, b = self.rng.sample(self.points, 2)
+        return a, b
+
+
+class HotspotDemand(DemandGenerator):
+    """
+    Spatio‑temporal hotspots on graph zones.
+
+    hotspots: list of dicts
+        {"center": (x, y), "sigma": 80.0, "weight": 3.0, "hours": (7, 10)}
+    A pickup comes from an active hotspot (Gaussian around its centre, snapped
+    to the nearest graph node) or, with probability `background`, from a
+    uniformly random node.  Dropoffs use `dropoff_hotspots` the same way,
+    redrawn uniformly while closer than 1 m to the pickup.
+    """
+
+    def __init__(self, zones, hotspots, dropoff_hotspots=None,
+                 background=0.2, **kwargs):
+        super().__init__(**kwargs)
+        self.zones            = zones
+        self.hotspots         = hotspots
+        self.dropoff_hotspots = dropoff_hotspots or []
+        self.background       = background
+        self.nodes            = [n for nodes in zones.nodes_by_zone.values() for n in nodes]
+        if len({node_position(n) for n in self.nodes}) < 2:
+            raise ValueError("HotspotDemand needs at least two graph nodes at distinct positions")
+
+    @staticmethod
+    def _active(spot, hour):
+        start, end = spot.get("hours", (0, 24))
+        return start <= hour < end if start <= end else (hour >= start or hour < end)
+
+    def _draw(self, spots, now):
+        hour   = self.hour_at(now)
+        active = [s for s in spots if self._active(s, hour)]
+        if not active or self.rng.random() < self.background:
+            return node_position(self.rng.choice(self.nodes))
+
+        spot = self.rng.choices(active, weights=[s.get("weight", 1.0) for s in active])[0]
+        cx, cy = spot["center"]
+        sigma  = spot.get("sigma", 80.0)
+        point  = (self.rng.gauss(cx, sigma), self.rng.gauss(cy, sigma))
+        return node_position(self.zones.nearest_node(point))
+
+    def sample(self, now):
+        pickup  = self._draw(self.hotspots, now)
+        dropoff = self._draw(self.dropoff_hotspots, now)
+        for _ in range(MAX_DROPOFF_REDRAWS):
+            if math.dist(pickup, dropoff) >= 1.0:
+                return pickup, dropoff
+            dropoff = node_position(self.rng.choice(self.nodes))
+        if math.dist(pickup, dropoff) < 1.0:    # tight node cluster: take what is farthest
+            dropoff = max((node_position(n) for n in self.nodes),
+                          key=lambda p: math.dist(pickup, p))
+        return pickup, dropoff
+
+
+class TraceDemand(DemandGenerator):
+    """
+    Replays a recorded request trace (JSON list or JSON lines):
+        {"t": 12.5, "pickup": [x, y], "dropoff": [x, y]}
+    With loop=True the trace repeats, shifted by its own duration.
+    """
+
+    def __init__(self, path=None, records=None, loop=False, **kwargs):
+        super().__init__(**kwargs)
+        self.records = sorted(records if records is not None else self._read(path),
+                              key=lambda r: r["t"])
+        self.loop     = loop
+        self.duration = self.records[-1]["t"] + 1.0 if self.records else 0.0
+        self._cursor  = 0
+
+    @staticmethod
+    def _read(path):
+        with open(path, "r") as f:
+            text = f.read().strip()
+        if not text:
+            return []
+        if text.startswith("["):
+            return json.loads(text)
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    def sample(self, now):
+        rec = self.records[self._cursor % len(self.records)]
+        self._cursor += 1
+        return tuple(rec["pickup"]), tuple(rec["dropoff"])
+
+    def requests_between(self, t0, t1):
+        if not self.records:
+            return []
+        requests = []
+        first_lap = int(t0 // self.duration) if self.loop else 0
+        last_lap  = int(t1 // self.duration) if self.loop else 0
+        for lap in range(first_lap, last_lap + 1):
+            offset = lap * self.duration
+            for rec in self.records:
+                t = rec["t"] + offset
+                if t0 <= t < t1:
+                    requests.append((t, tuple(rec["pickup"]), tuple(rec["dropoff"])))
+        return requests
@@ -0,0 +1,114 @@
+# core/dispatch_pool.py
+#
+# Multi‑process dispatch over a shared graph (routing.shared_graph).
+#   • the coordinator owns the fleet (FleetManager) and the only mutable state;
+#     workers are stateless: (pickup, [(taxi, node)], context) → ranked ETAs
+#   • workers are spawned fresh and attach to the compiled arrays by path –
+#     nothing graph‑sized is pickled to them or rebuilt in them
+#   • one backward search from the pickup prices every free taxi at once
+#   • the coordinator hands each request to the next idle worker process and
+#     claims the best taxi still free when the answer comes back
+#   • DispatchPool has Dispatcher's dispatch / dispatch_with_eta /
+#     fleet_manager, so core.dispatch_server can serve it unchanged
+#
+#   pool = DispatchPool(compile_shared(graph, "grid6"), fleet, workers=8)
+#   taxi, eta = pool.dispatch_with_eta(ride)
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from core.logger import get_logger, incr, span
+from routing.shared_graph import SharedGraph
+
+log = get_logger("dispatch_pool")
+
+_shared = None               # worker‑side SharedGraph
+
+
+def _attach(path):
+    global _shared
+    _shared = SharedGraph(path)
+
+
+def _rank(target, candidates, context):
+    """Worker task: [(eta seconds, taxi id)] for reachable taxis, best first."""
+    times = _shared.times_to(target, {node for _, node in candidates}, context)
+    return sorted((times[node], tid) for tid, node in candidates if node in times)
+
+
+def _ready():
+    return os.getpid()
+
+
+class DispatchPool:
+    def __init__(self, shared_path, fleet_manager, workers=None, world=None, context=None):
+        self.shared_path   = shared_path
+        self.fleet_manager = fleet_manager
+        self.world         = world               # feature_context() source, if any
+        self.context       = context
+        self.shared        = SharedGraph(shared_path)
+        self.workers       = workers or os.cpu_count() or 1
+        self._taxi_nodes   = {}                  # taxi id → (location key, node index)
+        t0 = time.perf_counter()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                         mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_attach, initargs=(shared_path,))
+        # each submit to a busy pool spawns another worker: start them all now
+        for f in [self._pool.submit(_ready) for _ in range(self.workers)]:
+            f.result()
+        self.startup_s = time.perf_counter() - t0
+        log.info("dispatch pool ready", workers=self.workers,
+                 seconds=round(self.startup_s, 2), nodes=len(self.shared))
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- coordinator -----------------------------------------------------
+
+    def _node_of(self, taxi):
+        loc = taxi.get_location()
+        key = (round(loc.x, 1), round(loc.y, 1))
+        hit = self._taxi_nodes.get(taxi.id)
+        if hit is None or hit[0] != key:
+            hit = self._taxi_nodes[taxi.id] = (key, self.shared.nearest_node(loc.x, loc.y))
+        return hit[1]
+
+    def _context(self):
+        if self.world is not None:
+            from routing.extract_features import feature_context
+            return feature_context(self.world)
+        return self.context
+
+    def submit(self, ride_request):
+        """Send one request to a worker; returns a Future of the ranked ETAs."""
+        taxis      = self.fleet_manager.get_available_taxis()
+        candidates = [(t.id, self._node_of(t)) for t in taxis]
+        target     = self.shared.nearest_node(ride_request.pickup.x, ride_request.pickup.y)
+        return self._pool.submit(_rank, target, candidates, self._context())
+
+    def claim_best(self, ranked):
+        for eta, tid in ranked:
+            if self.fleet_manager.claim(tid):
+                log.info("dispatching taxi", taxi=tid, eta=round(eta, 2))
+                return self.fleet_manager.taxis[tid], eta
+        incr("dispatch_no_route")
+        return None, None
+
+    def dispatch_with_eta(self, ride_request):
+        incr("dispatch_requests")
+        with span("dispatch"):
+            if not self.fleet_manager.available:
+                incr("dispatch_no_taxi")
+                return None, None
+            return self.claim_best(self.submit(ride_request).result())
+
+    def dispatch(self, ride_request):
+        return self.dispatch_with_eta(ride_request)[0]
@@ -0,0 +1,392 @@
+# core/dispatch_server.py
+#
+# Async dispatch API in front of Dispatcher / RouteGenerator / ETA model.
+#   • asyncio HTTP/1.1 server (keep‑alive) on localhost TCP or a Unix socket
+#   • POST /dispatch   {"pickup": [x, y, z], "dropoff": [...], "deadline_ms": 500}
+#         200 {"taxi", "eta", "queue_ms", "service_ms"}
+#         404 no taxi can reach the pickup
+#         503 queue full – request shed immediately (Retry-After: 1)
+#         504 deadline passed while queued or while routing
+#     POST /release    {"taxi": id}          taxi is free again (404 unknown taxi)
+#     GET  /health     queue depth, in‑flight, workers, shed / expired counts
+#     GET  /metrics    core.logger metrics, Prometheus text format
+#   • requests wait in a bounded asyncio.Queue; `workers` consumers each run
+#     one dispatch at a time on a thread pool, so routing never blocks the
+#     event loop and at most `workers` searches run concurrently
+#   • a dispatch that finishes after its caller gave up (504) releases the
+#     taxi it claimed
+#   • bodies are capped at 64 KB: a larger Content-Length gets 413, a
+#     malformed or negative one 400, and the connection is closed unread
+#
+#   python -m core.dispatch_server --town grid --taxis 20 --port 8765
+#   python -m core.dispatch_server --processes 8          # shared‑graph worker processes
+#   python -m core.dispatch_server --unix /tmp/taxi.sock --model data/models/online/eta_sgd
+
+import argparse
+import asyncio
+import json
+import math
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.logger import get_logger, get_metrics, gauge, incr, observe
+
+try:
+    import carla
+    _Location = carla.Location
+except ImportError:
+    from utils.fake_map import FakeLocation as _Location
+
+log = get_logger("dispatch_server")
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+            504: "Gateway Timeout"}
+_MAX_BODY = 64 * 1024
+
+
+class _Reject(Exception):
+    """Request that can't be framed: answered with `status`, then the connection closes."""
+
+    def __init__(self, status, error):
+        super().__init__(error)
+        self.status, self.error = status, error
+
+
+class RideRequest:
+    def __init__(self, pickup, dropoff=None):
+        self.pickup  = pickup
+        self.dropoff = dropoff
+
+
+def _location(value):
+    if value is None:
+        return None
+    x, y, *z = value
+    return _Location(float(x), float(y), float(z[0]) if z else 0.0)
+
+
+class _Job:
+    __slots__ = ("ride", "deadline", "enqueued", "future")
+
+    def __init__(self, ride, deadline, future):
+        self.ride     = ride
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.future   = future
+
+
+class DispatchServer:
+    def __init__(self, dispatcher, queue_size=256, workers=4, default_deadline=2.0):
+        self.dispatcher       = dispatcher
+        self.queue_size       = queue_size
+        self.workers          = workers
+        self.default_deadline = default_deadline
+        self.in_flight = self.shed = self.expired = self.served = 0
+        self._queue    = None
+        self._executor = None
+        self._server   = None
+        self._tasks    = []
+
+    # ---------- lifecycle -------------------------------------------------------
+
+    async def start(self, host="127.0.0.1", port=8765, unix=None):
+        self._queue    = asyncio.Queue(maxsize=self.queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="dispatch")
+        self._tasks    = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        if unix:
+            self._server = await asyncio.start_unix_server(self._handle, path=unix)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        log.info("dispatch server listening", address=unix or f"{host}:{self.port}",
+                 workers=self.workers, queue=self.queue_size)
+        return self
+
+    @property
+    def port(self):
+        sock = self._server.sockets[0] if self._server and self._server.sockets else None
+        name = sock.getsockname() if sock else None
+        return name[1] if isinstance(name, tuple) else None
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+    # ---------- queue / workers -------------------------------------------------
+
+    async def submit(self, ride, deadline_s=None):
+        """Queue one dispatch; returns (status, body)."""
+        loop = asyncio.get_running_loop()
+        job  = _Job(ride, time.monotonic() + (deadline_s or self.default_deadline),
+                    loop.create_future())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.shed += 1
+            incr("dispatch_shed")
+            return 503, {"error": "overloaded", "queue": self._queue.qsize()}
+        gauge("dispatch_queue_depth", self._queue.qsize())
+        return await job.future
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.future.done():
+                    job.future.set_result(await self._run(loop, job))
+            except Exception as e:                 # keep the worker alive
+                log.error("dispatch failed", error=repr(e))
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, loop, job):
+        started  = time.monotonic()
+        queue_ms = (started - job.enqueued) * 1000.0
+        observe("dispatch_queue_ms", queue_ms)
+        remaining = job.deadline - started
+        if remaining <= 0:
+            self.expired += 1
+            incr("dispatch_expired", where="queue")
+            return 504, {"error": "deadline exceeded in queue", "queue_ms": round(queue_ms, 2)}
+
+        self.in_flight += 1
+        work = self._executor.submit(self.dispatcher.dispatch_with_eta, job.ride)
+        try:
+            taxi, eta = await asyncio.wait_for(asyncio.wrap_future(work, loop=loop), remaining)
+        except asyncio.TimeoutError:
+            self.expired += 1
+            incr("dispatch_expired", where="routing")
+            work.add_done_callback(self._release_orphan)
+            return 504, {"error": "deadline exceeded while routing", "queue_ms": round(queue_ms, 2)}
+        finally:
+            self.in_flight -= 1
+
+        service_ms = (time.monotonic() - started) * 1000.0
+        observe("dispatch_service_ms", service_ms)
+        if taxi is None:
+            return 404, {"error": "no taxi available", "queue_ms": round(queue_ms, 2)}
+        self.served += 1
+        return 200, {"taxi": taxi.id, "eta": round(float(eta), 2),
+                     "queue_ms": round(queue_ms, 2), "service_ms": round(service_ms, 2)}
+
+    def _release_orphan(self, work):
+        """Dispatch finished after its caller timed out: give the taxi back."""
+        if work.cancelled() or work.exception() is not None:
+            return
+        taxi, _ = work.result()
+        if taxi is not None:
+            self.dispatcher.fleet_manager.mark_taxi_available(taxi.id)
+            incr("dispatch_orphan_released")
+
+    def health(self):
+        return {"status": "ok", "queue": self._queue.qsize(), "queue_size": self.queue_size,
+                "in_flight": self.in_flight, "workers": self.workers, "served": self.served,
+                "shed": self.shed, "expired": self.expired,
+                "available_taxis": len(self.dispatcher.fleet_manager.available)}
+
+    # ---------- HTTP ------------------------------------------------------------
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except _Reject as e:
+                    # the body was not consumed: the stream can't be trusted any more
+                    incr("dispatch_http_rejected", status=e.status)
+                    self._write(writer, e.status, {"error": e.error}, None, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    status, payload, extra = await self._route(method, path, headers, body)
+                except Exception as e:              # answer, don't drop the socket
+                    log.error("request failed", path=path, error=repr(e))
+                    incr("dispatch_http_error")
+                    status, payload, extra, keep_alive = 500, {"error": "internal error"}, None, False
+                self._write(writer, status, payload, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, path, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return None
+        headers = {}
+        while True:
+            raw = await reader.readline()
+            if raw in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = raw.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        raw_length = headers.get("content-length", "").strip() or "0"
+        if not raw_length.isdigit():                 # also rejects negative lengths
+            raise _Reject(400, f"bad Content-Length: {raw_length!r}")
+        length = int(raw_length)
+        if length > _MAX_BODY:
+            raise _Reject(413, f"body of {length} bytes exceeds {_MAX_BODY}")
+        body   = await reader.readexactly(length) if length else b""
+        return method.upper(), path.split("?", 1)[0], headers, body
+
+    async def _route(self, method, path, headers, body):
+        if path == "/health":
+            return 200, self.health(), None
+        if path == "/metrics":
+            return 200, get_metrics().prometheus_text(), None
+        if method != "POST" or path not in ("/dispatch", "/release"):
+            return (405 if path in ("/dispatch", "/release") else 404), {"error": "not found"}, None
+        try:
+            data = json.loads(body or b"{}")
+            if path == "/release":
+                fleet = self.dispatcher.fleet_manager
+                if data["taxi"] not in fleet.taxis:
+                    return 404, {"error": f"unknown taxi {data['taxi']!r}"}, None
+                fleet.mark_taxi_available(data["taxi"])
+                return 200, {"released": data["taxi"]}, None
+            ride = RideRequest(_location(data["pickup"]), _location(data.get("dropoff")))
+            deadline_ms = data.get("deadline_ms") or headers.get("x-deadline-ms")
+            deadline_s  = None
+            if deadline_ms:
+                deadline_s = float(deadline_ms) / 1000.0
+                if not math.isfinite(deadline_s) or deadline_s <= 0:
+                    raise ValueError(f"deadline_ms must be a positive number, got {deadline_ms!r}")
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": f"bad request: {e!r}"}, None
+
+        t0 = time.perf_counter()
+        status, payload = await self.submit(ride, deadline_s)
+        incr("dispatch_http", status=status)
+        observe("dispatch_http_ms", (time.perf_counter() - t0) * 1000.0)
+        return status, payload, {"Retry-After": "1"} if status == 503 else None
+
+    @staticmethod
+    def _write(writer, status, payload, extra, keep_alive):
+        if isinstance(payload, str):
+            body, ctype = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            body, ctype = json.dumps(payload).encode(), "application/json"
+        head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                f"Content-Type: {ctype}", f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f"{k}: {v}" for k, v in (extra or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+
+
+# ---------------------------------------------------------------------------
+# Stand‑alone server on a fake town (or the live CARLA map)
+# ---------------------------------------------------------------------------
+
+class StaticTaxi:
+    """Parked taxi for the API demo / load tests – just an id and a location."""
+
+    def __init__(self, tid, location):
+        self.id, self._loc = tid, location
+
+    def get_location(self):
+        return self._loc
+
+
+def build_dispatcher(town="grid", size=6, taxis=20, model=None, seed=0, world=None, cache=True,
+                     processes=0):
+    import random
+
+    from core.dispatcher import Dispatcher
+    from core.fleet_manager import FleetManager
+    from routing.graph_builder import CarlaGraph, node_position
+    from routing.route_cache import RouteCache
+    from routing.route_gen import RouteGenerator
+    from utils.fake_map import TOWNS
+
+    if world is None:
+        world = TOWNS[town](size, size) if town == "grid" else TOWNS[town]()
+    graph = CarlaGraph(world)
+    graph.build_graph()
+    rng   = random.Random(seed)
+    nodes = sorted(graph.node_lookup)
+    fleet = FleetManager([StaticTaxi(i, _Location(*node_position(rng.choice(nodes))))
+                          for i in range(taxis)])
+    if model:
+        from routing.ai_router import ETAEstimator
+        eta = ETAEstimator(model)
+    else:
+        from routing.segment_eta import SegmentETA
+        eta = SegmentETA.free_flow(graph)
+    if processes:
+        # worker processes map one compiled copy of graph + model
+        from core.dispatch_pool import DispatchPool
+        from routing.shared_graph import compile_shared
+        if model:
+            raise SystemExit("--processes serves the segment ETA model only")
+        return DispatchPool(compile_shared(graph, f"{town}{size}", model=eta), fleet,
+                            workers=processes, world=world)
+    route_gen = RouteGenerator(graph, cache=RouteCache() if cache else None)
+    return Dispatcher(fleet, graph, route_gen, world, {}, model=eta)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="async taxi dispatch API")
+    ap.add_argument("--host",     default="127.0.0.1")
+    ap.add_argument("--port",     type=int, default=8765)
+    ap.add_argument("--unix",     default=None, help="serve on a Unix socket instead")
+    ap.add_argument("--town",     default="grid", help="fake town: grid / ring / highway")
+    ap.add_argument("--size",     type=int, default=6)
+    ap.add_argument("--taxis",    type=int, default=20)
+    ap.add_argument("--model",    default=None, help="ETAEstimator model (default: free‑flow segment ETA)")
+    ap.add_argument("--workers",  type=int, default=4)
+    ap.add_argument("--queue",    type=int, default=256)
+    ap.add_argument("--deadline", type=float, default=2.0, help="default deadline, seconds")
+    ap.add_argument("--no-cache", action="store_true", help="route every request from scratch")
+    ap.add_argument("--processes", type=int, default=0,
+                    help="route in N worker processes over a shared graph")
+    args = ap.parse_args()
+
+    dispatcher = build_dispatcher(args.town, args.size, args.taxis, args.model,
+                                  cache=not args.no_cache, processes=args.processes)
+    workers    = max(args.workers, args.processes)   # one waiting thread per process
+    server     = DispatchServer(dispatcher, args.queue, workers, args.deadline)
+
+    async def run():
+        await server.start(args.host, args.port, args.unix)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        print(f"🚕 dispatch API on {args.unix or f'http://{args.host}:{server.port}'}")
+        await stop.wait()
+        await server.stop()
+
+    try:
+        asyncio.run(run())
+    finally:
+        if hasattr(dispatcher, "close"):       # DispatchPool: shut the worker processes down
+            dispatcher.close()
+    print("👋 dispatch API stopped")
+
+if __name__ == "__main__":
+    main()
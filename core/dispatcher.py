@@ -1,28 +1,99 @@
 # core/dispatcher.py
 
+import config
 from routing.route_gen import RouteGenerator
 from routing.graph_builder import CarlaGraph
-from routing.extract_features import extract_features
+from routing.extract_features import extract_features, feature_context
 from routing.ai_router import ETAEstimator
+from core import logger
+from core.logger import get_logger, span, incr
+from core.trace import route_hash
+
+log = get_logger("dispatcher")
+
+# how the trip route is chosen among the k shortest (recorded in traces, see core.trace)
+ROUTE_SELECTORS = ("min_eta",)
 
 class Dispatcher:
-    def __init__(self, fleet_manager, graph: CarlaGraph, route_generator: RouteGenerator, world, driving_graph):
+    def __init__(self, fleet_manager, graph: CarlaGraph, route_generator: RouteGenerator, world, driving_graph, model=None):
         self.fleet_manager = fleet_manager
         self.graph = graph
         self.route_generator = route_generator
         self.world = world
         self.driving_graph = driving_graph
-        self.model = ETAEstimator()
+        self.model = model or ETAEstimator()
+
+    def _features(self, route):
+        if not logger.ENABLED:                 # per candidate taxi: skip the null span
+            return self._cached_features(route)
+        with span("features"):
+            return self._cached_features(route)
+
+    def _cached_features(self, route):
+        cache = self.route_generator.cache
+        if cache is None:
+            return extract_features(route, self.graph, self.world, self.driving_graph)
+        # keyed on the whole route: best_route's k alternatives share their endpoints
+        key = cache.key("features", route[0], route[-1], cache.weights_id(self.graph),
+                        k=route_hash(route), context=feature_context(self.world))
+        return cache.get_or_compute(
+            key, lambda: extract_features(route, self.graph, self.world, self.driving_graph))
+
+    def route_eta(self, route):
+        """Predicted seconds for a node route under the current context."""
+        if hasattr(self.model, "route_eta"):
+            # per‑segment engine: sum of cached edge times, no feature extraction
+            if not logger.ENABLED:
+                return self.model.route_eta(route, feature_context(self.world))
+            with span("inference"):
+                return self.model.route_eta(route, feature_context(self.world))
+        feature_vector = self._features(route)
+        if not logger.ENABLED:
+            return self.model.predict_eta(feature_vector)
+        with span("inference"):
+            return self.model.predict_eta(feature_vector)
+
+    def best_route(self, start_loc, end_loc, k=None, selector="min_eta"):
+        """(route, eta) of the k shortest routes with the lowest predicted ETA."""
+        if selector not in ROUTE_SELECTORS:
+            raise ValueError(f"Unknown route selector {selector!r} (use one of {ROUTE_SELECTORS})")
+        k = k or config.ROUTE_ALTERNATIVES
+        routes = self.route_generator.generate_k_shortest_routes(start_loc, end_loc, k=k)
+        if not routes:
+            return [], None
+        etas = [self.route_eta(r) if len(r) > 1 else 0.0 for r in routes]
+        best = min(range(len(routes)), key=etas.__getitem__)     # ties: the shorter route
+        return routes[best], etas[best]
+
+    def plan_ride(self, ride_request, k=None, selector="min_eta"):
+        """
+        (taxi, pickup eta, trip route, trip eta) – the decision a run records
+        and core.replay re‑derives.  No taxi, no trip route.
+        """
+        taxi, pickup_eta = self.dispatch_with_eta(ride_request)
+        if taxi is None:
+            return None, None, [], None
+        route, eta = self.best_route(ride_request.pickup, ride_request.dropoff, k, selector)
+        return taxi, pickup_eta, route, eta
 
     def dispatch(self, ride_request):
+        return self.dispatch_with_eta(ride_request)[0]
+
+    def dispatch_with_eta(self, ride_request):
+        """(taxi, eta seconds) or (None, None)."""
+        incr("dispatch_requests")
+        with span("dispatch"):
+            return self._dispatch(ride_request)
+
+    def _dispatch(self, ride_request):
         available_taxis = self.fleet_manager.get_available_taxis()
 
         if not available_taxis:
-            print("❌ No taxis available for dispatch.")
-            return None
+            incr("dispatch_no_taxi")
+            log.warning("no taxis available for dispatch")
+            return None, None
 
-        best_taxi = None
-        best_eta = float('inf')
+        candidates = []
 
         for taxi in available_taxis:
             # Generate shortest path from taxi to pickup
@@ -33,18 +104,14 @@ class Dispatcher:
             if not route:
                 continue
 
-            waypoints = [self.graph.get_waypoint(nid) for nid in route]
-            feature_vector = extract_features(waypoints, self.graph, self.world, self.driving_graph)
-            eta = self.model.predict_eta(feature_vector)
-
-            if eta < best_eta:
-                best_eta = eta
-                best_taxi = taxi
-
-        if best_taxi:
-            print(f"✅ Dispatching taxi {best_taxi.id} with ETA {best_eta:.2f} sec.")
-            self.fleet_manager.mark_taxi_unavailable(best_taxi.id)
-            return best_taxi
-        else:
-            print("⚠️ Could not find optimal taxi.")
-            return None
+            candidates.append((self.route_eta(route), taxi.id, taxi))
+
+        # best ETA first; another dispatch thread may have claimed it meanwhile
+        for eta, _, taxi in sorted(candidates, key=lambda c: (c[0], str(c[1]))):
+            if self.fleet_manager.claim(taxi.id):
+                log.info("dispatching taxi", taxi=taxi.id, eta=round(eta, 2))
+                return taxi, eta
+
+        incr("dispatch_no_route")
+        log.warning("could not find optimal taxi")
+        return None, None
@@ -1,15 +1,37 @@
 # core/fleet_manager.py
 
+import threading
+
+
 class FleetManager:
     def __init__(self, vehicles):
         self.taxis = {v.id: v for v in vehicles}
         self.available = set(self.taxis.keys())
+        self._lock = threading.Lock()       # dispatch may run on several worker threads
 
     def get_available_taxis(self):
-        return [self.taxis[tid] for tid in self.available]
+        with self._lock:
+            return [self.taxis[tid] for tid in self.available]
+
+    def claim(self, taxi_id):
+        """Atomically take a taxi if it is still free; False if someone beat us."""
+        with self._lock:
+            if taxi_id not in self.available:
+                return False
+            self.available.discard(taxi_id)
+            return True
 
     def mark_taxi_unavailable(self, taxi_id):
-        self.available.discard(taxi_id)
+        with self._lock:
+            self.available.discard(taxi_id)
 
     def mark_taxi_available(self, taxi_id):
-        self.available.add(taxi_id)
+        if taxi_id not in self.taxis:               # an unknown id would break every dispatch
+            raise ValueError(f"Unknown taxi {taxi_id!r}")
+        with self._lock:
+            self.available.add(taxi_id)
+
+    def set_available(self, taxi_ids):
+        """Replace the free set wholesale (trace replay restores it per tick)."""
+        with self._lock:
+            self.available = set(taxi_ids)
@@ -0,0 +1,336 @@
+# core/headless_sim.py
+#
+# Headless (no CARLA) fleet simulator for dispatch / rebalancing experiments.
+# Taxis live on graph nodes and move at a constant speed along shortest paths;
+# each tick we: 1) pull new requests from the demand generator
+#               2) finish arrivals  3) dispatch  4) let the rebalancer move idle cars
+#
+#   python -m core.headless_sim --hours 3 --fleet 25
+# prints average pickup time with and without rebalancing.
+#
+# traced_run() instead drives the real dispatch stack – Dispatcher.plan_ride
+# over RouteGenerator and the ETA model – on a fake town and records it with
+# core.trace, so core.replay can re‑derive every decision:
+#
+#   python -m core.headless_sim --trace runs/grid.trace --hours 1 --fleet 20
+
+import argparse
+import heapq
+import math
+import random
+import time
+from collections import deque
+
+from core.fleet_manager import FleetManager
+from core.rebalancer import Rebalancer
+from core.zones import ZoneGrid
+from core.demand import HotspotDemand
+from core.logger import span, observe, get_metrics
+from core.trace import AVAILABLE, EGO, TAXI, TraceRecorder, decision_policy, graph_hash
+
+PICKUP_BUCKETS = (10, 20, 30, 45, 60, 90, 120, 180, 300, 600)
+
+
+def shortest_distances(adjacency, source, targets=None):
+    """Single‑source Dijkstra; stops early once every target is settled."""
+    dist    = {source: 0.0}
+    heap    = [(0.0, source)]
+    done    = set()
+    pending = set(targets) if targets else None
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in done:
+            continue
+        done.add(u)
+        if pending is not None:
+            pending.discard(u)
+            if not pending:
+                break
+        for v, w in adjacency.get(u, ()):
+            nd = d + w
+            if nd < dist.get(v, math.inf):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return dist
+
+
+def reverse_adjacency(adjacency):
+    rev = {}
+    for u, edges in adjacency.items():
+        for v, w in edges:
+            rev.setdefault(v, []).append((u, w))
+    return rev
+
+
+class SimTaxi:
+    def __init__(self, taxi_id, node):
+        self.id        = taxi_id
+        self.node      = node           # current node (or destination while moving)
+        self.state     = "idle"         # idle | repositioning | to_pickup | to_dropoff
+        self.free_at   = 0.0
+        self.request   = None
+
+    def get_location(self):
+        return self.node
+
+
+class SimRequest:
+    def __init__(self, rid, t, pickup_node, dropoff_node):
+        self.id           = rid
+        self.t            = t
+        self.pickup       = pickup_node
+        self.dropoff      = dropoff_node
+        self.picked_up_at = None
+
+
+class HeadlessSimulator:
+    def __init__(self, graph, demand, zones, fleet_size=20, rebalancer=None,
+                 dt=1.0, speed_mps=8.0, seed=0):
+        self.graph      = graph
+        self.adjacency  = graph.graph
+        self.reverse    = reverse_adjacency(graph.graph)
+        self.demand     = demand
+        self.zones      = zones
+        self.rebalancer = rebalancer
+        self.dt         = dt
+        self.speed      = speed_mps
+        self.now        = 0.0
+
+        rng   = random.Random(seed)
+        nodes = graph.get_all_nodes()
+        self.taxis   = [SimTaxi(i, rng.choice(nodes)) for i in range(fleet_size)]
+        self.fleet   = FleetManager(self.taxis)
+        self.waiting = deque()
+        self.served  = []
+        self._next_rid = 0
+
+    # ---------- helpers ---------------------------------------------------------
+
+    def _travel_time(self, a, b):
+        d = shortest_distances(self.adjacency, a, targets=[b]).get(b)
+        return None if d is None else d / self.speed
+
+    def _dispatch(self, req):
+        candidates = self.fleet.get_available_taxis()
+        if not candidates:
+            return False
+        # one backward search from the pickup reaches every candidate taxi
+        back = shortest_distances(self.reverse, req.pickup,
+                                  targets=[t.node for t in candidates])
+        best = min(candidates, key=lambda t: back.get(t.node, math.inf))
+        if best.node not in back:
+            return False
+
+        ride = self._travel_time(req.pickup, req.dropoff)
+        if ride is None:
+            return True   # unreachable dropoff: drop the request
+
+        pickup_eta      = back[best.node] / self.speed
+        observe("pickup_seconds", pickup_eta, buckets=PICKUP_BUCKETS)
+        req.picked_up_at = self.now + pickup_eta
+        best.state, best.request = "to_dropoff", req
+        best.free_at = req.picked_up_at + ride
+        best.node    = req.dropoff
+        self.fleet.mark_taxi_unavailable(best.id)
+        self.served.append(req)
+        return True
+
+    # ---------- main loop -------------------------------------------------------
+
+    def tick(self):
+        with span("sim_tick"):
+            self._tick()
+
+    def _tick(self):
+        t0, t1 = self.now, self.now + self.dt
+
+        for t, pickup, dropoff in self.demand.requests_between(t0, t1):
+            req = SimRequest(self._next_rid, t,
+                             self.zones.nearest_node(pickup),
+                             self.zones.nearest_node(dropoff))
+            self._next_rid += 1
+            self.waiting.append(req)
+            if self.rebalancer:
+                self.rebalancer.observe_request(t, pickup)
+
+        for taxi in self.taxis:
+            if taxi.state != "idle" and taxi.free_at <= t1:
+                taxi.state, taxi.request = "idle", None
+                self.fleet.mark_taxi_available(taxi.id)
+
+        while self.waiting and self._dispatch(self.waiting[0]):
+            self.waiting.popleft()
+
+        if self.rebalancer:
+            idle = {t.id: t.node for t in self.taxis
+                    if t.state == "idle" and t.id in self.fleet.available}
+            for tid, target in self.rebalancer.step(t1, idle):
+                taxi = self.fleet.taxis[tid]
+                tt   = self._travel_time(taxi.node, target)
+                if tt is None:
+                    continue
+                # repositioning cars stay dispatchable only after they arrive
+                taxi.state, taxi.node, taxi.free_at = "repositioning", target, t1 + tt
+                self.fleet.mark_taxi_unavailable(tid)
+
+        self.now = t1
+
+    def run(self, duration):
+        while self.now < duration:
+            self.tick()
+        return self.summary()
+
+    def summary(self):
+        waits = [r.picked_up_at - r.t for r in self.served]
+        return {
+            "requests":        self._next_rid,
+            "served":          len(waits),
+            "unserved":        len(self.waiting),
+            "avg_pickup_s":    round(sum(waits) / len(waits), 1) if waits else None,
+            "max_pickup_s":    round(max(waits), 1) if waits else None,
+            "rebalance_runs":  self.rebalancer.runs if self.rebalancer else 0,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Traced dispatch run (core.trace / core.replay)
+# ---------------------------------------------------------------------------
+
+def traced_run(graph, path, minutes=60.0, hz=10.0, taxis=20, background=60, rate=240.0,
+               seed=0, model=None, policy=None, town="grid", cache=True):
+    """
+    Drive Dispatcher.plan_ride on a fake‑town CarlaGraph for `minutes` of sim
+    time and record it to `path`: taxis parked at spawn points, moving
+    background cars, Poisson ride requests (`rate` per hour) between spawn
+    points, weather drifting every 5 minutes, ticked at `hz`.  A dispatched
+    taxi reappears, free, at the dropoff after pickup + trip ETA.
+    cache: route / feature RouteCache as in core.replay.replay (False: none).
+    Returns (wall seconds, record counts).
+    """
+    from core.dispatcher import Dispatcher
+    from core.replay import ReplayTaxi, ReplayWorld
+    from routing.graph_builder import node_position
+    from routing.route_cache import RouteCache
+    from routing.route_gen import RouteGenerator
+
+    rng    = random.Random(seed)
+    policy = policy or decision_policy()
+    spawns = [sp.location for sp in graph.world.get_map().get_spawn_points()]
+    lights = [node_position(n)[:2] + (0.0,) for n in rng.sample(sorted(graph.node_lookup), 30)]
+    cabs   = [ReplayTaxi(1000 + i) for i in range(taxis)]
+    for taxi in cabs:
+        taxi.loc = rng.choice(spawns)
+    meta = {"map": town, "resolution": graph.resolution, "graph_hash": graph_hash(graph),
+            "seeds": {"requests": seed}, "ego_id": cabs[0].id,
+            "taxi_ids": [t.id for t in cabs], "traffic_lights": lights, "policy": policy}
+    if model is None:
+        from routing.segment_eta import SegmentETA
+        model = SegmentETA.free_flow(graph)
+
+    world      = ReplayWorld(meta)                 # clock, weather and lights of the run
+    fleet      = FleetManager(cabs)
+    route_gen  = RouteGenerator(graph, cache=RouteCache() if cache is True else cache or None)
+    dispatcher = Dispatcher(fleet, graph, route_gen, world, {}, model=model)
+
+    cars = [[2000 + i, loc.x, loc.y, rng.uniform(-180, 180), rng.uniform(3, 12)]
+            for i, loc in enumerate(rng.choice(spawns) for _ in range(background))]
+    busy, rid, dt = {}, 0, 1.0 / hz
+    next_req = rng.expovariate(rate / 3600.0)
+    t0 = time.perf_counter()
+    with TraceRecorder(path, meta) as rec:
+        for i in range(int(minutes * 60 * hz)):
+            t = i * dt
+            world.set_clock(t, (8 + int(t // 3600)) % 24)
+            if i % int(300 * hz) == 0:
+                world.set_weather(rng.choice((0.0, 0.0, 20.0, 70.0)), rng.uniform(0, 90))
+            for tid, (until, dropoff) in list(busy.items()):
+                if until <= t:
+                    fleet.taxis[tid].loc = dropoff
+                    fleet.mark_taxi_available(tid)
+                    del busy[tid]
+            for car in cars:
+                yaw = math.radians(car[3])
+                car[1] += car[4] * dt * math.cos(yaw)
+                car[2] += car[4] * dt * math.sin(yaw)
+            actors = [(tx.id, tx.loc.x, tx.loc.y, 0.0, 0.0 if tx.id in fleet.available else 8.0,
+                       (EGO if tx.id == meta["ego_id"] else 0) | TAXI |
+                       (AVAILABLE if tx.id in fleet.available else 0)) for tx in cabs]
+            actors += [(c[0], c[1], c[2], c[3], c[4], 0) for c in cars]
+            rec.tick(t, (world.weather.precipitation, world.weather.cloudiness), actors)
+
+            while next_req <= t:
+                pickup, dropoff = rng.sample(spawns, 2)
+                ride = SimRequest(rid, t, pickup, dropoff)
+                rec.request(t, rid, world.hour(), pickup, dropoff)
+                taxi, eta, route, trip = dispatcher.plan_ride(ride, policy["k"], policy["selector"])
+                rec.decision(t, rid, taxi.id if taxi else None, eta, route, trip)
+                if taxi is not None:
+                    busy[taxi.id] = (t + eta + (trip or 0.0), dropoff)
+                rid += 1
+                next_req += rng.expovariate(rate / 3600.0)
+        counts = dict(rec.counts)
+    return time.perf_counter() - t0, counts
+
+
+# ---------------------------------------------------------------------------
+# CLI: measure the rebalancer on a synthetic grid town
+# ---------------------------------------------------------------------------
+
+def _scenario(args, rebalance):
+    from routing.synthetic import grid_graph
+
+    graph = grid_graph(args.grid, args.grid, spacing=50.0)
+    zones = ZoneGrid(graph, cell_size=args.zone)
+    side  = (args.grid - 1) * 50.0
+    hotspots = [
+        {"center": (0.15 * side, 0.15 * side), "sigma": 60.0, "weight": 4.0},
+        {"center": (0.85 * side, 0.80 * side), "sigma": 80.0, "weight": 2.0},
+    ]
+    demand = HotspotDemand(zones, hotspots, background=0.15,
+                           rate_per_hour=args.rate, seed=args.seed)
+    rebalancer = Rebalancer(zones, interval=args.interval) if rebalance else None
+    sim = HeadlessSimulator(graph, demand, zones, fleet_size=args.fleet,
+                            rebalancer=rebalancer, dt=args.dt, seed=args.seed)
+    return sim.run(args.hours * 3600.0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="headless rebalancing experiment")
+    ap.add_argument("--hours",    type=float, default=2.0)
+    ap.add_argument("--fleet",    type=int,   default=25)
+    ap.add_argument("--rate",     type=float, default=240.0, help="requests / hour")
+    ap.add_argument("--grid",     type=int,   default=20)
+    ap.add_argument("--zone",     type=float, default=150.0)
+    ap.add_argument("--interval", type=float, default=60.0)
+    ap.add_argument("--dt",       type=float, default=1.0)
+    ap.add_argument("--seed",     type=int,   default=0)
+    ap.add_argument("--metrics",  default=None, help="append metrics as JSON lines")
+    ap.add_argument("--trace",    default=None,
+                    help="record a dispatch run on the fake grid town instead (core.replay)")
+    ap.add_argument("--town-size", type=int, default=8, help="fake grid town for --trace")
+    args = ap.parse_args()
+
+    if args.trace:
+        from routing.graph_builder import CarlaGraph
+        from utils.fake_map import grid_town
+        graph = CarlaGraph(grid_town(args.town_size, args.town_size))
+        graph.build_graph()
+        seconds, counts = traced_run(graph, args.trace, minutes=args.hours * 60, hz=1.0 / args.dt,
+                                     taxis=args.fleet, rate=args.rate, seed=args.seed)
+        print(f"🎞️  {counts[2]} requests / {counts[1]} ticks recorded in {seconds:.1f}s → {args.trace}")
+        print(f"   replay: python -m core.replay {args.trace} --town grid --size {args.town_size}")
+        return
+
+    base = _scenario(args, rebalance=False)
+    rebl = _scenario(args, rebalance=True)
+    print(f"🚕  no rebalancing : {base}")
+    print(f"🚕  rebalancing    : {rebl}")
+    if base["avg_pickup_s"] and rebl["avg_pickup_s"]:
+        gain = base["avg_pickup_s"] - rebl["avg_pickup_s"]
+        print(f"⏱️  average pickup time change: {-gain:+.1f} s")
+    if args.metrics:
+        get_metrics().export_jsonl(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
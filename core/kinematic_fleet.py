@@ -0,0 +1,41 @@
+# core/kinematic_fleet.py
+#
+# Headless vehicle backend for carla_interface.fleet_follower: a kinematic
+# bicycle model over NumPy arrays, so a whole fleet's controls can be driven
+# without CARLA (benchmarks, controller tuning, replay experiments).
+#   • throttle → acceleration, brake → deceleration, linear drag
+#   • steer ∈ [‑1, 1] maps to ±max_steer_deg of front wheel angle
+#
+#   body = KinematicFleet(x, y, yaw)
+#   ctrl = follower.step(*body.poses())
+#   body.apply(ctrl, dt=0.05)
+
+import numpy as np
+
+
+class KinematicFleet:
+    def __init__(self, x, y, yaw, speed=None, wheelbase=2.9, max_steer_deg=35.0,
+                 accel=3.5, decel=8.0, drag=0.05):
+        self.x     = np.array(x, dtype=float)
+        self.y     = np.array(y, dtype=float)
+        self.yaw   = np.array(yaw, dtype=float)          # degrees, CARLA convention
+        self.speed = np.zeros(len(self.x)) if speed is None else np.array(speed, dtype=float)
+        self.wheelbase = wheelbase
+        self.max_steer = np.radians(max_steer_deg)
+        self.accel, self.decel, self.drag = accel, decel, drag
+
+    def __len__(self):
+        return len(self.x)
+
+    def poses(self):
+        return self.x, self.y, self.yaw, self.speed
+
+    def apply(self, controls, dt):
+        """Integrate one step of (throttle, steer, brake) arrays."""
+        a = controls.throttle * self.accel - controls.brake * self.decel - self.drag * self.speed
+        self.speed = np.maximum(self.speed + a * dt, 0.0)
+        rad   = np.radians(self.yaw)
+        self.x += self.speed * np.cos(rad) * dt
+        self.y += self.speed * np.sin(rad) * dt
+        rate  = self.speed / self.wheelbase * np.tan(controls.steer * self.max_steer)
+        self.yaw = (self.yaw + np.degrees(rate * dt) + 180.0) % 360.0 - 180.0
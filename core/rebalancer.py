@@ -0,0 +1,187 @@
+# core/rebalancer.py
+#
+# Idle‑taxi rebalancing:
+#   1) DemandForecaster keeps per‑zone request counts over a rolling window
+#   2) Rebalancer turns (forecast − idle supply) into surplus/deficit zones and
+#      solves a min‑cost flow over zone centroids to decide who moves where.
+# Planning runs at most every `interval` sim‑seconds and can be pushed to a
+# background thread so the scheduler tick never waits on it.
+
+import math
+from collections import Counter, deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from routing.graph_builder import node_position
+
+
+class DemandForecaster:
+    """Rolling‑window rate per zone, exponentially smoothed between runs."""
+
+    def __init__(self, window=900.0, horizon=600.0, alpha=0.5):
+        self.window   = window
+        self.horizon  = horizon
+        self.alpha    = alpha
+        self.events   = deque()          # (t, zone)
+        self.counts   = Counter()
+        self.smoothed = {}               # zone → requests / second
+
+    def observe(self, t, zone):
+        self.events.append((t, zone))
+        self.counts[zone] += 1
+
+    def _expire(self, now):
+        while self.events and self.events[0][0] < now - self.window:
+            _, zone = self.events.popleft()
+            self.counts[zone] -= 1
+            if self.counts[zone] <= 0:
+                del self.counts[zone]
+
+    def forecast(self, now):
+        """Expected requests per zone over the next `horizon` seconds."""
+        self._expire(now)
+        span = min(self.window, max(now, 1.0))
+        for zone in set(self.smoothed) | set(self.counts):
+            rate = self.counts.get(zone, 0) / span
+            prev = self.smoothed.get(zone, rate)
+            self.smoothed[zone] = self.alpha * rate + (1 - self.alpha) * prev
+        return {z: r * self.horizon for z, r in self.smoothed.items() if r > 0}
+
+
+def min_cost_flow(supply, demand, cost):
+    """
+    Transportation problem by successive shortest paths (SPFA on the residual
+    graph).  supply/demand: {node: units}, cost(a, b) → float.
+    Returns {(a, b): units}.  Total flow = min(Σsupply, Σdemand).
+    """
+    src, dst = ("__src__",), ("__dst__",)
+    cap  = defaultdict(int)
+    wgt  = {}
+    adj  = defaultdict(set)
+
+    def arc(u, v, c, w):
+        cap[(u, v)] += c
+        wgt[(u, v)], wgt[(v, u)] = w, -w
+        adj[u].add(v)
+        adj[v].add(u)
+
+    for s, units in supply.items():
+        arc(src, ("s", s), units, 0.0)
+        for d in demand:
+            arc(("s", s), ("d", d), units, cost(s, d))
+    for d, units in demand.items():
+        arc(("d", d), dst, units, 0.0)
+
+    while True:
+        dist, prev = {src: 0.0}, {}
+        queue, in_q = deque([src]), {src}
+        while queue:
+            u = queue.popleft()
+            in_q.discard(u)
+            for v in adj[u]:
+                if cap[(u, v)] <= 0:
+                    continue
+                nd = dist[u] + wgt[(u, v)]
+                if nd < dist.get(v, math.inf) - 1e-9:
+                    dist[v], prev[v] = nd, u
+                    if v not in in_q:
+                        queue.append(v)
+                        in_q.add(v)
+        if dst not in dist:
+            break
+
+        push, v = math.inf, dst
+        while v != src:
+            push = min(push, cap[(prev[v], v)])
+            v = prev[v]
+        v = dst
+        while v != src:
+            cap[(prev[v], v)] -= push
+            cap[(v, prev[v])] += push
+            v = prev[v]
+
+    flows = {}
+    for s in supply:
+        for d in demand:
+            sent = cap[(("d", d), ("s", s))]
+            if sent > 0:
+                flows[(s, d)] = sent
+    return flows
+
+
+class Rebalancer:
+    """
+    Sends idle taxis toward zones whose forecast demand exceeds idle supply.
+
+        rb.observe_request(t, pickup)          # every new request
+        moves = rb.step(now, {taxi_id: node})  # every scheduler tick
+    `moves` is a list of (taxi_id, target_node); empty on most ticks.
+    """
+
+    def __init__(self, zones, forecaster=None, interval=60.0,
+                 max_moves=None, min_deficit=0.5, background=False):
+        self.zones       = zones
+        self.forecaster  = forecaster or DemandForecaster()
+        self.interval    = interval
+        self.max_moves   = max_moves
+        self.min_deficit = min_deficit
+        self._next_run   = 0.0
+        self._executor   = ThreadPoolExecutor(max_workers=1) if background else None
+        self._pending    = None
+        self.runs        = 0
+
+    def observe_request(self, t, pickup):
+        self.forecaster.observe(t, self.zones.zone_of(pickup))
+
+    def step(self, now, idle_taxis):
+        moves = []
+        if self._pending is not None and self._pending.done():
+            moves, self._pending = self._pending.result(), None
+
+        if now >= self._next_run and self._pending is None:
+            self._next_run = now + self.interval
+            forecast = self.forecaster.forecast(now)
+            idle     = dict(idle_taxis)
+            if self._executor:
+                self._pending = self._executor.submit(self.plan, forecast, idle)
+            else:
+                moves = moves + self.plan(forecast, idle)
+
+        # a taxi may have been dispatched while a background plan was running
+        return [(tid, node) for tid, node in moves if tid in idle_taxis]
+
+    def plan(self, forecast, idle_taxis):
+        self.runs += 1
+        by_zone = defaultdict(list)
+        for tid, node in idle_taxis.items():
+            by_zone[self.zones.zone_of(node_position(node))].append(tid)
+
+        supply, demand = {}, {}
+        for zone in set(by_zone) | set(forecast):
+            if zone not in self.zones.centroids:
+                continue
+            want = forecast.get(zone, 0.0)
+            have = len(by_zone.get(zone, ()))
+            if have - want >= 1.0:
+                supply[zone] = int(have - math.ceil(want))
+            elif want - have >= self.min_deficit:
+                demand[zone] = int(math.ceil(want - have))
+        supply = {z: u for z, u in supply.items() if u > 0}
+        if not supply or not demand:
+            return []
+
+        flows = min_cost_flow(supply, demand, self.zones.distance)
+
+        moves = []
+        for (src, dst), units in sorted(flows.items(), key=lambda f: self.zones.distance(*f[0])):
+            target = self.zones.centroids[dst]
+            tx, ty = node_position(target)
+            taxis  = sorted(by_zone[src],
+                            key=lambda t: math.dist(node_position(idle_taxis[t]), (tx, ty)))
+            for tid in taxis[:units]:
+                by_zone[src].remove(tid)
+                moves.append((tid, target))
+        return moves[:self.max_moves] if self.max_moves else moves
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
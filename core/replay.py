@@ -0,0 +1,285 @@
+# core/replay.py
+#
+# Re‑drive dispatch, routing and ETA decisions from a recorded trace
+# (core.trace) at full CPU speed, without the simulator.
+#   • ReplayWorld answers what Dispatcher / extract_features ask a carla.World
+#     for – weather, traffic lights, hour of day – from the trace, so the
+#     feature context is the recorded one, not the wall clock's
+#   • taxi positions and availability come from the last tick before each
+#     request; ticks stay packed and are only decoded when a request needs them
+#   • each request yields a Decision (taxi, pickup ETA, trip route hash and
+#     ETA) from Dispatcher.plan_ride under the trace's recorded policy – the
+#     call the live run made; diff() compares two decision lists request by
+#     request
+#
+#   decisions, stats = replay(TraceReader("runs/town04.trace"), graph)
+#   changes = diff(load_decisions("baseline.jsonl"), decisions)
+#
+#   python -m core.replay runs/town04.trace --town grid --size 8 \
+#          --baseline runs/baseline.jsonl --save runs/candidate.jsonl
+
+import argparse
+import json
+import time
+
+from core.dispatcher import Dispatcher
+from core.fleet_manager import FleetManager
+from core.logger import get_logger
+from core.trace import AVAILABLE, TAXI, Decision, Request, Tick, TraceReader, graph_hash, route_hash
+from routing.route_cache import RouteCache
+from routing.route_gen import RouteGenerator
+from utils.fake_map import FakeLocation, FakeRotation, FakeTransform
+
+log = get_logger("replay")
+
+_SHORTEST = {"k": 1, "selector": "min_eta"}     # traces without a policy: the shortest route
+
+
+# ---------------------------------------------------------------------------
+# Simulator stand‑ins
+# ---------------------------------------------------------------------------
+
+class _Weather:
+    __slots__ = ("precipitation", "cloudiness")
+
+    def __init__(self, precipitation=0.0, cloudiness=0.0):
+        self.precipitation, self.cloudiness = precipitation, cloudiness
+
+
+class _Light:
+    def __init__(self, x, y, z):
+        self._transform = FakeTransform(FakeLocation(x, y, z), FakeRotation())
+
+    def get_transform(self):
+        return self._transform
+
+
+class _Actors(list):
+    def __init__(self, lights):
+        super().__init__()
+        self._lights = lights
+
+    def filter(self, pattern):
+        return list(self._lights) if pattern.startswith("traffic.traffic_light") else []
+
+
+class ReplayWorld:
+    """carla.World as the decision code sees it, driven by the trace."""
+
+    def __init__(self, meta, carla_map=None):
+        self._map    = carla_map
+        self._lights = [_Light(*xyz) for xyz in meta.get("traffic_lights", ())]
+        self.t       = 0.0
+        self._hour   = 0
+        self.weather = _Weather()
+
+    def hour(self):
+        return self._hour
+
+    def set_clock(self, t, hour):
+        self.t, self._hour = t, hour
+
+    def set_weather(self, precipitation, cloudiness):
+        self.weather = _Weather(precipitation, cloudiness)
+
+    def get_weather(self):
+        return self.weather
+
+    def get_actors(self):
+        return _Actors(self._lights)
+
+    def get_map(self):
+        return self._map
+
+
+class ReplayTaxi:
+    def __init__(self, tid):
+        self.id  = tid
+        self.loc = FakeLocation()
+
+    def get_location(self):
+        return self.loc
+
+
+class _Ride:
+    __slots__ = ("id", "pickup", "dropoff")
+
+    def __init__(self, rid, pickup, dropoff):
+        self.id, self.pickup, self.dropoff = rid, FakeLocation(*pickup), FakeLocation(*dropoff)
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+def replay(reader, graph, model=None, cache=True, check_graph=True, policy=None):
+    """
+    (decisions in request order, stats) for one trace on `graph`.
+    cache: True for a fresh RouteCache, or a RouteCache to share between
+    replays – paths are keyed on the graph's weights (RouteCache.weights_id),
+    so candidates that only change the ETA model reuse the baseline's searches.
+    policy: Dispatcher.plan_ride {"k", "selector"} instead of the recorded one.
+    """
+    meta = reader.meta
+    if check_graph and meta.get("graph_hash") and meta["graph_hash"] != graph_hash(graph):
+        raise ValueError(f"{reader.path} was recorded on another graph "
+                         f"({meta['graph_hash']} != {graph_hash(graph)})")
+    if model is None:
+        from routing.segment_eta import SegmentETA
+        model = SegmentETA.free_flow(graph)
+
+    policy     = policy or meta.get("policy", _SHORTEST)
+    world      = ReplayWorld(meta)
+    taxis      = {tid: ReplayTaxi(tid) for tid in meta.get("taxi_ids", ())}
+    fleet      = FleetManager(list(taxis.values()))
+    if cache is True:
+        cache = RouteCache()
+    route_gen  = RouteGenerator(graph, cache=cache or None)
+    dispatcher = Dispatcher(fleet, graph, route_gen, world, {}, model=model)
+
+    decisions, last, fresh = [], None, False
+    stats = {"ticks": 0, "requests": 0, "ticks_decoded": 0}
+    t0 = time.perf_counter()
+    for rec in reader:
+        kind = type(rec)
+        if kind is Tick:
+            last, fresh = rec, True
+            stats["ticks"] += 1
+            continue
+        if kind is not Request:
+            continue                             # recorded decisions are the baseline's business
+        stats["requests"] += 1
+        if fresh:                                # claims made since the last tick stay in force
+            _sync_fleet(fleet, taxis, last)
+            world.set_weather(last.precipitation, last.cloudiness)
+            stats["ticks_decoded"] += 1
+            fresh = False
+        world.set_clock(rec.t, rec.hour)
+        decisions.append(_decide(dispatcher, _Ride(rec.rid, rec.pickup, rec.dropoff), rec.t, policy))
+    stats["seconds"] = time.perf_counter() - t0
+    stats["simulated_s"] = last.t if last is not None else 0.0
+    log.info("trace replayed", path=reader.path, requests=stats["requests"],
+             ticks=stats["ticks"], seconds=round(stats["seconds"], 2))
+    return decisions, stats
+
+
+def _sync_fleet(fleet, taxis, tick):
+    free = set()
+    for tid, x, y, _, _, flags in tick.actors():
+        if flags & TAXI:
+            taxi = taxis.get(tid)
+            if taxi is None:
+                taxi = taxis[tid] = ReplayTaxi(tid)
+                fleet.taxis[tid] = taxi
+            taxi.loc = FakeLocation(x, y, 0.0)
+            if flags & AVAILABLE:
+                free.add(tid)
+    fleet.set_available(free)
+
+
+def _decide(dispatcher, ride, t, policy):
+    taxi, pickup_eta, route, route_eta = dispatcher.plan_ride(ride, policy["k"], policy["selector"])
+    return Decision(t, ride.id, -1 if taxi is None else taxi.id,
+                    float(pickup_eta or 0.0), float(route_eta or 0.0), route_hash(route), len(route))
+
+
+# ---------------------------------------------------------------------------
+# Baselines & diff
+# ---------------------------------------------------------------------------
+
+def save_decisions(decisions, path):
+    with open(path, "w") as f:
+        for d in decisions:
+            f.write(json.dumps(d._asdict()) + "\n")
+
+
+def load_decisions(path):
+    """Decisions from a saved .jsonl, or the ones recorded live in a trace."""
+    if not path.endswith(".jsonl"):
+        return TraceReader(path).decisions()
+    with open(path) as f:
+        return [Decision(**json.loads(line)) for line in f if line.strip()]
+
+
+def diff(baseline, current, eta_tol=0.01):
+    """[{rid, field, baseline, current}] for every decision that moved."""
+    changes = []
+    base = {d.rid: d for d in baseline}
+    cur  = {d.rid: d for d in current}
+    for rid in sorted(base.keys() | cur.keys()):
+        a, b = base.get(rid), cur.get(rid)
+        if a is None or b is None:
+            changes.append({"rid": rid, "field": "missing", "baseline": a is not None,
+                            "current": b is not None})
+            continue
+        if a.taxi != b.taxi:
+            changes.append({"rid": rid, "field": "taxi", "baseline": a.taxi, "current": b.taxi})
+        if a.route_hash != b.route_hash:
+            changes.append({"rid": rid, "field": "route", "baseline": a.route_nodes,
+                            "current": b.route_nodes})
+        for field in ("pickup_eta", "route_eta"):
+            va, vb = getattr(a, field), getattr(b, field)
+            if abs(va - vb) > eta_tol * max(1.0, abs(va)):
+                changes.append({"rid": rid, "field": field, "baseline": round(va, 2),
+                                "current": round(vb, 2)})
+    return changes
+
+
+def summarize(changes):
+    counts = {}
+    for c in changes:
+        counts[c["field"]] = counts.get(c["field"], 0) + 1
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="replay a recorded run and diff its decisions")
+    ap.add_argument("trace")
+    ap.add_argument("--snapshot", default=None, help="graph snapshot (default: fake --town)")
+    ap.add_argument("--town",     default="grid", help="fake town: grid / ring / highway")
+    ap.add_argument("--size",     type=int, default=8)
+    ap.add_argument("--model",    default=None, help="ETAEstimator model (default: free‑flow segment ETA)")
+    ap.add_argument("--baseline", default=None, help="decisions .jsonl or a trace with live decisions")
+    ap.add_argument("--save",     default=None, help="write this replay's decisions (.jsonl)")
+    ap.add_argument("--eta-tol",  type=float, default=0.01, help="relative ETA tolerance")
+    ap.add_argument("--no-graph-check", action="store_true")
+    args = ap.parse_args()
+
+    reader = TraceReader(args.trace)
+    if args.snapshot:
+        from routing.snapshot import load_snapshot
+        graph = load_snapshot(args.snapshot)
+    else:
+        from routing.graph_builder import CarlaGraph
+        from utils.fake_map import TOWNS
+        world = TOWNS[args.town](args.size, args.size) if args.town == "grid" else TOWNS[args.town]()
+        graph = CarlaGraph(world)
+        graph.build_graph()
+    model = None
+    if args.model:
+        from routing.ai_router import ETAEstimator
+        model = ETAEstimator(args.model)
+
+    decisions, stats = replay(reader, graph, model, check_graph=not args.no_graph_check)
+    print(f"⏩ {stats['requests']} requests / {stats['ticks']} ticks "
+          f"({stats['simulated_s'] / 60:.0f} simulated min) replayed in {stats['seconds']:.2f}s")
+    if args.save:
+        save_decisions(decisions, args.save)
+        print(f"💾 decisions → {args.save}")
+    if args.baseline:
+        changes = diff(load_decisions(args.baseline), decisions, args.eta_tol)
+        if not changes:
+            print("✅ no decision changed")
+            return
+        print(f"⚠️  {len(changes)} changes: {summarize(changes)}")
+        for c in changes[:20]:
+            print(f"   ride {c['rid']:>5}  {c['field']:<10} {c['baseline']} → {c['current']}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,13 @@
 import random
 
 class RequestManager:
-    def __init__(self, spawn_points):
+    def __init__(self, spawn_points, demand=None):
         self.spawn_points = spawn_points
+        self.demand       = demand      # optional core.demand generator
 
-    def generate_request(self):
+    def generate_request(self, now=0.0):
+        if self.demand is not None:
+            return self.demand.generate_request(now)
         a, b = random.sample(self.spawn_points, 2)
         return a.location, b.location
+
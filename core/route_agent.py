@@ -3,6 +3,8 @@ sys.path.append(r"C:\Users\eliav\Desktop\Uni\Workshop\CARLA_0.9.11\WindowsNoEdit
 
 from agents.navigation.basic_agent import BasicAgent
 
+from utils.helpers import to_xyz
+
 class RouteAwareAgent:
     """Drives through a list of waypoints while obeying traffic rules and speed limits."""
     def __init__(self, vehicle, world):
@@ -14,10 +16,10 @@ class RouteAwareAgent:
 
     def load_route(self, waypoints):
         STEP = 10  # Every ~10th waypoint becomes a sub-goal
-        self.route = [wp.transform.location for idx, wp in enumerate(waypoints) if idx % STEP == 0]
+        self.route = [to_xyz(wp) for idx, wp in enumerate(waypoints) if idx % STEP == 0]
 
         # Ensure final destination is included
-        self.route.append(waypoints[-1].transform.location)
+        self.route.append(to_xyz(waypoints[-1]))
 
         self.next_subgoal()
 
@@ -26,7 +28,7 @@ class RouteAwareAgent:
             return False  # Route complete
 
         dest = self.route.pop(0)
-        self.agent.set_destination((dest.x, dest.y, dest.z))
+        self.agent.set_destination(dest)
 
         speed_limit = self.vehicle.get_speed_limit()
 
@@ -0,0 +1,241 @@
+# core/trace.py
+#
+# Compact binary trace of everything a run consumes, for deterministic replay
+# (core.replay) without the simulator.
+#
+#   file   = MAGIC | u32 header length | header JSON | chunk*
+#   chunk  = u32 compressed length | zlib(record*)           (~64 KB raw each)
+#   record = u8 kind | payload
+#     TICK      t f64, precipitation f32, cloudiness f32, n u16,
+#               n × (actor id u32, x f32, y f32, yaw f32, speed f32, flags u8)
+#     REQUEST   t f64, rid u32, hour u8, pickup xyz 3×f32, dropoff xyz 3×f32
+#     DECISION  t f64, rid u32, taxi i32, pickup eta f32, route eta f32,
+#               route hash u64, route nodes u32
+#   flags: 1 = ego, 2 = taxi, 4 = taxi available for dispatch
+#
+# The header holds the seeds, map, resolution, graph hash, traffic light
+# positions, the routing config and the decision policy (trip route
+# alternatives k and how one is selected) the run used.
+#
+#   with TraceRecorder("runs/town04.trace", meta) as rec:
+#       rec.attach(world, fleet, ego_id)      # every world tick is recorded
+#       rec.request(t, rid, hour, pickup, dropoff)
+#       rec.decision(t, rid, taxi_id, pickup_eta, route, route_eta)
+
+import hashlib
+import json
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+import config
+from core.logger import get_logger
+
+log = get_logger("trace")
+
+MAGIC         = b"TAXITRC1"
+TRACE_VERSION = 1
+CHUNK_BYTES   = 64 * 1024
+
+TICK, REQUEST, DECISION = 1, 2, 3
+EGO, TAXI, AVAILABLE    = 1, 2, 4
+
+_U32      = struct.Struct("<I")
+_KIND     = struct.Struct("<B")
+_TICK     = struct.Struct("<dffH")
+_ACTOR    = struct.Struct("<IffffB")
+_REQUEST  = struct.Struct("<dIB6f")
+_DECISION = struct.Struct("<dIiffQI")
+
+Request  = namedtuple("Request", "t rid hour pickup dropoff")
+Decision = namedtuple("Decision", "t rid taxi pickup_eta route_eta route_hash route_nodes")
+
+
+class Tick(namedtuple("Tick", "t precipitation cloudiness payload")):
+    """Actor states stay packed until someone asks for them."""
+    __slots__ = ()
+
+    def actors(self):
+        """[(actor id, x, y, yaw, speed, flags)]"""
+        return list(_ACTOR.iter_unpack(self.payload))
+
+
+# ---------------------------------------------------------------------------
+# Fingerprints
+# ---------------------------------------------------------------------------
+
+def graph_hash(graph):
+    """Stable hash of topology + weights + restrictions (same graph → same hash)."""
+    h = hashlib.blake2b(digest_size=16)
+    for u in sorted(graph.graph):
+        for v, cost in sorted(graph.graph[u]):
+            h.update(struct.pack("<4q4qd", *u, *v, round(cost, 6)))
+    for triple in sorted(graph.turn_restrictions):
+        h.update(repr(triple).encode())
+    return h.hexdigest()
+
+
+def route_hash(route):
+    """u64 of a node route – equal routes, equal hashes, across processes."""
+    h = hashlib.blake2b(digest_size=8)
+    for nid in route or ():
+        h.update(struct.pack("<4q", *nid))
+    return int.from_bytes(h.digest(), "little")
+
+
+def routing_config():
+    return {"edge_penalties": config.EDGE_PENALTIES,
+            "transition_penalties": {f"{a}>{b}": v for (a, b), v in config.TRANSITION_PENALTIES.items()},
+            "edge_based": config.EDGE_BASED_ROUTING}
+
+
+def decision_policy(k=None, selector="min_eta"):
+    """Dispatcher.plan_ride arguments of a run – core.replay decides the same way."""
+    return {"k": k or config.ROUTE_ALTERNATIVES, "selector": selector}
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+
+class TraceRecorder:
+    def __init__(self, path, meta):
+        self.path   = path
+        self.meta   = dict(meta, version=TRACE_VERSION, created=time.time(),
+                           config=meta.get("config", routing_config()),
+                           policy=meta.get("policy", decision_policy()))
+        self._f     = open(path, "wb")
+        self._buf   = bytearray()
+        self._lock  = threading.Lock()           # world.on_tick runs on the client's thread
+        self._tick_cb = None
+        self.counts = {TICK: 0, REQUEST: 0, DECISION: 0}
+        header = json.dumps(self.meta, separators=(",", ":")).encode()
+        self._f.write(MAGIC + _U32.pack(len(header)) + header)
+
+    def _emit(self, kind, payload):
+        with self._lock:
+            self._buf += _KIND.pack(kind)
+            self._buf += payload
+            self.counts[kind] += 1
+            if len(self._buf) >= CHUNK_BYTES:
+                self._flush()
+
+    def _flush(self):
+        if self._buf:
+            data = zlib.compress(bytes(self._buf), 6)
+            self._f.write(_U32.pack(len(data)) + data)
+            self._buf.clear()
+
+    # ---------- records ---------------------------------------------------------
+
+    def tick(self, t, weather, actors):
+        """actors: [(id, x, y, yaw, speed, flags)]; weather: (precipitation, cloudiness)."""
+        parts = [_TICK.pack(t, weather[0], weather[1], len(actors))]
+        parts += [_ACTOR.pack(*a) for a in actors]
+        self._emit(TICK, b"".join(parts))
+
+    def request(self, t, rid, hour, pickup, dropoff):
+        self._emit(REQUEST, _REQUEST.pack(t, rid, hour, pickup.x, pickup.y, pickup.z,
+                                          dropoff.x, dropoff.y, dropoff.z))
+
+    def decision(self, t, rid, taxi_id, pickup_eta, route, route_eta):
+        self._emit(DECISION, _DECISION.pack(
+            t, rid, -1 if taxi_id is None else int(taxi_id),
+            float(pickup_eta or 0.0), float(route_eta or 0.0), route_hash(route), len(route or ())))
+
+    # ---------- live CARLA capture ---------------------------------------------
+
+    def attach(self, world, fleet=None, ego_id=None, weather_every=1.0):
+        """Record every world tick (ego, taxis with availability, background cars)."""
+        state = {"weather": None, "at": -1e9}
+
+        def on_tick(snapshot):
+            t = snapshot.timestamp.elapsed_seconds
+            if t - state["at"] >= weather_every:         # weather changes slowly: 1 RPC/s
+                w = world.get_weather()
+                state["weather"], state["at"] = (w.precipitation, w.cloudiness), t
+            taxis = fleet.taxis if fleet is not None else {}
+            free  = fleet.available if fleet is not None else ()
+            rows  = []
+            for actor in snapshot:
+                tr, v = actor.get_transform(), actor.get_velocity()
+                flags = (EGO if actor.id == ego_id else 0) | \
+                        (TAXI if actor.id in taxis else 0) | (AVAILABLE if actor.id in free else 0)
+                rows.append((actor.id, tr.location.x, tr.location.y, tr.rotation.yaw,
+                             (v.x * v.x + v.y * v.y) ** 0.5, flags))
+            self.tick(t, state["weather"], rows)
+
+        self._tick_cb = (world, world.on_tick(on_tick))
+        return self
+
+    def close(self):
+        if self._tick_cb:
+            world, cb = self._tick_cb
+            world.remove_on_tick(cb)
+            self._tick_cb = None
+        with self._lock:
+            self._flush()
+        self._f.close()
+        log.info("trace written", path=self.path, ticks=self.counts[TICK],
+                 requests=self.counts[REQUEST], decisions=self.counts[DECISION])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# Reader
+# ---------------------------------------------------------------------------
+
+class TraceReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a taxi trace")
+            (n,) = _U32.unpack(f.read(4))
+            self.meta = json.loads(f.read(n))
+            self._data_at = f.tell()
+        if self.meta.get("version") != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version in {path}")
+
+    def _chunks(self):
+        with open(self.path, "rb") as f:
+            f.seek(self._data_at)
+            while True:
+                head = f.read(4)
+                if len(head) < 4:
+                    return
+                (n,) = _U32.unpack(head)
+                yield zlib.decompress(f.read(n))
+
+    def __iter__(self):
+        """Tick / Request / Decision records in recording order."""
+        for buf in self._chunks():
+            mv, i, end = memoryview(buf), 0, len(buf)
+            while i < end:
+                kind = buf[i]
+                i += 1
+                if kind == TICK:
+                    t, rain, cloud, n = _TICK.unpack_from(buf, i)
+                    i += _TICK.size
+                    j = i + n * _ACTOR.size
+                    yield Tick(t, rain, cloud, mv[i:j])
+                    i = j
+                elif kind == REQUEST:
+                    t, rid, hour, *xyz = _REQUEST.unpack_from(buf, i)
+                    i += _REQUEST.size
+                    yield Request(t, rid, hour, tuple(xyz[:3]), tuple(xyz[3:]))
+                elif kind == DECISION:
+                    yield Decision(*_DECISION.unpack_from(buf, i))
+                    i += _DECISION.size
+                else:
+                    raise ValueError(f"corrupt trace {self.path}: record kind {kind}")
+
+    def decisions(self):
+        return [r for r in self if isinstance(r, Decision)]
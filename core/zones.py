@@ -0,0 +1,55 @@
+# core/zones.py
+
+import math
+from collections import defaultdict
+
+from routing.graph_builder import node_position
+from utils.helpers import to_xy
+
+
+class ZoneGrid:
+    """
+    Square zones laid over the graph.
+      • zone id  = (col, row) cell of a point
+      • centroid = graph node closest to the mean of the zone's nodes,
+                   so a taxi can always be routed to it.
+    """
+    def __init__(self, graph, cell_size=150.0):
+        self.cell_size      = cell_size
+        self.nodes_by_zone  = defaultdict(list)
+        for nid in graph.get_all_nodes():
+            self.nodes_by_zone[self.zone_of(node_position(nid))].append(nid)
+        self.centroids = {z: self._centroid(nodes)
+                          for z, nodes in self.nodes_by_zone.items()}
+
+    def _centroid(self, nodes):
+        pts = [node_position(n) for n in nodes]
+        mx  = sum(p[0] for p in pts) / len(pts)
+        my  = sum(p[1] for p in pts) / len(pts)
+        return min(nodes, key=lambda n: math.dist(node_position(n), (mx, my)))
+
+    def zone_of(self, point):
+        x, y = to_xy(point)
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def zones(self):
+        return list(self.centroids.keys())
+
+    def centroid_position(self, zone):
+        return node_position(self.centroids[zone])
+
+    def distance(self, zone_a, zone_b):
+        return math.dist(self.centroid_position(zone_a), self.centroid_position(zone_b))
+
+    def nearest_node(self, point):
+        """Closest node, searching the point's zone first, then its neighbours."""
+        x, y   = to_xy(point)
+        zx, zy = self.zone_of((x, y))
+        for ring in range(1, 4):
+            cands = [n for dx in range(-ring, ring + 1)
+                       for dy in range(-ring, ring + 1)
+                       for n in self.nodes_by_zone.get((zx + dx, zy + dy), ())]
+            if cands:
+                return min(cands, key=lambda n: math.dist(node_position(n), (x, y)))
+        return min(self.centroids.values(),
+                   key=lambda n: math.dist(node_position(n), (x, y)))
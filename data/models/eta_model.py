@@ -21,9 +21,10 @@ class ETAModel:
         print(f"Validation MAE: {mae:.2f} seconds")
         self.trained = True
 
-    def cross_validate(self, X, y, folds=20):
+    def cross_validate(self, X, y, folds=20, n_jobs=1):
         kf = KFold(n_splits=folds, shuffle=True, random_state=42)
-        scores = cross_val_score(self.pipeline, X, y, cv=kf, scoring='neg_mean_absolute_error')
+        scores = cross_val_score(self.pipeline, X, y, cv=kf, scoring='neg_mean_absolute_error',
+                                 n_jobs=n_jobs)
         mean_mae = -scores.mean()
         print(f"{folds}-fold Cross-Validation MAE: {mean_mae:.2f} seconds")
 
@@ -0,0 +1,259 @@
+# data/models/model_search.py
+#
+# Hyperparameter search for the ETA models: RandomForest and XGBoost configs
+# cross‑validated on a process pool, ranked by MAE against inference latency.
+#   • thread budget: `workers` processes × `threads` inner threads ≤ cores;
+#     each worker pins BLAS / OpenMP pools and passes n_jobs=threads to the
+#     model, so outer and inner parallelism never oversubscribe
+#   • the K train/validation folds are scaled once and saved as .npy files;
+#     workers open them with mmap_mode="r", so every process shares the same
+#     pages instead of pickling a copy of X per task.  The cache is keyed by
+#     a hash of the data, so reruns skip the scaling entirely
+#   • early stopping: after `min_folds` folds a config whose running MAE is
+#     worse than (1 + prune_margin) × best finished MAE is abandoned
+#
+#   python -m data.models.model_search --log data/ride_log.jsonl --folds 5
+#   python -m data.models.model_search --synthetic 20000 --workers 4
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import KFold
+from sklearn.preprocessing import StandardScaler
+
+from core.logger import get_logger
+
+log = get_logger("model_search")
+
+_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+# ---------------------------------------------------------------------------
+# Search space
+# ---------------------------------------------------------------------------
+
+def _grid(**axes):
+    keys = list(axes)
+    return [dict(zip(keys, values)) for values in itertools.product(*axes.values())]
+
+
+SEARCH_SPACE = {
+    "rf":  _grid(n_estimators=[50, 100, 200], max_depth=[None, 12, 24],
+                 min_samples_leaf=[1, 4]),
+    "xgb": _grid(n_estimators=[100, 200, 400], max_depth=[4, 6, 8],
+                 learning_rate=[0.05, 0.1]),
+}
+
+
+def make_model(kind, params, threads):
+    if kind == "rf":
+        return RandomForestRegressor(random_state=42, n_jobs=threads, **params)
+    from xgboost import XGBRegressor
+    return XGBRegressor(objective="reg:squarederror", random_state=42,
+                        n_jobs=threads, **params)
+
+
+def thread_plan(workers=None, cores=None):
+    """(outer processes, inner threads per process) with workers × threads ≤ cores."""
+    cores   = cores or os.cpu_count() or 1
+    workers = max(1, min(workers or cores, cores))
+    return workers, max(1, cores // workers)
+
+
+# ---------------------------------------------------------------------------
+# Fold cache (scaled once, shared through memory maps)
+# ---------------------------------------------------------------------------
+
+def build_fold_cache(X, y, folds, cache_dir, seed=42):
+    """Scale each fold on its training part and save it; returns the fold dir."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    digest = hashlib.sha1(X.tobytes() + y.tobytes() + f"{folds}:{seed}".encode()).hexdigest()[:16]
+    root   = os.path.join(cache_dir, digest)
+    if os.path.exists(os.path.join(root, "done")):
+        return root
+    os.makedirs(root, exist_ok=True)
+    kf = KFold(n_splits=folds, shuffle=True, random_state=seed)
+    for i, (tr, va) in enumerate(kf.split(X)):
+        scaler = StandardScaler().fit(X[tr])
+        np.save(os.path.join(root, f"f{i}_Xtr.npy"), scaler.transform(X[tr]))
+        np.save(os.path.join(root, f"f{i}_ytr.npy"), y[tr])
+        np.save(os.path.join(root, f"f{i}_Xva.npy"), scaler.transform(X[va]))
+        np.save(os.path.join(root, f"f{i}_yva.npy"), y[va])
+    open(os.path.join(root, "done"), "w").close()
+    return root
+
+
+def _fold(root, i):
+    load = lambda name: np.load(os.path.join(root, f"f{i}_{name}.npy"), mmap_mode="r")
+    return load("Xtr"), load("ytr"), load("Xva"), load("yva")
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+_best   = None               # shared best finished MAE (multiprocessing.Value)
+_limits = None
+
+
+def _init_worker(best, threads):
+    global _best, _limits
+    _best = best
+    # env vars are inherited from search(); this also caps pools already loaded
+    from threadpoolctl import threadpool_limits
+    _limits = threadpool_limits(limits=threads)
+
+
+def _latency_ms(model, X, repeats=200):
+    """Median single‑row predict time – what ETAEstimator.predict_eta pays."""
+    row = np.asarray(X[:1])
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        model.predict(row)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000.0
+
+
+def evaluate(kind, params, root, folds, threads, min_folds=2, prune_margin=0.25):
+    """Cross‑validate one config; stops early when it can't catch the leader."""
+    maes, fit_s, model = [], 0.0, None
+    for i in range(folds):
+        Xtr, ytr, Xva, yva = _fold(root, i)
+        model = make_model(kind, params, threads)
+        t0 = time.perf_counter()
+        model.fit(Xtr, ytr)
+        fit_s += time.perf_counter() - t0
+        maes.append(float(np.mean(np.abs(model.predict(Xva) - yva))))
+        best = _best.value if _best is not None else float("inf")
+        if len(maes) >= min_folds and statistics.fmean(maes) > best * (1 + prune_margin):
+            return {"model": kind, "params": params, "status": "pruned",
+                    "mae": statistics.fmean(maes), "folds": len(maes), "fit_s": fit_s}
+
+    mae = statistics.fmean(maes)
+    if _best is not None:
+        with _best.get_lock():
+            if mae < _best.value:
+                _best.value = mae
+    return {"model": kind, "params": params, "status": "done", "mae": mae,
+            "mae_std": statistics.pstdev(maes), "folds": len(maes),
+            "fit_s": fit_s / len(maes), "latency_ms": _latency_ms(model, Xva)}
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def _pareto(rows):
+    """Mark configs not beaten on both MAE and latency by another config."""
+    done = [r for r in rows if r["status"] == "done"]
+    for r in done:
+        r["pareto"] = not any(o is not r and o["mae"] <= r["mae"] and
+                              o["latency_ms"] <= r["latency_ms"] and
+                              (o["mae"] < r["mae"] or o["latency_ms"] < r["latency_ms"])
+                              for o in done)
+    return rows
+
+
+def search(X, y, kinds=("rf", "xgb"), folds=5, workers=None, cores=None,
+           cache_dir=None, min_folds=2, prune_margin=0.25, space=None):
+    """Run the search; returns the leaderboard (finished configs first, by MAE)."""
+    space   = space or SEARCH_SPACE
+    workers, threads = thread_plan(workers, cores)
+    cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "eta_fold_cache")
+    t0   = time.perf_counter()
+    root = build_fold_cache(X, y, folds, cache_dir)
+    log.info("fold cache ready", path=root, seconds=round(time.perf_counter() - t0, 2),
+             workers=workers, threads_per_worker=threads)
+
+    ctx  = multiprocessing.get_context("spawn")   # fresh workers: thread env applies
+    best = ctx.Value("d", float("inf"))
+    jobs = [(kind, params) for kind in kinds for params in space[kind]]
+    rows = []
+    saved = {var: os.environ.get(var) for var in _THREAD_VARS}
+    os.environ.update({var: str(threads) for var in _THREAD_VARS})
+    try:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                   initializer=_init_worker, initargs=(best, threads))
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+    with pool:
+        futures = {pool.submit(evaluate, kind, params, root, folds, threads,
+                               min_folds, prune_margin): (kind, params)
+                   for kind, params in jobs}
+        for fut in as_completed(futures):
+            kind, params = futures[fut]
+            try:
+                rows.append(fut.result())
+            except ImportError as e:                 # e.g. xgboost not installed
+                rows.append({"model": kind, "params": params, "status": f"skipped ({e.name})",
+                             "mae": float("inf"), "folds": 0})
+            log.debug("config finished", **{k: v for k, v in rows[-1].items() if k != "params"})
+
+    rows.sort(key=lambda r: (r["status"] != "done", r["mae"]))
+    log.info("search finished", configs=len(rows), seconds=round(time.perf_counter() - t0, 1),
+             pruned=sum(r["status"] == "pruned" for r in rows))
+    return _pareto(rows)
+
+
+def print_leaderboard(rows, top=15):
+    print(f"{'#':>3} {'model':<5}{'MAE s':>8}{'±':>6}{'folds':>6}{'fit s':>7}"
+          f"{'pred ms':>9}  {'pareto':<7}params")
+    for i, r in enumerate(rows[:top], 1):
+        if r["status"] != "done":
+            print(f"{i:>3} {r['model']:<5}{r['mae']:>8.2f}{'':>6}{r['folds']:>6}{'':>7}{'':>9}  "
+                  f"{r['status']:<7}{r['params']}")
+            continue
+        print(f"{i:>3} {r['model']:<5}{r['mae']:>8.2f}{r['mae_std']:>6.2f}{r['folds']:>6}"
+              f"{r['fit_s']:>7.2f}{r['latency_ms']:>9.3f}  {'*' if r['pareto'] else '':<7}"
+              f"{r['params']}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="ETA model hyperparameter search")
+    ap.add_argument("--log",        default="data/ride_log.jsonl", help="streamed ride log")
+    ap.add_argument("--synthetic",  type=int, default=0, help="use N synthetic rides instead")
+    ap.add_argument("--models",     nargs="+", choices=sorted(SEARCH_SPACE), default=["rf", "xgb"])
+    ap.add_argument("--folds",      type=int,   default=5)
+    ap.add_argument("--workers",    type=int,   default=None)
+    ap.add_argument("--min-folds",  type=int,   default=2)
+    ap.add_argument("--prune",      type=float, default=0.25, help="prune margin over the best MAE")
+    ap.add_argument("--out",        default=None, help="write the leaderboard as JSON")
+    args = ap.parse_args()
+
+    if args.synthetic:
+        from routing.synthetic import synthetic_rides
+        X, y = synthetic_rides(args.synthetic)
+    else:
+        from data.models.online_trainer import iter_chunks
+        chunks = list(iter_chunks(args.log))
+        if not chunks:
+            raise SystemExit(f"No rows in {args.log}")
+        X = np.vstack([c[0] for c in chunks])
+        y = np.concatenate([c[1] for c in chunks])
+
+    rows = search(X, y, args.models, args.folds, args.workers,
+                  min_folds=args.min_folds, prune_margin=args.prune)
+    print_leaderboard(rows)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(rows, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
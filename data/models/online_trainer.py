@@ -0,0 +1,327 @@
+# data/models/online_trainer.py
+#
+# Incremental ETA training from the streamed ride log.
+#   • rides are appended to data/ride_log.jsonl (routing.evaluation) with their
+#     feature vector and the measured time
+#   • each run reads only the rows added since the last one (byte offset),
+#     in chunks, and updates the learner in place:
+#        SGDLearner – StandardScaler.partial_fit + SGDRegressor.partial_fit
+#        XGBLearner – continued boosting, `rounds` new trees per chunk; past
+#                     `max_trees` a fresh ensemble on a reservoir sample
+#   • the avg‑delay feature is refreshed from the segment store when a row
+#     carries its segment list
+#   • every run that saw new rows publishes a versioned artifact
+#     (<dir>/v0007.pkl) and then atomically moves <dir>/current.json to it;
+#     ETAEstimator(<dir>) hot‑reloads from that pointer
+#
+#   python -m data.models.online_trainer --learner sgd --interval 300
+
+import argparse
+import json
+import os
+import pickle
+import threading
+import time
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from core.logger import get_logger, observe
+from utils.helpers import load_driving_graph
+
+log = get_logger("online_trainer")
+
+DELAY_FEATURE = 3            # index of avg_delay in extract_features()
+DEFAULT_DELAY = 2.5          # same fallback extract_features uses
+
+
+# ---------------------------------------------------------------------------
+# Streaming input
+# ---------------------------------------------------------------------------
+
+def refresh_delay(row, driving_graph):
+    """Recompute avg_delay from the current segment store (rows with 'segments')."""
+    features = list(row["features"])
+    segments = row.get("segments")
+    if segments and driving_graph:
+        total = 0.0
+        for x1, y1, x2, y2 in segments:
+            seg = driving_graph.get(str((x1, y1)), {}).get(str((x2, y2)))
+            total += seg["total_time"] / seg["samples"] if seg else DEFAULT_DELAY
+        features[DELAY_FEATURE] = total / len(segments)
+    return features
+
+
+def iter_chunks(path, chunk_size=5000, offset=0, driving_graph=None):
+    """
+    Yield (X, y, end_offset) for rows after byte `offset`.  A trailing line
+    still being written (no newline yet) is left for the next run.
+    """
+    if not os.path.exists(path):
+        return
+    X, y = [], []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            try:
+                row = json.loads(raw)
+                X.append(refresh_delay(row, driving_graph))
+                y.append(float(row["actual_time"]))
+            except (ValueError, KeyError, TypeError):
+                log.warning("skipping bad ride log row", offset=offset)
+                continue
+            if len(X) >= chunk_size:
+                yield np.asarray(X, dtype=float), np.asarray(y, dtype=float), offset
+                X, y = [], []
+    if X:
+        yield np.asarray(X, dtype=float), np.asarray(y, dtype=float), offset
+
+
+# ---------------------------------------------------------------------------
+# Learners – partial_fit(X, y) and pipeline() for ETAEstimator
+# ---------------------------------------------------------------------------
+
+class SGDLearner:
+    name = "sgd"
+
+    def __init__(self, alpha=1e-4, epochs=5, random_state=42):
+        self.scaler = StandardScaler()
+        self.model  = SGDRegressor(alpha=alpha, learning_rate="invscaling",
+                                   random_state=random_state)
+        self.epochs = epochs
+        self.rows   = 0
+
+    def partial_fit(self, X, y):
+        self.scaler.partial_fit(X)
+        Xs = self.scaler.transform(X)
+        for _ in range(self.epochs):
+            self.model.partial_fit(Xs, y)
+        self.rows += len(y)
+
+    def pipeline(self):
+        return Pipeline([("scaler", self.scaler), ("model", self.model)])
+
+
+class XGBLearner:
+    """
+    Continued boosting: each chunk adds `rounds` trees on top of the last
+    booster.  A uniform reservoir sample of every row seen is kept; once the
+    ensemble would pass `max_trees` it is refit from scratch on that sample
+    (scaler included, `refit_rounds` trees) instead of on the latest chunk
+    alone, and boosting continues from there.
+    """
+    name = "xgb"
+
+    def __init__(self, rounds=20, max_depth=6, learning_rate=0.1, max_trees=2000,
+                 reservoir=20000, refit_rounds=200, random_state=42):
+        self.params       = dict(max_depth=max_depth, learning_rate=learning_rate,
+                                 objective="reg:squarederror", random_state=random_state,
+                                 n_jobs=-1)
+        self.rounds       = rounds
+        self.max_trees    = max_trees
+        self.reservoir    = reservoir
+        self.refit_rounds = refit_rounds
+        self.scaler       = None         # frozen between refits – old trees see the same inputs
+        self.model        = None
+        self.rows         = 0
+        self.refits       = 0
+        self.sample_X     = None         # reservoir of raw rows (Algorithm R over self.rows)
+        self.sample_y     = None
+        self._rng         = np.random.default_rng(random_state)
+
+    def __setstate__(self, state):       # trainer states saved before the reservoir existed
+        self.__dict__.update(state)
+        for attr, default in (("reservoir", 20000), ("refit_rounds", 200), ("refits", 0),
+                              ("sample_X", None), ("sample_y", None)):
+            self.__dict__.setdefault(attr, default)
+        if "_rng" not in self.__dict__:
+            self._rng = np.random.default_rng(self.params.get("random_state"))
+
+    def _sample(self, X, y):
+        """Fold a chunk into the reservoir; every row seen so far is equally likely in it."""
+        if self.sample_X is None:
+            self.sample_X = np.empty((0, X.shape[1]))
+            self.sample_y = np.empty(0)
+        room = max(0, self.reservoir - len(self.sample_y))
+        if room:
+            self.sample_X = np.vstack([self.sample_X, X[:room]])
+            self.sample_y = np.concatenate([self.sample_y, y[:room]])
+        if len(y) > room:
+            # row number t replaces slot j ~ U[0, t] when j < reservoir; later rows win ties
+            t    = self.rows + np.arange(room, len(y))
+            slot = self._rng.integers(0, t + 1)
+            keep = slot < self.reservoir
+            self.sample_X[slot[keep]] = X[room:][keep]
+            self.sample_y[slot[keep]] = y[room:][keep]
+
+    def partial_fit(self, X, y):
+        from xgboost import XGBRegressor
+
+        self._sample(X, y)
+        self.rows += len(y)
+        prev = self.model.get_booster() if self.model is not None else None
+        if prev is not None and prev.num_boosted_rounds() + self.rounds > self.max_trees:
+            # cap model size: a fresh ensemble on the reservoir, not on this chunk alone
+            self.scaler = StandardScaler().fit(self.sample_X)
+            trees       = max(1, min(self.refit_rounds, self.max_trees // 2))   # room to keep boosting
+            self.model  = XGBRegressor(n_estimators=trees, **self.params)
+            self.model.fit(self.scaler.transform(self.sample_X), self.sample_y)
+            self.refits += 1
+            log.info("xgb ensemble refit", rows=len(self.sample_y), trees=trees)
+            return
+        if self.scaler is None:
+            self.scaler = StandardScaler().fit(X)
+        model = XGBRegressor(n_estimators=self.rounds, **self.params)
+        model.fit(self.scaler.transform(X), y, xgb_model=prev)
+        self.model = model
+
+    def pipeline(self):
+        return Pipeline([("scaler", self.scaler), ("model", self.model)])
+
+
+LEARNERS = {"sgd": SGDLearner, "xgb": XGBLearner}
+
+
+# ---------------------------------------------------------------------------
+# Publishing
+# ---------------------------------------------------------------------------
+
+def _atomic_write(path, write):
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def publish(pipeline, publish_dir, meta=None, keep=5):
+    """Write v####.pkl, then flip current.json to it; prune old artifacts."""
+    os.makedirs(publish_dir, exist_ok=True)
+    versions = sorted(int(n[1:5]) for n in os.listdir(publish_dir)
+                      if n.startswith("v") and n.endswith(".pkl"))
+    version  = (versions[-1] if versions else 0) + 1
+    artifact = f"v{version:04d}.pkl"
+    _atomic_write(os.path.join(publish_dir, artifact), lambda f: joblib.dump(pipeline, f))
+    pointer  = dict(meta or {}, version=version, artifact=artifact, published_at=time.time())
+    _atomic_write(os.path.join(publish_dir, "current.json"),
+                  lambda f: f.write(json.dumps(pointer, indent=2).encode()))
+    for old in versions[:-keep + 1] if keep > 1 else versions:
+        try:
+            os.remove(os.path.join(publish_dir, f"v{old:04d}.pkl"))
+        except FileNotFoundError:
+            pass
+    log.info("eta model published", dir=publish_dir, version=version, **(meta or {}))
+    return version
+
+
+# ---------------------------------------------------------------------------
+# Trainer
+# ---------------------------------------------------------------------------
+
+class OnlineTrainer:
+    def __init__(self, log_path="data/ride_log.jsonl", publish_dir="data/models/online/eta_sgd",
+                 learner=None, segment_store="data/driving_graph.json",
+                 chunk_size=5000, min_rows=50, interval=300.0):
+        self.log_path      = log_path
+        self.publish_dir   = publish_dir
+        self.segment_store = segment_store
+        self.chunk_size    = chunk_size
+        self.min_rows      = min_rows          # don't publish on a handful of rows
+        self.interval      = interval
+        self.state_path    = os.path.join(publish_dir, "trainer_state.pkl")
+        self.learner, self.offset, self.pending = self._load_state(learner)
+        self._stop   = threading.Event()
+        self._thread = None
+        self.history = []                      # per run: rows, seconds
+
+    def _load_state(self, learner):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "rb") as f:
+                state = pickle.load(f)
+            if learner is None or state["learner"].name == learner.name:
+                log.info("resuming trainer", offset=state["offset"], rows=state["learner"].rows)
+                return state["learner"], state["offset"], state.get("pending", 0)
+        return learner or SGDLearner(), 0, 0
+
+    def _save_state(self):
+        os.makedirs(self.publish_dir, exist_ok=True)
+        state = {"learner": self.learner, "offset": self.offset, "pending": self.pending}
+        _atomic_write(self.state_path, lambda f: pickle.dump(state, f, pickle.HIGHEST_PROTOCOL))
+
+    def run_once(self):
+        """Consume new ride log rows; publish if enough arrived. Returns rows used."""
+        t0    = time.perf_counter()
+        store = load_driving_graph(self.segment_store) if self.segment_store else {}
+        rows  = 0
+        for X, y, end in iter_chunks(self.log_path, self.chunk_size, self.offset, store):
+            self.learner.partial_fit(X, y)
+            self.offset = end
+            rows += len(y)
+        if not rows:
+            return 0
+        self.pending += rows
+        if self.pending >= self.min_rows:
+            publish(self.learner.pipeline(), self.publish_dir,
+                    meta={"learner": self.learner.name, "rows": self.learner.rows})
+            self.pending = 0
+        self._save_state()
+        seconds = time.perf_counter() - t0
+        self.history.append({"rows": rows, "seconds": round(seconds, 3)})
+        observe("eta_train_seconds", seconds)
+        log.info("online training run", rows=rows, total_rows=self.learner.rows,
+                 seconds=round(seconds, 3))
+        return rows
+
+    # ---------- schedule --------------------------------------------------------
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:            # a bad run must not kill the schedule
+                log.error("online training run failed", error=repr(e))
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="eta-trainer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="incremental ETA training from the ride log")
+    ap.add_argument("--log",      default="data/ride_log.jsonl")
+    ap.add_argument("--learner",  choices=sorted(LEARNERS), default="sgd")
+    ap.add_argument("--out",      default=None, help="publish dir (default data/models/online/eta_<learner>)")
+    ap.add_argument("--chunk",    type=int,   default=5000)
+    ap.add_argument("--interval", type=float, default=0.0, help="seconds between runs; 0 = run once")
+    args = ap.parse_args()
+
+    trainer = OnlineTrainer(args.log, args.out or f"data/models/online/eta_{args.learner}",
+                            learner=LEARNERS[args.learner](), chunk_size=args.chunk,
+                            interval=args.interval)
+    if not args.interval:
+        trainer.run_once()
+        return
+    trainer.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        trainer.stop()
+
+
+if __name__ == "__main__":
+    main()
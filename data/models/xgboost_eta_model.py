@@ -1,5 +1,8 @@
+import os
+
 import joblib
 from xgboost import XGBRegressor
+from sklearn.base import clone
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import KFold, cross_val_score
@@ -24,9 +27,18 @@ class XGBETAModel:
         self.pipeline.fit(X, y)
         self.trained = True
 
-    def cross_validate(self, X, y, folds=20):
+    def cross_validate(self, X, y, folds=20, n_jobs=1):
+        """n_jobs folds in parallel; XGBoost's own threads shrink to match so
+        folds × threads stays within the core count."""
         kf = KFold(n_splits=folds, shuffle=True, random_state=42)
-        scores = cross_val_score(self.pipeline, X, y, cv=kf, scoring='neg_mean_absolute_error')
+        pipeline = self.pipeline
+        if n_jobs != 1:
+            pipeline = clone(self.pipeline)
+            cores    = os.cpu_count() or 1
+            outer    = cores if n_jobs == -1 else min(n_jobs, cores)
+            pipeline.set_params(model__n_jobs=max(1, cores // outer))
+        scores = cross_val_score(pipeline, X, y, cv=kf, scoring='neg_mean_absolute_error',
+                                 n_jobs=n_jobs)
         mean_mae = -scores.mean()
         print(f"{folds}-fold Cross-Validation MAE: {mean_mae:.2f} seconds")
 
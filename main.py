@@ -1,11 +1,14 @@
 import carla  # type: ignore
 import time
 
-from routing.graph_builder import CarlaGraph  # note: your file is 'graph_builder.py'
+import config
+
+from routing.graph_registry import default_registry
 from routing.route_gen import RouteGenerator
 from carla_interface.taxi_agent import TaxiAgent
 from core.fleet_manager import FleetManager
 from carla_interface.scenario_controller import spawn_background_vehicles
+from carla_interface.debug_renderer import get_renderer
 import sys
 sys.path.append(r"C:\Users\eliav\Desktop\Uni\Workshop\CARLA_0.9.11\WindowsNoEditor\PythonAPI\carla")
 
@@ -34,22 +37,21 @@ def follow_vehicle(spectator, vehicle):
     rot = carla.Rotation(pitch=-15, yaw=transform.rotation.yaw)
     spectator.set_transform(carla.Transform(loc, rot))
 
-def main():
+def main(map_name=None):
     #connect to client
     client = carla.Client("localhost", 2000)
     client.set_timeout(10.0)
     choise = 1
 
-    #client.load_world("Town01")
-    world = client.get_world()
+    # python main.py Town01  → switch maps; the graph comes from its snapshot
+    world = client.load_world(map_name) if map_name else client.get_world()
     cleanup_actors(world)
     map_name = world.get_map().name
     print(f"🗌️ Current map: {map_name}")
 
-    print("🔄 Building waypoint graph...")
-    graph = CarlaGraph(world, resolution=2.0)
-    graph.build_graph()
-    print(f"✅ Graph built with {len(graph.get_all_nodes())} nodes. Visualizing...")
+    print("🔄 Loading waypoint graph...")
+    graph = default_registry().get(map_name, config.GRAPH_RESOLUTION, world=world)
+    print(f"✅ Graph ready with {len(graph.get_all_nodes())} nodes. Visualizing...")
     graph.visualize(color=(0, 255, 0), life_time=15.0)
 
     # Spawn vehicle
@@ -102,43 +104,18 @@ def main():
     # ② or (simpler) pass Locations directly
     # route = route_gen.dijkstra_locations(start_loc, end_loc)
 
-    # Start
-    world.debug.draw_string(
-        start_loc + carla.Location(z=2),
-        'START',
-        draw_shadow=False,
-        color=carla.Color(255, 0, 0),  # Red
-        life_time=1000.0,
-        persistent_lines=True
-    )
-
-    # End
-    world.debug.draw_string(
-        end_loc + carla.Location(z=2),
-        'END',
-        draw_shadow=False,
-        color=carla.Color(0, 0, 255),  # Blue
-        life_time=1000.0,
-        persistent_lines=True
-    )
+    renderer = get_renderer(world)
+    renderer.string(start_loc, 'START', color=(255, 0, 0), life_time=1000.0, z=2, cull=False)  # Red
+    renderer.string(end_loc,   'END',   color=(0, 0, 255), life_time=1000.0, z=2, cull=False)  # Blue
     if choise == 1:
-        waypoints = [graph.get_waypoint(n) for n in route]
+        waypoints = route_gen.route_waypoints(route, spacing=config.FOLLOW_SPACING)
         # after you spawn the taxi vehicle
         from core.route_agent import RouteAwareAgent
         route_agent = RouteAwareAgent(vehicle, world)
         route_agent.load_route(waypoints)        # your graph’s way-points
 
-        for i in range(len(waypoints) - 1):
-            wp1 = waypoints[i]
-            wp2 = waypoints[i + 1]
-            if wp1 and wp2:
-                world.debug.draw_line(
-                    wp1.transform.location + carla.Location(z=0.5),
-                    wp2.transform.location + carla.Location(z=0.5),
-                    thickness=0.2,
-                    color=carla.Color(0, 255, 0),  # Green
-                    life_time=10000.0
-                )
+        renderer.polyline([wp for wp in waypoints if wp], color=(0, 255, 0),  # Green
+                          thickness=0.2, life_time=10000.0, z=0.5, cull=False)
         if route:
             follow_vehicle(spectator, vehicle)
             start_time = time.time()
@@ -179,4 +156,4 @@ def main():
 
         
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
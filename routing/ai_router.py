@@ -1,17 +1,88 @@
  #ai_router.py
  
-import joblib
+import json
 import os
+import threading
+import time
+
+import joblib
+
+from core.logger import get_logger
+
+log = get_logger("eta")
+
+
+def resolve_model_path(model_path):
+    """
+    A plain .pkl, or a published model directory / its current.json pointer
+    (see data/models/online_trainer.py) → (artifact path, pointer or None).
+    """
+    pointer = None
+    if os.path.isdir(model_path):
+        pointer = os.path.join(model_path, "current.json")
+    elif model_path.endswith(".json"):
+        pointer = model_path
+    if pointer is None:
+        return model_path, None
+    with open(pointer) as f:
+        current = json.load(f)
+    return os.path.join(os.path.dirname(pointer), current["artifact"]), pointer
+
 
 class ETAEstimator:
-    def __init__(self, model_path="data/models/eta_predictor.pkl"):
+    """
+    Wraps a fitted sklearn pipeline.  Given a published model directory it
+    checks the version pointer every `reload_interval` seconds and swaps in
+    a newly published artifact without a restart.
+    """
+
+    def __init__(self, model_path="data/models/eta_predictor.pkl", reload_interval=5.0):
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model not found at: {model_path}")
-        self.model = joblib.load(model_path)
-        
+        self.model_path      = model_path
+        self.reload_interval = reload_interval
+        self._lock           = threading.Lock()
+        self._pointer_mtime  = None
+        self._next_check     = 0.0
+        self.version         = None
+        self._load()
+
+    def _load(self):
+        artifact, pointer = resolve_model_path(self.model_path)
+        model = joblib.load(artifact)
+        self._pointer = pointer
+        if pointer:
+            self._pointer_mtime = os.stat(pointer).st_mtime_ns
+        self.model   = model                      # single assignment → atomic swap
+        self.version = os.path.basename(artifact)
+        log.info("eta model loaded", artifact=artifact)
+
+    def maybe_reload(self):
+        """Reload if the published pointer moved; returns True when swapped."""
+        if self._pointer is None:
+            return False
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        with self._lock:
+            self._next_check = now + self.reload_interval
+            try:
+                mtime = os.stat(self._pointer).st_mtime_ns
+            except FileNotFoundError:
+                return False
+            if mtime == self._pointer_mtime:
+                return False
+            try:
+                self._load()
+            except (OSError, EOFError, KeyError, ValueError) as e:   # keep serving the old one
+                log.warning("eta model reload failed", error=str(e))
+                return False
+            return True
+
     def predict_eta(self, feature_vector):
+        self.maybe_reload()
         return float(self.model.predict([feature_vector])[0])
     
     def predict_batch(self, feature_matrix):
+        self.maybe_reload()
         return self.model.predict(feature_matrix).tolist()
-        
\ No newline at end of file
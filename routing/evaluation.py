@@ -2,6 +2,28 @@
 
 import json
 import os
+import threading
+import time
+
+from core.logger import get_logger
+
+log = get_logger("evaluation")
+
+_append_lock = threading.Lock()
+
+
+def append_ride_log(features, actual_time, path="data/ride_log.jsonl", **extra):
+    """
+    Append one training row (feature vector + measured time) to the streamed
+    ride log read by data/models/online_trainer.py.  One JSON object per line,
+    written with a single write so readers never see half a row.
+    """
+    row  = dict(extra, features=[float(v) for v in features],
+                actual_time=float(actual_time), ts=round(time.time(), 3))
+    line = json.dumps(row, separators=(",", ":")) + "\n"
+    with _append_lock:
+        with open(path, "a") as f:
+            f.write(line)
 
 def log_evaluation(
     ride_id,
@@ -11,7 +33,12 @@ def log_evaluation(
     selected_route,
     baseline_route,
     best_possible_time=None,
-    save_path="data/ride_logs.json"
+    save_path="data/ride_logs.json",
+    features=None,
+    segments=None,
+    stream_path="data/ride_log.jsonl",
+    map_name=None,
+    model_version=None
 ):
     entry = {
         "ride_id": ride_id,
@@ -41,7 +68,17 @@ def log_evaluation(
     with open(save_path, "w") as f:
         json.dump(logs, f, indent=2)
 
-    print(f"✅ Evaluation for ride {ride_id} logged.")
+    # training row for the online ETA trainer / routing.ride_analytics
+    if features is not None:
+        if segments is None and selected_route:
+            segments = [(a[0] / 10.0, a[1] / 10.0, b[0] / 10.0, b[1] / 10.0)
+                        for a, b in zip(selected_route[:-1], selected_route[1:])]
+        append_ride_log(features, actual_time, stream_path, ride_id=ride_id,
+                        predicted_eta=predicted_eta, segments=segments,
+                        baseline_time=baseline_time, best_possible_time=best_possible_time,
+                        map=map_name, model_version=model_version)
+
+    log.info("evaluation logged", ride_id=ride_id, eta_error=entry["eta_error"])
 
 def print_summary(entry):
     print(f"Ride {entry['ride_id']}:")
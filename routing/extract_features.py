@@ -17,63 +17,75 @@ def extract_features(route, graph, world, driving_graph):
         wp1 = graph.get_waypoint(route[i])
         wp2 = graph.get_waypoint(route[i + 1])
         
-        dist = wp1.transform.location.distance(wp2.transform.location)
+        dist = wp1.distance(wp2)
         total_distance += dist
         
-        yaw1 = wp1.transform.rotation.yaw
-        yaw2 = wp2.transform.rotation.yaw
+        yaw1 = wp1.yaw
+        yaw2 = wp2.yaw
         
         delta_yaw = abs(yaw2 - yaw1)
         if delta_yaw > 30:
             turns +=1
             
-        if wp1.isjunction:
+        if wp1.is_junction:
             junctions += 1
             
         total_speed += wp1.speed_limit * dist 
         
-        seg_id_1 = (round(wp1.transform.location.x, 1), round(wp1.transform.location.y, 1))
-        seg_id_2 = (round(wp2.transform.location.x, 1), round(wp2.transform.location.y, 1))
+        seg_id_1 = (round(wp1.x, 1), round(wp1.y, 1))
+        seg_id_2 = (round(wp2.x, 1), round(wp2.y, 1))
         seg = driving_graph.get(seg_id_1, {}).get(seg_id_2)
         
         if seg:
-            abg_delay = seg["total_time"] / seg["samples"]
-            total_delay += avg_delay
+            seg_delay = seg["total_time"] / seg["samples"]
+            total_delay += seg_delay
         else:
             total_delay += 2.5
             
         segment_count += 1
         
-        avg_speed = total_speed / total_distance if total_distance else 0.0
-        avg_delay = total_delay / segment_count if segment_count else 0.0
-        
-        hour = datetime.datetime.now().hour
-        
-        weather = world.get_weather()
-        weather_code = _weather_to_code(weather)
-        
-        lights = world.get_actors().filter("traffic.traffic_light")
-        for wp in [graph.get_waypoint(n) for n in route]:
-            for light in lights:
-                if wp.transform.location.distance(light.get_transform().location) < 10.0:
-                    traffic_lights += 1
-                    break
-                
-        return [
-            total_distance,
-            turns,
-            junctions,
-            avg_delay,
-            avg_speed,
-            hour,
-            weather_code,
-            traffic_lights
-        ]
+    avg_speed = total_speed / total_distance if total_distance else 0.0
+    avg_delay = total_delay / segment_count if segment_count else 0.0
+    
+    hour = _hour(world)
+    
+    weather = world.get_weather()
+    weather_code = _weather_to_code(weather)
+    
+    lights = [light.get_transform().location
+              for light in world.get_actors().filter("traffic.traffic_light")]
+    for wp in [graph.get_waypoint(n) for n in route]:
+        for light in lights:
+            if wp.distance(light) < 10.0:
+                traffic_lights += 1
+                break
+            
+    return [
+        total_distance,
+        turns,
+        junctions,
+        avg_delay,
+        avg_speed,
+        hour,
+        weather_code,
+        traffic_lights
+    ]
         
         
+def feature_context(world):
+    """Time/weather bucket the features depend on – part of the feature‑cache key."""
+    return _hour(world), _weather_to_code(world.get_weather())
+
+
+def _hour(world):
+    """Hour of day: the world's own clock when it has one (trace replay), else now."""
+    clock = getattr(world, "hour", None)
+    return clock() if clock is not None else datetime.datetime.now().hour
+
+
 def _weather_to_code(weather):
     
-        if weather.percipitation > 50:
+        if weather.precipitation > 50:
             return 2 #heavy rain
         elif weather.cloudiness > 50:
             return 1
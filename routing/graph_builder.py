@@ -1,26 +1,91 @@
 # routing/graph_builder.py  ⟵  completely rewritten
-from collections import defaultdict
-import carla
+from __future__ import annotations
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 import math
+import os
+import pickle
+import time
 from math import inf
 
+import config
+from core.logger import get_logger, span
+from carla_interface.debug_renderer import get_renderer
+from routing.node_record import NodeRecord
+
+try:
+    import carla
+    DRIVING = carla.LaneType.Driving
+except ImportError:          # headless tools work on prebuilt graphs / utils.fake_map
+    carla   = None
+    DRIVING = "Driving"
+
+
+log = get_logger("graph")
+
+# edge types (CarlaGraph.edge_types)
+FORWARD       = "forward"          # along a lane, in driving direction
+LANE_CHANGE   = "lane_change"      # to the neighbouring same‑direction lane
+JUNCTION_TURN = "junction_turn"    # entering a junction connector lane
+U_TURN        = "u_turn"           # onto the innermost opposite lane
+
+
+def node_position(node_id):
+    """(x, y) in metres encoded in a node ID – no waypoint lookup needed."""
+    return node_id[0] / 10.0, node_id[1] / 10.0
+
 
 class CarlaGraph:
     """
     Dense waypoint‑level graph:
       • node  = unique ID for every sampled waypoint
-      • edges = (successor, distance)   for
+      • edges = (successor, cost)   for
           – each wp.next(resolution)           (forward, junctions, turns…)
-          – left/right lane with same heading  (lateral moves)
-      • bidirectional on the same lane so you can search both ways.
+          – left/right lane with same heading  (lane changes)
+          – optionally the opposite lane       (U‑turns)
+          – lane exit → junction connector     (from the map topology)
+      • cost  = length + per‑type penalty (config.EDGE_PENALTIES, turn
+        direction for junction entries); edge_types[(a, b)] holds the type.
+      • directed=True follows lane direction; False is the old behaviour of
+        adding every forward edge both ways.
+      • turn_restrictions: forbidden (a, b, c) node triples, honoured by the
+        edge‑based search in RouteGenerator.
     """
 
-    def __init__(self, world, resolution: float = 2.0) -> None:
+    def __init__(self, world, resolution: float = 2.0, directed: bool = True,
+                 penalties: dict = None, u_turns: bool = False) -> None:
         self.world       = world
         self.map         = world.get_map()
         self.resolution  = resolution
-        self.graph       = defaultdict(list)   # node_id → List[(neigh_id, dist)]
-        self.node_lookup = {}                  # node_id → waypoint
+        self.directed    = directed
+        self.u_turns     = u_turns
+        self.penalties   = dict(config.EDGE_PENALTIES, **(penalties or {}))
+        self.graph       = defaultdict(list)   # node_id → List[(neigh_id, cost)]
+        self.node_lookup = {}                  # node_id → NodeRecord (live waypoint while building)
+        self.edge_types  = {}                  # (from_id, to_id) → edge type
+        self.turn_restrictions = set()         # {(a, b, c)}: no a→b→c
+        self.weights_version = 0               # bumped whenever an edge weight changes
+        self.metric_version  = 0               # … except for restrictions (landmark bounds hold)
+        self.landmarks   = None                # routing.landmarks.Landmarks (A* bounds)
+
+    @classmethod
+    def from_adjacency(cls, adjacency, world=None):
+        """Wrap an existing node_id → [(neigh_id, dist)] mapping (no CARLA)."""
+        graph = cls.__new__(cls)
+        graph.world       = world
+        graph.map         = world.get_map() if world else None
+        graph.resolution  = None
+        graph.directed    = True
+        graph.u_turns     = False
+        graph.penalties   = dict(config.EDGE_PENALTIES)
+        graph.graph       = defaultdict(list, adjacency)
+        graph.node_lookup = {}
+        graph.edge_types  = {}
+        graph.turn_restrictions = set()
+        graph.weights_version = 0
+        graph.metric_version  = 0
+        graph.landmarks   = None
+        return graph
 
     # ---------- internal helpers ------------------------------------------------
 
@@ -33,95 +98,350 @@ class CarlaGraph:
         loc = wp.transform.location
         return (self._round(loc.x), self._round(loc.y), wp.road_id, wp.lane_id)
 
-    def _add_edge(self, from_id, to_id, dist: float, bidirectional: bool = False):
-        self.graph[from_id].append((to_id, dist))
-        if bidirectional:
-            self.graph[to_id].append((from_id, dist))
+    def _add_edge(self, from_id, to_id, dist: float, bidirectional: bool = False,
+                  kind: str = FORWARD, penalty: float = None):
+        """Append from→to with cost dist + penalty (type default); duplicates skipped."""
+        if penalty is None:
+            penalty = self.penalties.get(kind, 0.0)
+        pairs = ((from_id, to_id), (to_id, from_id)) if bidirectional else ((from_id, to_id),)
+        for a, b in pairs:
+            if (a, b) in self.edge_types or a == b:
+                continue
+            self.graph[a].append((b, dist + penalty))
+            self.edge_types[(a, b)] = kind
+        self.weights_version += 1
+        self.metric_version  += 1
+
+    def _turn_direction(self, entry_wp, exit_wp):
+        """'left' / 'right' / 'straight' from the heading change across a lane."""
+        d = (exit_wp.transform.rotation.yaw - entry_wp.transform.rotation.yaw + 180.0) % 360.0 - 180.0
+        if abs(d) < 30.0:
+            return "straight"
+        return "right" if d > 0 else "left"   # CARLA yaw grows clockwise seen from above
+
+    def _junction_penalty(self, lane_turns, wp):
+        turn = lane_turns.get((wp.road_id, wp.lane_id), "straight")
+        return self.penalties[JUNCTION_TURN] + self.penalties.get("turn_" + turn, 0.0)
+
+    def _lane_index(self):
+        """(road_id, lane_id) → [(node_id, x, y)] in node_lookup order."""
+        index = defaultdict(list)
+        for nid, wp in self.node_lookup.items():
+            loc = wp.transform.location
+            index[(wp.road_id, wp.lane_id)].append((nid, loc.x, loc.y))
+        return index
 
-    def _nearest_sample(self, wp):
+    def _nearest_sample(self, wp, lane_index):
         best_id   = None
         best_dist = inf
-        for cand_id, cand_wp in self.node_lookup.items():
-            if (cand_wp.road_id, cand_wp.lane_id) == (wp.road_id, wp.lane_id):
-                d = cand_wp.transform.location.distance(wp.transform.location)
-                if d < best_dist:
-                    best_dist, best_id = d, cand_id
+        loc = wp.transform.location
+        for cand_id, x, y in lane_index.get((wp.road_id, wp.lane_id), ()):
+            d = math.hypot(x - loc.x, y - loc.y)
+            if d < best_dist:
+                best_dist, best_id = d, cand_id
         return best_id if best_dist <= self.resolution else None
+
+    def _snap_id(self, node_id, lane_index, origin=None):
+        """
+        wp.next() across a lane boundary lands between the successor lane's
+        samples; map it onto a sample within `resolution` so the lanes stay
+        connected.  With `origin` (the edge's source) the sample closest to
+        the source wins, so a lane's first sample is never skipped – on a
+        directed graph it would otherwise be unreachable.
+        """
+        if node_id in self.node_lookup:
+            return node_id
+        x, y = node_position(node_id)
+        ox, oy = node_position(origin) if origin else (x, y)
+        best_id, best_key = node_id, inf
+        for cand_id, cx, cy in lane_index.get((node_id[2], node_id[3]), ()):
+            if math.hypot(cx - x, cy - y) < self.resolution:
+                key = math.hypot(cx - ox, cy - oy)
+                if key < best_key:
+                    best_key, best_id = key, cand_id
+        return best_id
+
+    # ---------- per‑item queries (run on the worker pool) -----------------------
+
+    def _forward_query(self, wp):
+        loc = wp.transform.location
+        return [(self._id(nxt), loc.distance(nxt.transform.location))
+                for nxt in wp.next(self.resolution)]
+
+    def _lateral_query(self, wp):
+        out = []
+        if wp.is_junction:                      # no lane changes inside junctions
+            return out
+        for which, side in (("L", wp.get_left_lane()), ("R", wp.get_right_lane())):
+            if not side or side.lane_type != DRIVING:
+                continue
+            same_dir = math.copysign(1, side.lane_id) == math.copysign(1, wp.lane_id)
+            if not same_dir:
+                if not (self.u_turns and which == "L"):
+                    continue
+                which = "U"
+            dist = wp.transform.location.distance(side.transform.location)
+            out.append((self._id(side), dist, which, side))
+        return out
+
+    def _topology_query(self, pair, lane_index):
+        entry_wp, exit_wp = pair
+        # snap both ends to already‑sampled nodes if possible
+        nid_from = self._nearest_sample(entry_wp, lane_index) or self._id(entry_wp)
+        nid_to   = self._nearest_sample(exit_wp, lane_index)  or self._id(exit_wp)
+        dist = entry_wp.transform.location.distance(exit_wp.transform.location)
+        return nid_from, nid_to, dist
+
+    # ---------- parallel / resumable phase runner -------------------------------
+
+    @staticmethod
+    def _bounded_map(pool, fn, items, max_in_flight):
+        """Ordered map over a thread pool with at most `max_in_flight` RPCs queued."""
+        if pool is None:
+            for item in items:
+                yield fn(item)
+            return
+        window = deque()
+        for item in items:
+            if len(window) >= max_in_flight:
+                yield window.popleft().result()
+            window.append(pool.submit(fn, item))
+        while window:
+            yield window.popleft().result()
+
+    def _run_phase(self, name, items, fn, pool, max_in_flight, chunk_size,
+                   checkpoint, checkpoint_path, strip=None):
+        """
+        Evaluate `fn` over `items` in chunks, in input order.  Finished chunks
+        are stored in the checkpoint (after `strip` removes simulator objects)
+        so an interrupted build skips them on the next run.
+        """
+        done    = checkpoint["phases"].setdefault(name, [])
+        results = [r for chunk in done for r in chunk]
+        t0      = time.perf_counter()
+        for start in range(len(results), len(items), chunk_size):
+            chunk = list(self._bounded_map(pool, fn, items[start:start + chunk_size],
+                                           max_in_flight))
+            results.extend(chunk)
+            done.append([strip(r) for r in chunk] if strip else chunk)
+            self._save_checkpoint(checkpoint, checkpoint_path)
+        self.build_stats[name] = round(time.perf_counter() - t0, 3)
+        log.debug("build phase done", phase=name, items=len(items),
+                  seconds=self.build_stats[name])
+        return results
+
+    def _load_checkpoint(self, path, signature):
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                ckpt = pickle.load(f)
+            if ckpt.get("signature") == signature:
+                done = sum(len(c) for p in ckpt["phases"].values() for c in p)
+                log.info("resuming build from checkpoint", path=path, items_done=done)
+                return ckpt
+        return {"signature": signature, "phases": {}}
+
+    @staticmethod
+    def _save_checkpoint(checkpoint, path):
+        if not path:
+            return
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
     # ---------- public API ------------------------------------------------------
 
-    def build_graph(self):
-        print("🔄   sampling map …")
+    def build_graph(self, workers: int = 1, max_in_flight: int = 64,
+                    checkpoint_path: str = None, chunk_size: int = 5000):
+        """
+        Sample the map and add forward, lateral and junction‑turn edges.
+
+        workers > 1 runs the per‑waypoint RPCs on a thread pool (at most
+        `max_in_flight` outstanding).  Results are merged in input order, so
+        node IDs and edge lists are identical for any worker count.
+        With `checkpoint_path` finished chunks are persisted and an
+        interrupted build resumes from them.  Phase timings → self.build_stats.
+        """
+        self.build_stats = {}
+        t0 = time.perf_counter()
         wps = self.map.generate_waypoints(self.resolution)
-        print(f"🧩  {len(wps):,} waypoints sampled at {self.resolution} m")
+        log.info("map sampled", waypoints=len(wps), resolution=self.resolution)
 
         # 1) register every waypoint as a node
-        for wp in wps:
-            nid = self._id(wp)
+        ids = [self._id(wp) for wp in wps]
+        for nid, wp in zip(ids, wps):
             self.node_lookup[nid] = wp
+        self.build_stats["sample"] = round(time.perf_counter() - t0, 3)
 
-        # 2) add forward / junction edges
-        fwd_edges = 0
-        for wp in wps:
-            nid = self._id(wp)
-            for nxt in wp.next(self.resolution):
-                n_nid = self._id(nxt)
-                dist  = wp.transform.location.distance(nxt.transform.location)
-                self._add_edge(nid, n_nid, dist, bidirectional=True)
-                fwd_edges += 1
-
-        # 3) add lateral edges (same direction lanes only)
-        lat_edges = 0
-        for nid, wp in list(self.node_lookup.items()):
-            for side in (wp.get_left_lane(), wp.get_right_lane()):
-                if side                                 and \
-                   side.lane_type == carla.LaneType.Driving and \
-                   math.copysign(1, side.lane_id) == math.copysign(1, wp.lane_id):
-                    sid   = self._id(side)
-                    self.node_lookup[sid] = side
-                    dist = wp.transform.location.distance(side.transform.location)
-                    self._add_edge(nid, sid, dist, bidirectional=True)
-                    lat_edges += 1
-                    
+        signature  = (getattr(self.map, "name", ""), self.resolution, len(wps),
+                      ids[0] if ids else None, ids[-1] if ids else None, self.u_turns)
+        checkpoint = self._load_checkpoint(checkpoint_path, signature)
+        pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        bidir = not self.directed
+
+        # turn direction of every junction connector lane (topology is one RPC)
         topo_turns = self.map.get_topology()
-        jx_edges   = 0
-        for entry_wp, exit_wp in topo_turns:
-            # snap both ends to already‑sampled nodes if possible
-            nid_from = self._nearest_sample(entry_wp) or self._id(entry_wp)
-            nid_to   = self._nearest_sample(exit_wp)  or self._id(exit_wp)
+        lane_turns = {(entry.road_id, entry.lane_id): self._turn_direction(entry, exit_)
+                      for entry, exit_ in topo_turns if entry.is_junction}
+        try:
+            # 2) add forward / junction edges
+            fwd = self._run_phase("forward", wps, self._forward_query, pool,
+                                  max_in_flight, chunk_size, checkpoint, checkpoint_path)
+            fwd_edges  = 0
+            lane_index = self._lane_index()
+            for nid, wp, edges in zip(ids, wps, fwd):
+                for n_nid, dist in edges:
+                    snapped = self._snap_id(n_nid, lane_index, origin=nid)
+                    if snapped != n_nid:
+                        n_nid, dist = snapped, math.dist(node_position(nid), node_position(snapped))
+                    target = self.node_lookup.get(n_nid)
+                    if target is not None and target.is_junction and not wp.is_junction:
+                        self._add_edge(nid, n_nid, dist, bidir, JUNCTION_TURN,
+                                       self._junction_penalty(lane_turns, target))
+                    else:
+                        self._add_edge(nid, n_nid, dist, bidir, FORWARD)
+                    fwd_edges += 1
 
-            self.node_lookup.setdefault(nid_from, entry_wp)
-            self.node_lookup.setdefault(nid_to,   exit_wp)
+            # 3) add lateral edges (same direction lanes only) – queried against
+            #    a snapshot of the sampled nodes, merged afterwards
+            base = list(self.node_lookup.items())
+            lat  = self._run_phase("lateral", [wp for _, wp in base], self._lateral_query,
+                                   pool, max_in_flight, chunk_size, checkpoint,
+                                   checkpoint_path,
+                                   strip=lambda r: [(sid, d, w, None) for sid, d, w, _ in r])
+            lat_edges = 0
+            for (nid, wp), sides in zip(base, lat):
+                for sid, dist, which, side in sides:
+                    snapped = self._snap_id(sid, lane_index)
+                    if snapped == sid and sid not in self.node_lookup:
+                        if side is None:    # restored from checkpoint: re‑fetch once
+                            side = wp.get_right_lane() if which == "R" else wp.get_left_lane()
+                        self.node_lookup[sid] = side
+                    kind = U_TURN if which == "U" else LANE_CHANGE
+                    # each side adds its own lane change, so one direction suffices
+                    self._add_edge(nid, snapped, dist, bidir and kind == LANE_CHANGE, kind)
+                    lat_edges += 1
 
-            dist = entry_wp.transform.location.distance(exit_wp.transform.location)
-            self._add_edge(nid_from, nid_to, dist, bidirectional=False)
-            jx_edges += 1
+            # 4) junction turns from the topology, snapped to the nodes above
+            lane_index = self._lane_index()
+            jx = self._run_phase("topology", topo_turns,
+                                 lambda pair: self._topology_query(pair, lane_index),
+                                 pool, max_in_flight, chunk_size, checkpoint, checkpoint_path)
+            jx_edges = 0
+            for (entry_wp, exit_wp), (nid_from, nid_to, dist) in zip(topo_turns, jx):
+                self.node_lookup.setdefault(nid_from, entry_wp)
+                self.node_lookup.setdefault(nid_to,   exit_wp)
+                if entry_wp.is_junction:    # turn penalty was paid entering the connector
+                    self._add_edge(nid_from, nid_to, dist, False, JUNCTION_TURN, 0.0)
+                else:
+                    self._add_edge(nid_from, nid_to, dist, False, FORWARD)
+                jx_edges += 1
 
-        print(f"↪️  junction‑turn edges: {jx_edges:,}")
+            # 5) lane exit → connector entry: a connector shorter than the
+            #    resolution is one sample that wp.next() from the approach lane
+            #    steps over, so on a directed graph nothing would enter it
+            exits = defaultdict(list)
+            for (entry_wp, exit_wp), (_, nid_to, _) in zip(topo_turns, jx):
+                if not entry_wp.is_junction:
+                    loc = exit_wp.transform.location
+                    exits[(round(loc.x), round(loc.y))].append((nid_to, loc))
+            for (entry_wp, _), (nid_from, _, _) in zip(topo_turns, jx):
+                if not entry_wp.is_junction:
+                    continue
+                loc = entry_wp.transform.location
+                cx, cy = round(loc.x), round(loc.y)
+                for nid_in, exit_loc in [e for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                                         for e in exits.get((cx + dx, cy + dy), ())]:
+                    if exit_loc.distance(loc) > 1.0:
+                        continue
+                    self._add_edge(nid_in, nid_from, math.dist(node_position(nid_in),
+                                                               node_position(nid_from)),
+                                   False, JUNCTION_TURN, self._junction_penalty(lane_turns, entry_wp))
+                    jx_edges += 1
+        finally:
+            if pool:
+                pool.shutdown()
 
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
 
+        # 6) keep plain records, drop the simulator proxies
+        self.node_lookup = {nid: NodeRecord.from_waypoint(wp)
+                            for nid, wp in self.node_lookup.items()}
 
-        print(f"✅  graph built   nodes: {len(self.node_lookup):,}   "
-              f"edges: forward {fwd_edges:,}  lateral {lat_edges:,}")
+        self.build_stats["total"] = round(time.perf_counter() - t0, 3)
+        log.info("graph built", nodes=len(self.node_lookup), forward_edges=fwd_edges,
+                 lateral_edges=lat_edges, junction_edges=jx_edges,
+                 **{f"{k}_s": v for k, v in self.build_stats.items()})
 
     # ---------- convenience -----------------------------------------------------
 
+    def set_edge_weight(self, from_id, to_id, dist: float):
+        """Re‑weight an existing edge (e.g. live traffic); invalidates cached routes."""
+        self.graph[from_id] = [(n, dist if n == to_id else d)
+                               for n, d in self.graph[from_id]]
+        self.weights_version += 1
+        self.metric_version  += 1
+
     def get_neighbors(self, node_id):
         return self.graph.get(node_id, [])
 
+    def edge_type(self, from_id, to_id):
+        return self.edge_types.get((from_id, to_id), FORWARD)
+
+    def restrict_turn(self, from_road, to_road):
+        """
+        Forbid driving from road `from_road` into road `to_road` through a
+        junction.  Stored as (a, b, c) triples on the edges entering each
+        matching connector lane; returns how many triples were added.
+        """
+        added = 0
+        for (a, b), kind in list(self.edge_types.items()):
+            if kind != JUNCTION_TURN or a[2] != from_road or b[2] == from_road:
+                continue
+            # follow the connector lane to where it leaves the junction
+            cur, seen = b, set()
+            while cur[2] == b[2] and cur[3] == b[3] and cur not in seen:
+                seen.add(cur)
+                nxt = [n for n, _ in self.graph.get(cur, ())
+                       if self.edge_types.get((cur, n)) in (FORWARD, JUNCTION_TURN)]
+                if not nxt:
+                    break
+                cur = nxt[0]
+            if cur[2] != to_road:
+                continue
+            for c, _ in self.graph.get(b, ()):
+                if c[2] in (b[2], to_road) and (a, b, c) not in self.turn_restrictions:
+                    self.turn_restrictions.add((a, b, c))
+                    added += 1
+        self.weights_version += 1
+        return added
+
     def get_waypoint(self, node_id):
+        """The node's NodeRecord (x, y, z, yaw, road_id, lane_id, …)."""
         return self.node_lookup.get(node_id)
 
+    def live_waypoint(self, node_id):
+        """Fetch the simulator's carla.Waypoint for a node (one RPC, not cached)."""
+        rec = self.node_lookup.get(node_id)
+        if rec is None or self.map is None:
+            return None
+        if hasattr(self.map, "get_waypoint_xodr"):
+            wp = self.map.get_waypoint_xodr(rec.road_id, rec.lane_id, rec.s)
+            if wp is not None:
+                return wp
+        return self.map.get_waypoint(rec.location)
+
     def get_all_nodes(self):
         return list(self.graph.keys())
 
     # optional visual helpers
     def visualize(self, color=(0, 255, 0), life_time=30.0):
-        for wp in self.node_lookup.values():
-            self.world.debug.draw_string(wp.transform.location,
-                                         'O',
-                                         draw_shadow=False,
-                                         color=carla.Color(*color),
-                                         life_time=life_time)
+        """Queue every node on the debug renderer (culled / throttled there)."""
+        renderer = get_renderer(self.world)
+        if renderer.enabled:
+            renderer.points(self.node_lookup.values(), text='O',
+                            color=color, life_time=life_time)
 
     def get_closest_node(self, location: carla.Location):
         """
@@ -129,12 +449,14 @@ class CarlaGraph:
         """
         closest_id   = None
         min_distance = float("inf")
+        x, y, z      = location.x, location.y, location.z
 
-        for node_id, wp in self.node_lookup.items():
-            dist = location.distance(wp.transform.location)
-            if dist < min_distance:
-                min_distance = dist
-                closest_id   = node_id
+        with span("nearest_node"):
+            for node_id, rec in self.node_lookup.items():
+                dist = (rec.x - x) ** 2 + (rec.y - y) ** 2 + (rec.z - z) ** 2
+                if dist < min_distance:
+                    min_distance = dist
+                    closest_id   = node_id
 
         return closest_id
 
@@ -0,0 +1,239 @@
+# routing/graph_registry.py
+#
+# Process‑wide cache of built graphs keyed by (map name, resolution).
+#   • get() loads the map's snapshot on first use (or builds + saves it when a
+#     live world for that map is passed and no snapshot exists yet)
+#   • snapshot files are named <map>_<resolution>_<fingerprint>.pkl: the
+#     fingerprint hashes the build config (directed, u_turns, edge penalties)
+#     and SNAPSHOT_FORMAT, so a snapshot built under another config is never
+#     loaded – it is rebuilt next to it instead
+#   • the returned CarlaGraph is shared by every caller – treat it as read‑only
+#   • when the resident total exceeds the memory budget the least recently
+#     used maps are dropped (callers still holding one keep it alive)
+#   • stats() reports load time, resident size and hits per map
+#
+#   registry = default_registry()
+#   graph    = registry.get("Town04", 2.0, world=world)
+#
+# Prebuild snapshots for the maps an experiment rotates over:
+#   python -m routing.graph_registry --maps Town01 Town02 Town04 --resolution 2.0
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from core.logger import get_logger, observe
+from routing.graph_builder import CarlaGraph
+from routing.landmarks import compute_landmarks
+from routing.snapshot import SNAPSHOT_FORMAT, load_snapshot, save_snapshot
+
+log = get_logger("graph_registry")
+
+
+def map_key(map_name):
+    """'Carla/Maps/Town04' / 'Town04_Opt' / 'Town04' → 'Town04'."""
+    return os.path.basename(map_name or "").replace("_Opt", "") or "unknown"
+
+
+def build_fingerprint(directed=True, u_turns=False, penalties=None):
+    """Short hash of everything besides map and resolution a snapshot's edges depend on."""
+    spec = {"format":    SNAPSHOT_FORMAT,
+            "directed":  bool(directed),
+            "u_turns":   bool(u_turns),
+            "penalties": dict(config.EDGE_PENALTIES, **(penalties or {}))}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:10]
+
+
+def graph_nbytes(graph):
+    """Approximate resident size of a graph's adjacency, node table and landmarks."""
+    size = sys.getsizeof(graph.graph) + sys.getsizeof(graph.node_lookup)
+    for nid, edges in graph.graph.items():
+        size += sys.getsizeof(nid) + sys.getsizeof(edges)
+        size += len(edges) * (sys.getsizeof((nid, 0.0)) + 24)   # tuple + float
+    for rec in graph.node_lookup.values():
+        size += sys.getsizeof(rec) + 6 * 24                       # + boxed x, y, z, yaw, s, limit
+    if getattr(graph, "landmarks", None) is not None:
+        size += graph.landmarks.nbytes
+    return size
+
+
+class _Entry:
+    __slots__ = ("graph", "nbytes", "load_s", "source", "hits", "loaded_at")
+
+    def __init__(self, graph, nbytes, load_s, source):
+        self.graph, self.nbytes, self.load_s, self.source = graph, nbytes, load_s, source
+        self.hits      = 0
+        self.loaded_at = time.time()
+
+
+class GraphRegistry:
+    def __init__(self, snapshot_dir=None, memory_budget_mb=None,
+                 directed=True, u_turns=False, penalties=None):
+        self.snapshot_dir  = snapshot_dir or config.GRAPH_SNAPSHOT_DIR
+        self.build_config  = {"directed": directed, "u_turns": u_turns,
+                              "penalties": dict(penalties or {})}
+        self.fingerprint   = build_fingerprint(**self.build_config)
+        self.budget_bytes  = int((memory_budget_mb if memory_budget_mb is not None
+                                  else config.GRAPH_MEMORY_BUDGET_MB) * 1024 * 1024)
+        self._graphs       = OrderedDict()       # (map, resolution) → _Entry
+        self._lock         = threading.Lock()
+        self._loading      = {}                  # key → Lock, one loader per map
+        self.evictions     = 0
+        self.history       = {}                  # key → last load stats, kept after eviction
+
+    # ---------- paths -----------------------------------------------------------
+
+    def snapshot_path(self, map_name, resolution):
+        return os.path.join(self.snapshot_dir,
+                            f"{map_key(map_name)}_{float(resolution)}_{self.fingerprint}.pkl")
+
+    def has_snapshot(self, map_name, resolution):
+        return os.path.exists(self.snapshot_path(map_name, resolution))
+
+    # ---------- lookup ----------------------------------------------------------
+
+    def get(self, map_name, resolution=2.0, world=None, **build_kwargs):
+        """
+        Shared graph for (map_name, resolution).  Loaded from its snapshot on
+        first use; with no snapshot, `world` (already on that map) is used to
+        build one and the result is saved for next time.
+        """
+        key = (map_key(map_name), float(resolution))
+        with self._lock:
+            entry = self._graphs.get(key)
+            if entry is not None:
+                self._graphs.move_to_end(key)
+                entry.hits += 1
+                return entry.graph
+            loader = self._loading.setdefault(key, threading.Lock())
+
+        with loader:                             # concurrent callers wait for one load
+            with self._lock:
+                entry = self._graphs.get(key)
+                if entry is not None:
+                    entry.hits += 1
+                    return entry.graph
+            graph, load_s, source = self._load(key, world, build_kwargs)
+            entry = _Entry(graph, graph_nbytes(graph), load_s, source)
+            with self._lock:
+                self._graphs[key] = entry
+                self.history[key] = {"load_s": load_s, "source": source,
+                                     "size_mb": round(entry.nbytes / 2**20, 2)}
+                self._evict(keep=key)
+
+        observe("graph_load_seconds", load_s)
+        log.info("graph loaded", map=key[0], resolution=key[1], source=source,
+                 seconds=round(load_s, 3), size_mb=round(entry.nbytes / 2**20, 2),
+                 resident_mb=round(self.resident_bytes() / 2**20, 2))
+        return graph
+
+    def _load(self, key, world, build_kwargs):
+        path = self.snapshot_path(*key)
+        t0   = time.perf_counter()
+        if os.path.exists(path):
+            graph = load_snapshot(path, world=world)
+            return graph, time.perf_counter() - t0, "snapshot"
+        if world is None:
+            raise FileNotFoundError(f"No graph snapshot for {key[0]} @ {key[1]} m with build "
+                                    f"config {self.fingerprint} ({path}) and no world to "
+                                    f"build one from")
+        live = map_key(getattr(world.get_map(), "name", ""))
+        if live != key[0]:
+            raise ValueError(f"World is on {live}, cannot build a graph for {key[0]}")
+        graph = CarlaGraph(world, resolution=key[1], **self.build_config)
+        graph.build_graph(**build_kwargs)
+        if config.ALT_LANDMARKS:
+            graph.landmarks = compute_landmarks(graph, config.ALT_LANDMARKS, config.ALT_SELECTION)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        save_snapshot(graph, path)
+        return graph, time.perf_counter() - t0, "built"
+
+    # ---------- memory budget ---------------------------------------------------
+
+    def resident_bytes(self):
+        return sum(e.nbytes for e in self._graphs.values())
+
+    def _evict(self, keep=None):
+        """Drop least‑recently‑used graphs until under budget (caller holds _lock)."""
+        while self.resident_bytes() > self.budget_bytes and len(self._graphs) > 1:
+            key = next(iter(self._graphs))
+            if key == keep:
+                break
+            entry = self._graphs.pop(key)
+            self.evictions += 1
+            log.info("graph evicted", map=key[0], resolution=key[1],
+                     size_mb=round(entry.nbytes / 2**20, 2))
+
+    def evict(self, map_name, resolution=2.0):
+        with self._lock:
+            return self._graphs.pop((map_key(map_name), float(resolution)), None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._graphs.clear()
+
+    # ---------- reporting -------------------------------------------------------
+
+    def stats(self):
+        with self._lock:
+            resident = {f"{m}@{r}": {"size_mb": round(e.nbytes / 2**20, 2),
+                                     "load_s":  round(e.load_s, 3),
+                                     "source":  e.source,
+                                     "hits":    e.hits}
+                        for (m, r), e in self._graphs.items()}
+            return {"resident":    resident,
+                    "resident_mb": round(self.resident_bytes() / 2**20, 2),
+                    "budget_mb":   round(self.budget_bytes / 2**20, 2),
+                    "evictions":   self.evictions,
+                    "loads":       {f"{m}@{r}": h for (m, r), h in self.history.items()}}
+
+
+_default = None
+
+
+def default_registry():
+    """Registry shared by every dispatcher / simulation in this process."""
+    global _default
+    if _default is None:
+        _default = GraphRegistry()
+    return _default
+
+
+# ---------------------------------------------------------------------------
+# CLI: prebuild snapshots against a running simulator
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="build graph snapshots for CARLA maps")
+    ap.add_argument("--maps",       nargs="+", required=True)
+    ap.add_argument("--resolution", type=float, default=2.0)
+    ap.add_argument("--workers",    type=int,   default=8)
+    ap.add_argument("--host",       default="localhost")
+    ap.add_argument("--port",       type=int,   default=2000)
+    ap.add_argument("--force",      action="store_true", help="rebuild existing snapshots")
+    args = ap.parse_args()
+
+    import carla
+
+    client = carla.Client(args.host, args.port)
+    client.set_timeout(60.0)
+    registry = GraphRegistry(memory_budget_mb=0)   # keep at most one map resident
+    for name in args.maps:
+        if registry.has_snapshot(name, args.resolution) and not args.force:
+            log.info("snapshot exists", map=name, path=registry.snapshot_path(name, args.resolution))
+            continue
+        if args.force and registry.has_snapshot(name, args.resolution):
+            os.remove(registry.snapshot_path(name, args.resolution))
+        world = client.load_world(name)
+        registry.get(name, args.resolution, world=world, workers=args.workers)
+    print(registry.history)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# routing/landmarks.py
+#
+# ALT preprocessing: A*, Landmarks and the Triangle inequality.
+#   • a few landmark nodes are picked on the built graph ("avoid" or
+#     "farthest" selection); one forward and one backward Dijkstra per
+#     landmark give d(L, v) and d(v, L) for every node
+#   • for a target t, d(v, t) ≥ max_L max(d(v, L) − d(t, L), d(L, t) − d(L, v))
+#     – a consistent lower bound, so RouteGenerator's node‑ and edge‑based
+#     searches and the Yen's spur searches run as A* and settle far fewer
+#     nodes than plain Dijkstra while returning the same routes
+#   • an infinite bound proves the target unreachable (one‑way lanes leave
+#     parts of a town that can't reach each other): searches stop once only
+#     such nodes are left instead of exhausting the reachable component
+#   • the bound is only valid for the weights it was computed on: the table
+#     remembers graph.metric_version and is ignored once edges are added or
+#     re‑weighted; turn restrictions only add cost, so they leave it in use
+#     (time views of SegmentETA carry no table at all)
+#   • stored with the graph snapshot (routing.snapshot) – 16 bytes per node
+#     and landmark, float64
+#
+#   graph.landmarks = compute_landmarks(graph, count=16)
+#   h = graph.landmarks.heuristic(end_id)     # node_id → metres, lower bound
+
+import heapq
+import math
+import random
+import time
+
+import numpy as np
+
+from core.logger import get_logger
+
+log = get_logger("landmarks")
+
+SELECTIONS = ("avoid", "farthest")
+ACTIVE     = 4                      # landmarks used per query (see Landmarks.heuristic)
+
+
+def _csr(graph, nodes, index):
+    """Forward and reverse adjacency of `graph` as index lists (u → [(v, w)])."""
+    fwd = [[] for _ in nodes]
+    rev = [[] for _ in nodes]
+    for u, edges in graph.graph.items():
+        i = index[u]
+        for v, w in edges:
+            j = index[v]
+            fwd[i].append((j, w))
+            rev[j].append((i, w))
+    return fwd, rev
+
+
+def _dijkstra(adj, source, with_tree=False):
+    """Distances from `source` (inf if unreachable), optionally parent + settle order."""
+    dist   = [math.inf] * len(adj)
+    parent = [-1] * len(adj)
+    order  = []
+    dist[source] = 0.0
+    heap   = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        order.append(u)
+        for v, w in adj[u]:
+            nd = d + w
+            if nd < dist[v]:
+                dist[v], parent[v] = nd, u
+                heapq.heappush(heap, (nd, v))
+    dist = np.asarray(dist)
+    return (dist, parent, order) if with_tree else dist
+
+
+def _bounds(from_lm, to_lm, t):
+    """
+    ALT lower bounds d(v, t) for every v from the (L × N) landmark tables.
+    inf where a landmark proves v cannot reach t (it reaches t but not v, or
+    v but not t); nan – both sides unreachable – carries no information.
+    """
+    with np.errstate(invalid="ignore"):
+        h = np.fmax(to_lm - to_lm[:, t:t + 1], from_lm[:, t:t + 1] - from_lm)
+    h = np.fmax.reduce(h, axis=0) if len(h) else np.zeros(from_lm.shape[1])
+    h[np.isnan(h)] = 0.0
+    return np.maximum(h, 0.0)
+
+
+class _Bounds(dict):
+    """node_id → bound, filled in as a search touches nodes (no N‑entry dict per query)."""
+
+    def __init__(self, index, values):
+        super().__init__()
+        self.index, self.values = index, values
+
+    def __missing__(self, nid):
+        value = self[nid] = self.values[self.index[nid]]
+        return value
+
+
+class Landmarks:
+    """Landmark distance tables of one graph (see module docstring)."""
+
+    def __init__(self, nodes, landmarks, from_lm, to_lm, version=0, selection=None):
+        self.nodes     = list(nodes)
+        self.index     = {nid: i for i, nid in enumerate(self.nodes)}
+        self.landmarks = list(landmarks)
+        self.from_lm   = from_lm            # L × N  d(L, v)
+        self.to_lm     = to_lm              # L × N  d(v, L)
+        self.version   = version            # graph.metric_version they were computed on
+        self.selection = selection
+        self._target   = None
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    @property
+    def nbytes(self):
+        return self.from_lm.nbytes + self.to_lm.nbytes
+
+    def valid_for(self, graph):
+        return self.version == graph.metric_version
+
+    def heuristic(self, target, source=None, active=ACTIVE):
+        """
+        node_id → lower bound on the cost to `target`.  Given the `source`,
+        only the `active` landmarks bounding source → target best are used:
+        a query touches a few thousand nodes, tabulating all landmarks over
+        all nodes would cost more than it saves.  The last result is cached
+        (Yen's spur searches share one target).
+        """
+        t = self.index.get(target)
+        if t is None:
+            return None
+        s    = self.index.get(source)
+        rows = None
+        if s is not None and active < len(self):
+            with np.errstate(invalid="ignore"):
+                at_s = np.fmax(self.to_lm[:, s] - self.to_lm[:, t],
+                               self.from_lm[:, t] - self.from_lm[:, s])
+            at_s[np.isnan(at_s)] = -1.0
+            rows = tuple(sorted(np.argsort(-at_s, kind="stable")[:active].tolist()))
+        key = (target, rows)
+        if self._target is not None and self._target[0] == key:
+            return self._target[1]
+        if rows is None:
+            values = _bounds(self.from_lm, self.to_lm, t)
+        else:
+            values = _bounds(self.from_lm[list(rows)], self.to_lm[list(rows)], t)
+        h = _Bounds(self.index, values.tolist())
+        self._target = (key, h)
+        return h
+
+    # ---------- persistence (routing.snapshot) ----------------------------------
+
+    def state(self):
+        return {"nodes": self.nodes, "landmarks": self.landmarks, "selection": self.selection,
+                "from_lm": self.from_lm, "to_lm": self.to_lm}
+
+    @classmethod
+    def from_state(cls, state, version=0):
+        return cls(state["nodes"], state["landmarks"], state["from_lm"], state["to_lm"],
+                   version=version, selection=state.get("selection"))
+
+
+def compute_landmarks(graph, count=16, selection="avoid", seed=0):
+    """Pick `count` landmarks on `graph` and tabulate distances to / from them."""
+    if selection not in SELECTIONS:
+        raise ValueError(f"Unknown landmark selection {selection!r} (use one of {SELECTIONS})")
+    t0    = time.perf_counter()
+    rng   = random.Random(seed)
+    nodes = sorted(set(graph.node_lookup) | set(graph.graph)
+                   | {v for edges in graph.graph.values() for v, _ in edges})
+    index = {nid: i for i, nid in enumerate(nodes)}
+    fwd, rev = _csr(graph, nodes, index)
+    count = min(count, len(nodes))
+
+    chosen, from_rows, to_rows = [], [], []
+
+    def add(i):
+        chosen.append(i)
+        from_rows.append(_dijkstra(fwd, i))
+        to_rows.append(_dijkstra(rev, i))
+
+    # first landmark: the node farthest from a random start (both directions)
+    if count:
+        start = rng.randrange(len(nodes))
+        reach = _dijkstra(fwd, start) + _dijkstra(rev, start)
+        add(int(np.argmax(np.where(np.isfinite(reach), reach, -1.0))))
+
+    while len(chosen) < count:
+        if selection == "farthest":
+            i = _farthest(np.asarray(from_rows), np.asarray(to_rows), chosen)
+        else:
+            i = _avoid(fwd, np.asarray(from_rows), np.asarray(to_rows), chosen, rng)
+        if i is None:
+            break
+        add(i)
+
+    from_lm = np.asarray(from_rows, dtype=float).reshape(-1, len(nodes))
+    to_lm   = np.asarray(to_rows, dtype=float).reshape(-1, len(nodes))
+    lm = Landmarks(nodes, [nodes[i] for i in chosen], from_lm, to_lm,
+                   version=graph.metric_version, selection=selection)
+    log.info("landmarks computed", selection=selection, landmarks=len(lm), nodes=len(nodes),
+             mb=round(lm.nbytes / 2**20, 2), seconds=round(time.perf_counter() - t0, 3))
+    return lm
+
+
+def _farthest(from_lm, to_lm, chosen):
+    """Node maximising its round‑trip distance to the nearest landmark so far."""
+    spread = from_lm + to_lm
+    spread[~np.isfinite(spread)] = 1e18         # unreached parts of the map first
+    score  = spread.min(axis=0)
+    score[chosen] = -1.0
+    i = int(np.argmax(score))
+    return None if score[i] <= 0 else i
+
+
+def _avoid(fwd, from_lm, to_lm, chosen, rng, tries=4):
+    """
+    Goldberg & Harrelson's "avoid": grow a shortest‑path tree from a random
+    root and weight each node by how badly the current landmarks bound its
+    distance from the root.  Starting at the heaviest landmark‑free subtree
+    (road trees are long chains, so the root's own subtree almost always
+    holds a landmark) descend into the heaviest child – the leaf becomes
+    the next landmark.
+    """
+    n      = len(fwd)
+    has_lm = np.zeros(n, dtype=bool)
+    has_lm[chosen] = True
+    for _ in range(tries):
+        root = rng.randrange(n)
+        dist, parent, order = _dijkstra(fwd, root, with_tree=True)
+        weight  = dist - _root_bounds(from_lm, to_lm, root)
+        size    = np.where(np.isfinite(weight), weight, 0.0).tolist()
+        blocked = has_lm.tolist()
+        for v in reversed(order):               # children before parents
+            p = parent[v]
+            if blocked[v]:
+                size[v] = 0.0
+            if p >= 0:
+                blocked[p] = blocked[p] or blocked[v]
+                size[p] += size[v]
+        best = {}                               # node → heaviest child
+        for v in order:
+            p = parent[v]
+            if p >= 0 and size[v] > 0 and (p not in best or size[v] > size[best[p]]):
+                best[p] = v
+        v = max(order, key=size.__getitem__)
+        if size[v] <= 0:
+            continue
+        while v in best:
+            v = best[v]
+        return v
+    return None
+
+
+def _root_bounds(from_lm, to_lm, root):
+    """Lower bounds on d(root, v) for every v."""
+    with np.errstate(invalid="ignore"):
+        h = np.fmax(from_lm - from_lm[:, root:root + 1], to_lm[:, root:root + 1] - to_lm)
+    h = np.fmax.reduce(h, axis=0)
+    h[~np.isfinite(h)] = 0.0
+    return np.maximum(h, 0.0)
@@ -0,0 +1,72 @@
+# routing/node_record.py
+#
+# Plain per‑node record kept in CarlaGraph.node_lookup instead of a live
+# carla.Waypoint.
+#   • captured once when the graph is built (or restored from a snapshot):
+#     position, heading, lane identity, OpenDRIVE s, junction flag, limit
+#   • reading rec.x / rec.yaw is one slot load – on a carla.Waypoint every
+#     wp.transform.location.x builds a fresh Transform and Location, and each
+#     proxy pins simulator‑side map data for as long as the graph lives
+#   • .location / .transform build carla objects on demand for APIs that
+#     need them; CarlaGraph.live_waypoint(nid) fetches the real waypoint
+#
+#   rec = graph.get_waypoint(nid)
+#   rec.x, rec.y, rec.yaw, rec.is_junction
+
+try:
+    from carla import Location as _Location, Rotation as _Rotation, Transform as _Transform
+except ImportError:
+    from utils.fake_map import (FakeLocation as _Location, FakeRotation as _Rotation,
+                                FakeTransform as _Transform)
+
+
+class NodeRecord:
+    __slots__ = ("x", "y", "z", "yaw", "road_id", "lane_id", "is_junction", "speed_limit",
+                 "section_id", "s", "lane_type")
+
+    def __init__(self, x, y, z, yaw, road_id, lane_id, is_junction, speed_limit,
+                 section_id=0, s=0.0, lane_type="Driving"):
+        self.x           = x
+        self.y           = y
+        self.z           = z
+        self.yaw         = yaw
+        self.road_id     = road_id
+        self.lane_id     = lane_id
+        self.is_junction = is_junction
+        self.speed_limit = speed_limit
+        self.section_id  = section_id
+        self.s           = s
+        self.lane_type   = lane_type
+
+    @classmethod
+    def from_waypoint(cls, wp):
+        t = wp.transform                      # one proxy call for the whole pose
+        loc, rot = t.location, t.rotation
+        return cls(loc.x, loc.y, loc.z, rot.yaw, wp.road_id, wp.lane_id,
+                   bool(wp.is_junction), float(getattr(wp, "speed_limit", 30.0)),
+                   getattr(wp, "section_id", 0), float(getattr(wp, "s", 0.0)),
+                   str(getattr(wp, "lane_type", "Driving")))
+
+    def row(self):
+        """Tuple for snapshots – same field order as the constructor."""
+        return (self.x, self.y, self.z, self.yaw, self.road_id, self.lane_id,
+                self.is_junction, self.speed_limit, self.section_id, self.s, self.lane_type)
+
+    # ---------- carla objects, built on demand ----------------------------------
+
+    @property
+    def location(self):
+        return _Location(x=self.x, y=self.y, z=self.z)
+
+    @property
+    def transform(self):
+        return _Transform(_Location(x=self.x, y=self.y, z=self.z), _Rotation(yaw=self.yaw))
+
+    def distance(self, other):
+        """Metres to another record or a carla.Location."""
+        return ((self.x - other.x) ** 2 + (self.y - other.y) ** 2 +
+                (self.z - other.z) ** 2) ** 0.5
+
+    def __repr__(self):
+        return (f"NodeRecord(x={self.x:.1f}, y={self.y:.1f}, yaw={self.yaw:.0f}, "
+                f"road={self.road_id}, lane={self.lane_id})")
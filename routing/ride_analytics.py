@@ -0,0 +1,404 @@
+# routing/ride_analytics.py
+#
+# Aggregate route‑quality / ETA‑accuracy statistics over the streamed ride log
+# (data/ride_log.jsonl, routing.evaluation) in bounded memory.
+#   • the log is read in chunks of complete rows; each chunk becomes a few
+#     column arrays and is folded into fixed‑size accumulators with bincount
+#   • groups = map × hour × route length bucket × model version; per group:
+#     rides, ETA bias / MAE / RMSE, |error| histogram (1 s bins → p50 / p90 /
+#     p95), time saved vs baseline, time lost vs best possible
+#   • calibration per model: predicted‑ETA bins → mean predicted vs actual,
+#     plus the least‑squares slope of actual on predicted
+#   • per‑segment attribution over a compiled graph (routing.shared_graph):
+#     each ride's residual is taken after scaling out its group's overall
+#     actual / predicted ratio (model bias, hour); an edge's lift = mean
+#     residual of the rides through it − mean residual of all rides, so
+#     segments slower than modelled across many routes float to the top.
+#     Each ride's raw error is also split over its segments by modelled time
+#     ("where did the seconds go").  Consecutive edges of one lane are always
+#     driven together and share their lift – read the table per lane stretch
+#   • memory is set by the number of groups and graph edges, not by rides
+#
+#   stats = RideAnalytics(SharedGraph(path))
+#   stats.update_file("data/ride_log.jsonl")
+#   stats.write("data/analytics")               # CSV tables + summary.json
+#
+#   python -m routing.ride_analytics data/ride_log.jsonl --graph /dev/shm/taxi_graphs/grid6
+
+import argparse
+import csv
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from core.logger import get_logger
+
+log = get_logger("ride_analytics")
+
+HOUR_FEATURE, DISTANCE_FEATURE = 5, 0        # indices in extract_features()
+LENGTH_EDGES  = (500.0, 1000.0, 2000.0, 5000.0)
+LENGTH_LABELS = ("<0.5km", "0.5-1km", "1-2km", "2-5km", ">5km")
+ERR_BINS      = 601                          # |error| seconds 0…599, last bin = 600+
+CAL_EDGES     = np.array([0, 30, 60, 90, 120, 180, 240, 300, 420, 600, 900, 1200, np.inf])
+MAX_MODELS    = 1 << 12                      # model codes packed into the group key
+
+# accumulator columns per group
+N, SUM_ERR, SUM_ERR2, SUM_ABS, N_BASE, SUM_BASE, N_WIN, N_BEST, SUM_BEST, SUM_PRED, SUM_ACT = range(11)
+_COLS = 11
+
+
+# ---------------------------------------------------------------------------
+# Streaming input
+# ---------------------------------------------------------------------------
+
+def _parse(lines):
+    """One json.loads for the whole chunk; per‑line fallback skips bad rows."""
+    try:
+        return json.loads(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        rows = []
+        for raw in lines:
+            try:
+                rows.append(json.loads(raw))
+            except ValueError:
+                log.warning("skipping bad ride log row")
+        return rows
+
+
+def _num(v):
+    return float(v) if v is not None else math.nan
+
+
+def iter_rows(path, chunk_bytes=4 << 20):
+    """
+    Lists of parsed rows, ~chunk_bytes of log text each (rows carrying segment
+    lists are far larger than plain ones, so chunks are cut by size, not count).
+    A trailing line still being written is left out.
+    """
+    with open(path, "rb") as f:
+        while True:
+            lines = f.readlines(chunk_bytes)
+            if not lines:
+                return
+            if not lines[-1].endswith(b"\n"):
+                lines.pop()
+            if lines:
+                yield _parse(lines)
+
+
+# ---------------------------------------------------------------------------
+# Segment → compiled edge lookup
+# ---------------------------------------------------------------------------
+
+class _EdgeIndex:
+    """(x1, y1, x2, y2) decimetre positions → edge index of a SharedGraph, vectorised."""
+
+    def __init__(self, shared):
+        ids   = np.asarray(shared.node_ids)
+        xy    = (ids[:, 0] << 32) | (ids[:, 1] & 0xFFFFFFFF)
+        self.xy_keys, node_code = np.unique(xy, return_inverse=True)
+        indptr = np.asarray(shared.indptr)
+        src    = np.repeat(np.arange(len(ids)), np.diff(indptr))
+        dst    = np.asarray(shared.indices)
+        keys   = node_code[src].astype(np.int64) * len(self.xy_keys) + node_code[dst]
+        self.order = np.argsort(keys, kind="stable")
+        self.keys  = keys[self.order]
+        self.src, self.dst = src, dst
+        self.xs, self.ys   = np.asarray(shared.xs), np.asarray(shared.ys)
+        self.n_edges       = len(keys)
+
+    def _code(self, x10, y10):
+        key = (x10 << 32) | (y10 & 0xFFFFFFFF)
+        pos = np.minimum(np.searchsorted(self.xy_keys, key), len(self.xy_keys) - 1)
+        return np.where(self.xy_keys[pos] == key, pos, -1)
+
+    def lookup(self, segs):
+        """segs: (n, 4) float metres → edge index per row (−1 if not in the graph)."""
+        d10 = np.rint(np.asarray(segs, dtype=float) * 10).astype(np.int64)
+        a, b = self._code(d10[:, 0], d10[:, 1]), self._code(d10[:, 2], d10[:, 3])
+        key  = a * len(self.xy_keys) + b
+        pos  = np.minimum(np.searchsorted(self.keys, key), max(self.n_edges - 1, 0))
+        hit  = (a >= 0) & (b >= 0) & (self.keys[pos] == key)
+        return np.where(hit, self.order[pos], -1)
+
+
+# ---------------------------------------------------------------------------
+# Accumulators
+# ---------------------------------------------------------------------------
+
+class RideAnalytics:
+    def __init__(self, shared_graph=None, context=None):
+        self.maps, self.models = {}, {}
+        self.group_row = {}                          # packed key → accumulator row
+        self.acc  = np.zeros((0, _COLS))
+        self.hist = np.zeros((0, ERR_BINS), dtype=np.int64)
+        ncal = len(CAL_EDGES) - 1
+        self.cal  = np.zeros((0, ncal, 4))            # n, Σpred, Σactual, Σactual²
+        self.fit  = np.zeros((0, 5))                  # n, Σp, Σa, Σpa, Σp²  (per model)
+        self.rows_seen = self.rows_used = 0
+        self.edges = None
+        if shared_graph is not None:
+            self.edges    = _EdgeIndex(shared_graph)
+            self.edge_w   = np.asarray(shared_graph.edge_times(context), dtype=float)
+            # rides, Σ bias‑free ride residual, Σ share of raw error, Σ |share|
+            self.edge_acc = np.zeros((self.edges.n_edges, 4))
+            self.resid_n = self.resid_sum = 0.0                   # over rides with segments
+            self.segments_seen = self.segments_matched = 0
+
+    # ---------- ingest ----------------------------------------------------------
+
+    def _codes(self, rows, field, table):
+        return np.fromiter((table.setdefault(str(r.get(field) or "unknown"), len(table))
+                            for r in rows), dtype=np.int64, count=len(rows))
+
+    def add_rows(self, rows):
+        n = len(rows)
+        self.rows_seen += n
+        if not n:
+            return
+        feats  = [r.get("features") or () for r in rows]
+        pred   = np.fromiter((_num(r.get("predicted_eta")) for r in rows), float, n)
+        actual = np.fromiter((_num(r.get("actual_time")) for r in rows), float, n)
+        base   = np.fromiter((_num(r.get("baseline_time")) for r in rows), float, n)
+        best   = np.fromiter((_num(r.get("best_possible_time")) for r in rows), float, n)
+        hour   = np.fromiter((r.get("hour", f[HOUR_FEATURE] if len(f) > HOUR_FEATURE else -1)
+                              for r, f in zip(rows, feats)), float, n)
+        dist   = np.fromiter((f[DISTANCE_FEATURE] if f else math.nan for f in feats), float, n)
+        maps   = self._codes(rows, "map", self.maps)
+        models = self._codes(rows, "model_version", self.models)
+        if len(self.models) > MAX_MODELS:
+            raise ValueError(f"more than {MAX_MODELS} model versions in one log")
+
+        ok = np.isfinite(pred) & np.isfinite(actual)
+        self.rows_used += int(ok.sum())
+        hour   = np.where(np.isfinite(hour) & (hour >= 0), hour, 24).astype(np.int64)   # 24 = unknown
+        bucket = np.searchsorted(LENGTH_EDGES, np.nan_to_num(dist, nan=0.0), side="right")
+        key    = ((maps * 25 + hour) * len(LENGTH_LABELS) + bucket) * MAX_MODELS + models
+        idx = np.flatnonzero(ok)
+        grp = self._add_groups(key[idx], pred[idx], actual[idx], base[idx], best[idx])
+        self._add_calibration(models[idx], pred[idx], actual[idx])
+        if self.edges is not None and len(idx):
+            # seconds left after the group's own bias (model version × hour × …)
+            g     = self.acc[grp]
+            clean = actual[idx] * g[:, SUM_PRED] / g[:, SUM_ACT] - pred[idx]
+            self._add_segments([rows[i] for i in idx.tolist()], actual[idx] - pred[idx], clean)
+
+    def _rows_for(self, uniq):
+        rows = np.empty(len(uniq), dtype=np.int64)
+        for i, k in enumerate(uniq.tolist()):
+            r = self.group_row.get(k)
+            if r is None:
+                r = self.group_row[k] = len(self.group_row)
+            rows[i] = r
+        grow = len(self.group_row) - len(self.acc)
+        if grow > 0:
+            self.acc  = np.vstack([self.acc, np.zeros((grow, _COLS))])
+            self.hist = np.vstack([self.hist, np.zeros((grow, ERR_BINS), dtype=np.int64)])
+        return rows
+
+    def _add_groups(self, key, pred, actual, base, best):
+        """Fold rides into their groups; returns each ride's accumulator row."""
+        if not len(key):
+            return np.zeros(0, dtype=np.int64)
+        uniq, inv = np.unique(key, return_inverse=True)
+        rows = self._rows_for(uniq)
+        m    = len(uniq)
+        err  = pred - actual
+        has_base, has_best = np.isfinite(base), np.isfinite(best)
+        saved = np.where(has_base, base - actual, 0.0)
+        lost  = np.where(has_best, actual - best, 0.0)
+        cols = (np.ones_like(err), err, err * err, np.abs(err), has_base, saved,
+                has_base & (saved > 0), has_best, lost, pred, actual)
+        for c, w in enumerate(cols):
+            self.acc[rows, c] += np.bincount(inv, weights=w.astype(float), minlength=m)
+        bins = np.minimum(np.abs(err).astype(np.int64), ERR_BINS - 1)
+        self.hist[rows] += np.bincount(inv * ERR_BINS + bins,
+                                       minlength=m * ERR_BINS).reshape(m, ERR_BINS)
+        return rows[inv]
+
+    def _add_calibration(self, models, pred, actual):
+        grow = len(self.models) - len(self.cal)
+        if grow > 0:
+            self.cal = np.concatenate([self.cal, np.zeros((grow,) + self.cal.shape[1:])])
+            self.fit = np.vstack([self.fit, np.zeros((grow, 5))])
+        ncal = self.cal.shape[1]
+        b    = np.clip(np.searchsorted(CAL_EDGES, pred, side="right") - 1, 0, ncal - 1)
+        idx  = models * ncal + b
+        size = len(self.cal) * ncal
+        for c, w in enumerate((np.ones_like(pred), pred, actual, actual * actual)):
+            self.cal[:, :, c] += np.bincount(idx, weights=w, minlength=size).reshape(-1, ncal)
+        for c, w in enumerate((np.ones_like(pred), pred, actual, pred * actual, pred * pred)):
+            self.fit[:, c] += np.bincount(models, weights=w, minlength=len(self.fit))
+
+    def _add_segments(self, rows, residual, clean):
+        ride, segs = [], []
+        for i, r in enumerate(rows):
+            seg = r.get("segments")
+            if seg:
+                ride.extend([i] * len(seg))
+                segs.extend(seg)
+        if not segs:
+            return
+        ride = np.asarray(ride, dtype=np.int64)
+        eid  = self.edges.lookup(np.asarray(segs, dtype=float).reshape(-1, 4))
+        hit  = eid >= 0
+        self.segments_seen    += len(eid)
+        self.segments_matched += int(hit.sum())
+        ride, eid = ride[hit], eid[hit]
+        if not len(eid):
+            return
+        with_segs = np.unique(ride)
+        self.resid_n   += len(with_segs)
+        self.resid_sum += float(clean[with_segs].sum())
+        ne    = self.edges.n_edges
+        w     = self.edge_w[eid]
+        total = np.bincount(ride, weights=w, minlength=len(rows))
+        share = residual[ride] * w / total[ride]
+        self.edge_acc[:, 0] += np.bincount(eid, minlength=ne)
+        self.edge_acc[:, 1] += np.bincount(eid, weights=clean[ride], minlength=ne)
+        self.edge_acc[:, 2] += np.bincount(eid, weights=share, minlength=ne)
+        self.edge_acc[:, 3] += np.bincount(eid, weights=np.abs(share), minlength=ne)
+
+    def update_file(self, path, chunk_bytes=4 << 20):
+        t0 = time.perf_counter()
+        for rows in iter_rows(path, chunk_bytes):
+            self.add_rows(rows)
+        log.info("ride log aggregated", path=path, rows=self.rows_seen, used=self.rows_used,
+                 groups=len(self.group_row), seconds=round(time.perf_counter() - t0, 2))
+        return self
+
+    # ---------- tables ----------------------------------------------------------
+
+    def _decode(self, key):
+        key, model  = divmod(key, MAX_MODELS)
+        key, bucket = divmod(key, len(LENGTH_LABELS))
+        mp, hour    = divmod(key, 25)
+        return mp, hour, bucket, model
+
+    def _stats(self, acc, hist):
+        n = acc[N]
+        q = np.searchsorted(np.cumsum(hist), np.array([0.5, 0.9, 0.95]) * n)
+        return {
+            "rides":           int(n),
+            "bias_s":          round(acc[SUM_ERR] / n, 2),
+            "mae_s":           round(acc[SUM_ABS] / n, 2),
+            "rmse_s":          round(math.sqrt(acc[SUM_ERR2] / n), 2),
+            "p50_abs_s":       int(q[0]), "p90_abs_s": int(q[1]), "p95_abs_s": int(q[2]),
+            "saved_vs_base_s": round(acc[SUM_BASE] / acc[N_BASE], 2) if acc[N_BASE] else "",
+            "beat_base_pct":   round(100 * acc[N_WIN] / acc[N_BASE], 1) if acc[N_BASE] else "",
+            "lost_vs_best_s":  round(acc[SUM_BEST] / acc[N_BEST], 2) if acc[N_BEST] else "",
+        }
+
+    def grouped(self, dims=("map", "hour", "length", "model")):
+        """Rows of stats grouped by any subset of map / hour / length / model."""
+        names  = {v: k for k, v in self.maps.items()}, None, None, {v: k for k, v in self.models.items()}
+        labels = lambda mp, hour, bucket, model: {
+            "map": names[0][mp], "hour": "unknown" if hour == 24 else hour,
+            "length": LENGTH_LABELS[bucket], "model": names[3][model]}
+        merged = {}
+        for key, row in self.group_row.items():
+            lab = labels(*self._decode(key))
+            out = tuple(lab[d] for d in dims)
+            if out in merged:
+                merged[out][0] += self.acc[row]
+                merged[out][1] += self.hist[row]
+            else:
+                merged[out] = [self.acc[row].copy(), self.hist[row].copy()]
+        return [dict(zip(dims, k), **self._stats(a, h))
+                for k, (a, h) in sorted(merged.items(), key=lambda kv: tuple(map(str, kv[0])))]
+
+    def calibration(self):
+        out = []
+        for model, m in sorted(self.models.items(), key=lambda kv: kv[1]):
+            for b in range(self.cal.shape[1]):
+                n, sp, sa, sa2 = self.cal[m, b]
+                if n:
+                    out.append({"model": model, "pred_lo_s": CAL_EDGES[b], "pred_hi_s": CAL_EDGES[b + 1],
+                                "rides": int(n), "mean_pred_s": round(sp / n, 2),
+                                "mean_actual_s": round(sa / n, 2),
+                                "std_actual_s": round(math.sqrt(max(sa2 / n - (sa / n) ** 2, 0.0)), 2)})
+        return out
+
+    def calibration_fit(self):
+        """{model: (slope, intercept)} of actual ≈ slope · predicted + intercept."""
+        out = {}
+        for model, m in self.models.items():
+            n, sp, sa, spa, spp = self.fit[m]
+            var = n * spp - sp * sp
+            if n > 1 and var > 0:
+                slope = (n * spa - sp * sa) / var
+                out[model] = (round(float(slope), 4), round(float((sa - slope * sp) / n), 2))
+        return out
+
+    def segments(self, top=100, min_rides=20):
+        """Edges by lift (s): how much slower than predicted rides through them run."""
+        if self.edges is None:
+            return []
+        rides, clean, share, abs_share = self.edge_acc.T
+        base  = self.resid_sum / self.resid_n if self.resid_n else 0.0
+        lift  = np.divide(clean, rides, out=np.zeros_like(rides), where=rides > 0) - base
+        cand  = np.flatnonzero(rides >= min_rides)
+        order = cand[np.argsort(-lift[cand], kind="stable")][:top]
+        e, xs, ys = self.edges, self.edges.xs, self.edges.ys
+        return [{"edge": int(i), "x1": round(float(xs[e.src[i]]), 1), "y1": round(float(ys[e.src[i]]), 1),
+                 "x2": round(float(xs[e.dst[i]]), 1), "y2": round(float(ys[e.dst[i]]), 1),
+                 "rides": int(rides[i]), "lift_s": round(float(lift[i]), 2),
+                 "modelled_s": round(float(self.edge_w[i]), 3),
+                 "mean_share_s": round(float(share[i] / rides[i]), 3),
+                 "mean_abs_share_s": round(float(abs_share[i] / rides[i]), 3),
+                 "total_share_s": round(float(share[i]), 1)} for i in order]
+
+    def write(self, out_dir, top_segments=100):
+        """CSV tables + summary.json for dashboards."""
+        os.makedirs(out_dir, exist_ok=True)
+        tables = {"groups": self.grouped(), "calibration": self.calibration(),
+                  "segments": self.segments(top_segments)}
+        for dim in ("map", "hour", "length", "model"):
+            tables[f"by_{dim}"] = self.grouped((dim,))
+        for name, rows in tables.items():
+            if not rows:
+                continue
+            with open(os.path.join(out_dir, f"{name}.csv"), "w", newline="") as f:
+                w = csv.DictWriter(f, fieldnames=list(rows[0]))
+                w.writeheader()
+                w.writerows(rows)
+        overall = self.grouped(())
+        summary = {"rows_seen": self.rows_seen, "rows_used": self.rows_used,
+                   "groups": len(self.group_row), "overall": overall[0] if overall else {},
+                   "calibration_fit": self.calibration_fit()}
+        if self.edges is not None:
+            summary["segments_seen"], summary["segments_matched"] = self.segments_seen, self.segments_matched
+        with open(os.path.join(out_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+def main():
+    ap = argparse.ArgumentParser(description="aggregate ETA / route quality over a ride log")
+    ap.add_argument("log", nargs="?", default="data/ride_log.jsonl")
+    ap.add_argument("--graph", default=None, help="compile_shared() directory for segment attribution")
+    ap.add_argument("--out",   default="data/analytics")
+    ap.add_argument("--chunk-mb", type=float, default=4.0, help="log text parsed per chunk")
+    ap.add_argument("--top",   type=int, default=100, help="segments in segments.csv")
+    args = ap.parse_args()
+
+    shared = None
+    if args.graph:
+        from routing.shared_graph import SharedGraph
+        shared = SharedGraph(args.graph)
+    t0 = time.perf_counter()
+    stats   = RideAnalytics(shared).update_file(args.log, int(args.chunk_mb * 2**20))
+    summary = stats.write(args.out, args.top)
+    o = summary["overall"]
+    print(f"📊 {summary['rows_used']:,} rides in {summary['groups']} groups "
+          f"({time.perf_counter() - t0:.1f}s) → {args.out}")
+    if o:
+        print(f"   MAE {o['mae_s']}s  bias {o['bias_s']}s  p90 |err| {o['p90_abs_s']}s  "
+              f"saved vs baseline {o['saved_vs_base_s']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# routing/route_cache.py
+#
+# Two‑tier cache for routes / k‑route sets / feature vectors.
+#   key   = (kind, start_node, end_node, weights_id, k, context)
+#   tier1 = in‑process bounded LRU
+#   tier2 = optional SQLite file shared by every worker on the machine
+# weights_id(graph) is a content hash of the edge weights and turn
+# restrictions, not CarlaGraph.weights_version: that counter is per process,
+# so two workers that re‑weighted different edges equally often would
+# otherwise serve each other's routes.  It is refreshed lazily after
+# weights_version moves, and only the parts that moved are rehashed:
+#   • topology  – node and neighbour IDs in adjacency order, only when nodes /
+#                 edges are added
+#   • weights   – one flat float64 pass over the adjacency in the same order,
+#                 when metric_version moves (re‑weighting); graphs built or
+#                 loaded alike agree, differently ordered ones merely miss
+#   • restrictions – the (small) restriction set, on every change
+# Stale entries simply stop matching; invalidate() reclaims the space of
+# weight sets this process has left.  The SQLite connection is shared by the
+# process's threads, so every statement on it runs under _db_lock.
+
+import hashlib
+import pickle
+import sqlite3
+import struct
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+_MISSING = object()
+
+
+def _approx_size(value):
+    """Cheap deep size for the values we cache (lists / tuples of node IDs, floats)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            size += _approx_size(item) if isinstance(item, (list, tuple)) else sys.getsizeof(item)
+    return size
+
+
+def _topology_digest(graph):
+    h = hashlib.blake2b(digest_size=16)
+    for u, out in graph.graph.items():
+        h.update(struct.pack(f"<{4 * len(out) + 5}q", len(out), *u,
+                             *(c for v, _ in out for c in v)))
+    return h.digest()
+
+
+class _WeightsState:
+    """Per‑graph pieces of weights_id, each rehashed only when its part changed."""
+    __slots__ = ("version", "metric", "shape", "topology", "weights", "id")
+
+    def __init__(self):
+        self.version = self.metric = self.shape = None
+        self.topology = self.weights = self.id = None
+
+    def refresh(self, graph):
+        if self.id is not None and self.version == graph.weights_version:
+            return self.id
+        edges = sum(map(len, graph.graph.values()))
+        shape = (len(graph.graph), edges)
+        if shape != self.shape:                   # _add_edge: new topology
+            self.shape, self.topology, self.metric = shape, _topology_digest(graph), None
+        metric = getattr(graph, "metric_version", None)
+        if metric is None or metric != self.metric:
+            costs = np.fromiter((c for out in graph.graph.values() for _, c in out),
+                                dtype=np.float64, count=edges)
+            self.weights = hashlib.blake2b(costs.round(6).tobytes(), digest_size=16).digest()
+            self.metric  = metric
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.topology)
+        h.update(self.weights)
+        for triple in sorted(graph.turn_restrictions):
+            h.update(repr(triple).encode())
+        self.version, self.id = graph.weights_version, h.hexdigest()
+        return self.id
+
+
+class RouteCache:
+    def __init__(self, max_entries=10_000, db_path=None, profile="default"):
+        self.max_entries = max_entries
+        self.profile     = profile          # weight profile name, e.g. "Town04@2.0"
+        self._lru        = OrderedDict()    # key → (value, size)
+        self._bytes      = 0
+        self._lock       = threading.Lock()
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+        self._ids        = weakref.WeakKeyDictionary()   # graph → _WeightsState
+        self._written    = set()            # weight ids this process stored on disk
+
+        self._db      = None
+        self._db_lock = threading.Lock()    # one connection shared by every thread
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            cols = [r[1] for r in self._db.execute("PRAGMA table_info(routes)")]
+            if cols and "weights" not in cols:   # keyed on per‑process counters: unusable
+                self._db.execute("DROP TABLE routes")
+            self._db.execute("CREATE TABLE IF NOT EXISTS routes ("
+                             " key TEXT PRIMARY KEY, profile TEXT, weights TEXT, value BLOB)")
+            self._db.commit()
+
+    # ---------- keys ------------------------------------------------------------
+
+    def key(self, kind, start_id, end_id, weights_id, k=1, context=None):
+        return (kind, start_id, end_id, weights_id, k, context)
+
+    def weights_id(self, graph):
+        """Content id of graph's weights + restrictions, refreshed when they change."""
+        state = self._ids.get(graph)
+        if state is None:
+            state = self._ids[graph] = _WeightsState()
+        return state.refresh(graph)
+
+    def _db_key(self, key):
+        return repr((self.profile,) + key)
+
+    # ---------- lookup / store --------------------------------------------------
+
+    def get(self, key, default=None):
+        with self._lock:
+            hit = self._lru.get(key, _MISSING)
+            if hit is not _MISSING:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return hit[0]
+
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute("SELECT value FROM routes WHERE key = ?",
+                                       (self._db_key(key),)).fetchone()
+            if row is not None:
+                value = pickle.loads(row[0])
+                self._remember(key, value)
+                with self._lock:
+                    self.disk_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self._db is not None:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            with self._db_lock:
+                self._db.execute("INSERT OR REPLACE INTO routes VALUES (?, ?, ?, ?)",
+                                 (self._db_key(key), self.profile, key[3], blob))
+                self._db.commit()
+            if key[3] is not None:
+                self._written.add(key[3])
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            if value:                      # don't pin "no route" answers
+                self.put(key, value)
+        return value
+
+    def _remember(self, key, value):
+        size = _approx_size(value)
+        with self._lock:
+            old = self._lru.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._lru[key] = (value, size)
+            self._bytes += size
+            while len(self._lru) > self.max_entries:
+                _, (_, s) = self._lru.popitem(last=False)
+                self._bytes -= s
+                self.evictions += 1
+
+    # ---------- invalidation / metrics ------------------------------------------
+
+    def invalidate(self, graph):
+        """
+        Drop entries built against weights `graph` no longer has.  On disk only
+        rows of weight sets this process wrote are removed – other workers may
+        still be routing on theirs.
+        """
+        current = self.weights_id(graph)
+        with self._lock:
+            stale = [k for k in self._lru if k[3] is not None and k[3] != current]
+            for k in stale:
+                self._bytes -= self._lru.pop(k)[1]
+        left = sorted(self._written - {current})
+        if self._db is not None and left:
+            with self._db_lock:
+                self._db.executemany("DELETE FROM routes WHERE profile = ? AND weights = ?",
+                                     [(self.profile, w) for w in left])
+                self._db.commit()
+            self._written.difference_update(left)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self._bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        out = {
+            "entries":      len(self._lru),
+            "memory_bytes": self._bytes,
+            "hits":         self.hits,
+            "disk_hits":    self.disk_hits,
+            "misses":       self.misses,
+            "evictions":    self.evictions,
+            "hit_rate":     round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+        if self._db is not None:
+            with self._db_lock:
+                out["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM routes").fetchone()[0]
+        return out
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
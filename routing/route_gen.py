@@ -1,8 +1,22 @@
 
 #route_gen.py
-from routing.graph_builder import CarlaGraph
-import carla
+from __future__ import annotations
+from routing.graph_builder import CarlaGraph, FORWARD
+from routing.densify import densify_route
+from core import logger
+from core.logger import get_logger, span, incr
+from carla_interface.debug_renderer import get_renderer
+import config
 import heapq
+import itertools
+import math
+
+try:
+    import carla
+except ImportError:          # headless use: search only, no debug drawing
+    carla = None
+
+log = get_logger("route_gen")
 
 
 
@@ -10,56 +24,109 @@ def _draw_debug(world, graph, visited, start_id, end_id,
                 path=None, reached=False,
                 life_time=30.0):
     """Blue dots = visited.  Green = start.  Red = target.
-    Cyan line  = final path if reached."""
-    blue  = carla.Color(0,   0, 255)
-    green = carla.Color(0, 255,   0)
-    red   = carla.Color(255,  0,  0)
-    cyan  = carla.Color(0, 255, 255)
+    Cyan line  = final path if reached.
+    Only enqueues on the debug renderer – the RPCs happen off the hot path."""
+    renderer = get_renderer(world)
+    if not renderer.enabled:
+        return
+
+    blue  = (0,   0, 255)
+    green = (0, 255,   0)
+    red   = (255,  0,  0)
+    cyan  = (0, 255, 255)
 
     # visited nodes
-    for nid in visited:
-        wp = graph.get_waypoint(nid)
-        if wp:
-            world.debug.draw_string(wp.transform.location,
-                                    'R', draw_shadow=False,
-                                    color=blue, life_time=5.0)
+    wps = [graph.get_waypoint(nid) for nid in visited]
+    renderer.points([wp for wp in wps if wp], text='R', color=blue, life_time=5.0)
 
     # start / end labels
     for nid, label, col in [(start_id, 'START', green),
                             (end_id,   'END',   red)]:
         wp = graph.get_waypoint(nid)
         if wp:
-            world.debug.draw_string(wp.transform.location + carla.Location(z=0.5),
-                                    label, draw_shadow=False,
-                                    color=col, life_time=1.0)
+            renderer.string(wp, label, color=col, life_time=1.0, z=0.5)
 
     # final path line (if found)
     if reached and path and len(path) > 1:
-        for a, b in zip(path[:-1], path[1:]):
-            wpa = graph.get_waypoint(a).transform.location
-            wpb = graph.get_waypoint(b).transform.location
-            world.debug.draw_line(wpa + carla.Location(z=0.3),
-                                wpb + carla.Location(z=0.3),
-                                thickness=0.05,
-                                color=cyan,
-                                life_time=15.0)
+        renderer.polyline([graph.get_waypoint(n) for n in path],
+                          color=cyan, thickness=0.05, life_time=15.0, z=0.3)
 
 
 class RouteGenerator:
-    def __init__(self, graph: CarlaGraph, world):
+    def __init__(self, graph: CarlaGraph, world=None, cache=None, edge_based=None):
         self.graph = graph
         self.world = world
-    
+        self.cache = cache          # optional routing.route_cache.RouteCache
+        self._snap = {}             # (x, y) rounded to 1 m → node_id
+        # edge‑based search honours turn restrictions / transition penalties
+        self.edge_based = config.EDGE_BASED_ROUTING if edge_based is None else edge_based
+
     def _get_node_id_from_location(self, location):
-        return self.graph.get_closest_node(location)
+        # OD snapping: requests repeat at the same spots, so remember the
+        # closest node per 1 m cell instead of rescanning every node
+        cell = (round(location.x), round(location.y))
+        nid  = self._snap.get(cell)
+        if nid is None:
+            nid = self._snap[cell] = self.graph.get_closest_node(location)
+        return nid
+
+    def _cache_key(self, kind, start_id, end_id, k=1, context=None):
+        return self.cache.key(kind, start_id, end_id,
+                              self.cache.weights_id(self.graph), k, context)
+
+    def find_shortest_route(self, start_loc, end_loc):
+        s_id = self._get_node_id_from_location(start_loc)
+        e_id = self._get_node_id_from_location(end_loc)
+        if s_id is None or e_id is None:
+            return []
+        return self.dijkstra(s_id, e_id, draw=False)
     
+    def route_waypoints(self, route, spacing=2.0):
+        """
+        Waypoints for the follower along a node route.  On a graph coarser
+        than `spacing` the route is densified from stored lane geometry.
+        """
+        if (self.graph.resolution or 0) <= spacing:
+            return [self.graph.get_waypoint(n) for n in route]
+        with span("densify"):
+            return densify_route(self.graph, route, spacing)
+
     # ---------------------------------------------------------------------------
     # Pass draw=True (default) if RouteGenerator has a `world` attribute
     # ---------------------------------------------------------------------------
 
     def dijkstra(self, start_id, end_id, draw=True):
         """Shortest‑path on CarlaGraph.  Draws visited nodes for debugging."""
+        if self.cache is not None and not draw:
+            key  = self._cache_key("epath" if self.edge_based else "path", start_id, end_id)
+            path = self.cache.get(key)
+            if path is None:
+                path = self._dijkstra(start_id, end_id, draw)
+                if path:
+                    self.cache.put(key, tuple(path))
+            return list(path)
+        return self._dijkstra(start_id, end_id, draw)
+
+    def _heuristic(self, end_id, start_id=None):
+        """
+        ALT lower bounds node → end_id from the graph's landmark tables, or
+        None (plain Dijkstra) when it has none or its weights changed since.
+        """
+        lm = getattr(self.graph, "landmarks", None)
+        if lm is None or not lm.valid_for(self.graph):
+            return None
+        return lm.heuristic(end_id, start_id)
+
+    def _dijkstra(self, start_id, end_id, draw):
+        search = self._edge_search if self.edge_based else self._search
+        if not logger.ENABLED:
+            return search(start_id, end_id, draw)
+        with span("search"):
+            return search(start_id, end_id, draw)
+
+    def _search(self, start_id, end_id, draw):
         graph    = self.graph
+        h        = self._heuristic(end_id, start_id)   # A* on landmark bounds when available
         queue    = [(0, start_id)]
         distances = {start_id: 0}
         previous  = {}
@@ -67,11 +134,14 @@ class RouteGenerator:
 
         # ---------- main loop ---------------------------------------------------
         while queue:
-            current_dist, current_id = heapq.heappop(queue)
+            f, current_id = heapq.heappop(queue)
+            if f == math.inf:
+                break                       # the rest provably can't reach end_id
 
             if current_id in visited:
                 continue
             visited.add(current_id)
+            current_dist = distances[current_id]
 
             if current_id == end_id:
                 break
@@ -81,12 +151,14 @@ class RouteGenerator:
                 if neighbor_id not in distances or new_dist < distances[neighbor_id]:
                     distances[neighbor_id] = new_dist
                     previous[neighbor_id]  = current_id
-                    heapq.heappush(queue, (new_dist, neighbor_id))
+                    heapq.heappush(queue, (new_dist + h[neighbor_id] if h is not None else new_dist,
+                                           neighbor_id))
 
         # ---------- no path? ----------------------------------------------------
         if end_id not in previous:
-            print(f"❌  no path — explored {len(visited):,} nodes")
-            if draw and hasattr(self, "world"):
+            incr("search_no_path")
+            log.warning("no path", start=start_id, end=end_id, explored=len(visited))
+            if draw and self.world is not None:
                 _draw_debug(self.world, graph, visited, start_id, end_id,
                             reached=False)
             return []
@@ -98,113 +170,248 @@ class RouteGenerator:
             path.insert(0, cur)
             cur = previous.get(cur)
 
-        print(f"✅  path found: {len(path):,} nodes  "
-            f"total distance {distances[end_id]:.1f} m  "
-            f"(explored {len(visited):,})")
+        incr("search_settled_nodes", len(visited))
+        log.debug("path found", nodes=len(path),
+                  distance=round(distances[end_id], 1), explored=len(visited))
 
-        if draw and hasattr(self, "world"):
+        if draw and self.world is not None:
             _draw_debug(self.world, graph, visited, start_id, end_id,
                         path=path, reached=True)
 
         return path
 
 
+    def _line_adjacency(self):
+        """
+        node → [(neighbour, cost, type)] plus the edge types / via nodes whose
+        successors depend on how they were reached.  Rebuilt when the graph's
+        weights_version changes (re‑weighting, new restrictions).
+        """
+        graph   = self.graph
+        version = (id(graph), graph.weights_version, id(config.TRANSITION_PENALTIES))
+        cached  = getattr(self, "_line_adj", None)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        types = graph.edge_types
+        adj   = {node: [(n, w, types.get((node, n), FORWARD)) for n, w in edges]
+                 for node, edges in graph.graph.items()}
+        tsrc  = {t_in for t_in, _ in config.TRANSITION_PENALTIES}
+        via   = {b for _, b, _ in graph.turn_restrictions}
+        self._line_adj = (version, (adj, tsrc, via))
+        return adj, tsrc, via
+
+    def _edge_search(self, start_id, end_id, draw):
+        """
+        Dijkstra on the line graph: a label is the edge (prev, node) the search
+        arrived by, so the cost of a move may depend on the previous edge –
+        graph.turn_restrictions triples are skipped, config.TRANSITION_PENALTIES
+        are added per (edge type in, edge type out) and immediate reversals
+        are not allowed.  Arrivals whose continuation can't depend on the
+        previous edge share one (None, node) label, which keeps the state
+        space close to the node graph's.  Landmark bounds on the node graph
+        stay admissible here (restrictions and penalties only add cost).
+        """
+        graph = self.graph
+        path, settled, cost = self._line_search(start_id, end_id, self._heuristic(end_id, start_id))
+        visited = {n for _, n in settled}
+        if not path:
+            incr("search_no_path")
+            log.warning("no path", start=start_id, end=end_id, explored=len(settled))
+            if draw and self.world is not None:
+                _draw_debug(self.world, graph, visited, start_id, end_id,
+                            reached=False)
+            return []
+
+        incr("search_settled_nodes", len(settled))
+        log.debug("path found", nodes=len(path), distance=round(cost, 1), explored=len(settled))
+
+        if draw and self.world is not None:
+            _draw_debug(self.world, graph, visited, start_id, end_id,
+                        path=path, reached=True)
+        return path
+
+    def _line_search(self, start_id, end_id, h=None, prev_id=None,
+                     banned_nodes=(), banned_edges=()):
+        """
+        The line‑graph search behind _edge_search: (path, settled states, cost).
+        prev_id – the node the search is taken to have arrived from, so the
+        first move already obeys restrictions / penalties (Yen's spurs);
+        banned_nodes / banned_edges are never entered / taken.
+        """
+        graph      = self.graph
+        adj, tsrc, via = self._line_adjacency()
+        restricted = graph.turn_restrictions
+        trans      = config.TRANSITION_PENALTIES
+        start      = (prev_id, start_id)
+        t_start    = None if prev_id is None else graph.edge_types.get((prev_id, start_id), FORWARD)
+        tie        = itertools.count()      # never compare states on equal cost
+        queue      = [(0.0, next(tie), start, t_start)]
+        distances  = {start: 0.0}
+        previous   = {}
+        settled    = set()
+        goal       = None
+
+        while queue:
+            f, _, state, t_in = heapq.heappop(queue)
+            if f == math.inf:
+                break
+            if state in settled:
+                continue
+            settled.add(state)
+            current_dist = distances[state]
+            prev, node = state
+            if node == end_id:
+                goal = state
+                break
+
+            check = t_in in tsrc
+            for neighbor_id, weight, t_out in adj.get(node, ()):
+                if neighbor_id == prev or neighbor_id in banned_nodes or \
+                        (node, neighbor_id) in banned_edges:
+                    continue
+                new_dist = current_dist + weight
+                if prev is not None:
+                    if (prev, node, neighbor_id) in restricted:
+                        continue
+                    if check:
+                        extra = trans.get((t_in, t_out), 0.0)
+                        if extra is None:
+                            continue
+                        new_dist += extra
+                if t_out in tsrc or neighbor_id in via:
+                    nxt = (node, neighbor_id)
+                else:
+                    nxt = (None, neighbor_id)
+                if nxt not in distances or new_dist < distances[nxt]:
+                    distances[nxt] = new_dist
+                    previous[nxt]  = state
+                    heapq.heappush(queue, (new_dist + h[neighbor_id] if h is not None else new_dist,
+                                           next(tie), nxt, t_out))
+
+        if goal is None:
+            return [], settled, math.inf
+        path = []
+        cur  = goal
+        while cur is not None:
+            path.append(cur[1])
+            cur = previous.get(cur)
+        path.reverse()
+        return path, settled, distances[goal]
+
     # ---------------------------------------------------------------------------
     # Helper: draw everything with CARLA’s debug API
     # ---------------------------------------------------------------------------
 
                     
     def generate_k_shortest_routes(self, start_loc, end_loc, k=3):
+        if self.cache is None:
+            return self._k_shortest_routes(start_loc, end_loc, k)
+        key = self._cache_key("ek_routes" if self.edge_based else "k_routes",
+                              self._get_node_id_from_location(start_loc),
+                              self._get_node_id_from_location(end_loc), k)
+        routes = self.cache.get_or_compute(
+            key, lambda: tuple(tuple(r) for r in
+                               self._k_shortest_routes(start_loc, end_loc, k)))
+        return [list(r) for r in routes]
+
+    def _k_shortest_routes(self, start_loc, end_loc, k):
+        """
+        Yen's k shortest paths.  Spurs leave every node of the last accepted
+        route; instead of copying the graph per spur, the edges earlier routes
+        take out of the same root and the root's own nodes are skipped during
+        the spur search.  Edge‑based, a spur continues the root's last edge
+        (no restricted or forbidden turn at the spur node) and candidates are
+        ranked by compute_route_cost, transition penalties included.
+        """
         start_id = self._get_node_id_from_location(start_loc)
         end_id = self._get_node_id_from_location(end_loc)
 
         base_route = self.find_shortest_route(start_loc, end_loc)
         if not base_route:
-            print("❌ No base route found.")
+            log.warning("no base route found", start=start_id, end=end_id)
             return []
 
-        routes = [base_route]
-        candidates = []
-
-        for i in range(1, k):
-            for j in range(len(base_route) - 1): 
-                spur_node = base_route[j]
-                root_path = base_route[:j + 1]
-
-                modified_graph = self._copy_graph_with_removed_edges(routes, root_path)
-
-                alt_route = self._dijkstra_custom(spur_node, end_id, modified_graph)
-                if not alt_route:
+        routes     = [base_route]
+        candidates = []                        # heap of (cost, route tuple)
+        seen       = {tuple(base_route)}
+        h          = self._heuristic(end_id, start_id)
+
+        while len(routes) < k:
+            last = routes[-1]
+            for j in range(len(last) - 1):
+                spur_node = last[j]
+                root_path = last[:j + 1]
+                banned_edges = {(r[j], r[j + 1]) for r in routes
+                                if len(r) > j + 1 and r[:j + 1] == root_path}
+                if self.edge_based:
+                    spur, settled, _ = self._line_search(
+                        spur_node, end_id, h, root_path[-2] if j else None,
+                        set(root_path[:-1]), banned_edges)
+                    if logger.ENABLED:
+                        incr("spur_settled_nodes", len(settled))
+                else:
+                    spur = self._spur_search(spur_node, end_id, set(root_path[:-1]),
+                                             banned_edges, h)
+                if not spur:
                     continue
 
-                full_route = root_path[:-1] + alt_route
-
-                if all(full_route != r[1] for r in candidates) and full_route not in routes:
-                    cost = self.compute_route_distance(full_route)
-                    candidates.append((cost, full_route))
+                full_route = tuple(root_path[:-1] + spur)
+                if full_route not in seen:
+                    seen.add(full_route)
+                    heapq.heappush(candidates,
+                                   (self.compute_route_cost(full_route), full_route))
 
             if not candidates:
                 break
-
-            candidates.sort(key=lambda x: x[0])
-            _, best_route = candidates.pop(0)
-            routes.append(best_route)
+            routes.append(list(heapq.heappop(candidates)[1]))
 
         return routes
 
+    def _spur_search(self, start_id, end_id, banned_nodes, banned_edges, h=None):
+        """Node search start → end avoiding `banned_nodes` / `banned_edges` (A* if h)."""
+        graph     = self.graph
+        queue     = [(0.0, start_id)]
+        distances = {start_id: 0.0}
+        previous  = {start_id: None}
+        settled   = set()
 
-    def _copy_graph_with_removed_edges(self, existing_routes, root_path):
-        from copy import deepcopy
-        modified_graph = deepcopy(self.graph.graph)
-
-        root_length = len(root_path)
-
-        for route in existing_routes:
-            if route[:root_length] == root_path and len(route) > root_length:
-                node = route[root_length - 1]
-                next_node = route[root_length]
-                if node in modified_graph:
-                    modified_graph[node] = [
-                        (n, d) for (n, d) in modified_graph[node] if n != next_node
-                    ]
-
-        return modified_graph
-
-    
-    def _dijkstra_custom(self, start_id, end_id, custom_graph):
-        visited = set()
-        min_heap = [(0.0, start_id, [])]  # (cost, current_node, path_so_far)
-
-        while min_heap:
-            cost, current, path = heapq.heappop(min_heap)
-
-            if current in visited:
+        while queue:
+            f, current = heapq.heappop(queue)
+            if f == math.inf:
+                break
+            if current in settled:
                 continue
-            visited.add(current)
-
-            new_path = path + [current]
-
+            settled.add(current)
             if current == end_id:
-                return new_path
-
-            for neighbor_id, distance in custom_graph.get(current, []):
-                if neighbor_id not in visited:
-                    heapq.heappush(min_heap, (cost + distance, neighbor_id, new_path))
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = previous[current]
+                if logger.ENABLED:
+                    incr("spur_settled_nodes", len(settled))
+                return path[::-1]
+
+            current_dist = distances[current]
+            for neighbor_id, weight in graph.get_neighbors(current):
+                if neighbor_id in banned_nodes or (current, neighbor_id) in banned_edges:
+                    continue
+                new_dist = current_dist + weight
+                if neighbor_id not in distances or new_dist < distances[neighbor_id]:
+                    distances[neighbor_id] = new_dist
+                    previous[neighbor_id]  = current
+                    heapq.heappush(queue, (new_dist + h[neighbor_id] if h is not None else new_dist,
+                                           neighbor_id))
 
-        return None  # If no route found
+        if logger.ENABLED:
+            incr("spur_settled_nodes", len(settled))
+        return []
 
     def _draw_route(self, node_path, world, color):
-        for i in range(len(node_path) - 1):
-            wp1 = self.graph.get_waypoint(node_path[i])
-            wp2 = self.graph.get_waypoint(node_path[i + 1])
-            if wp1 and wp2:
-                world.debug.draw_line(
-                    wp1.transform.location + carla.Location(z=0.3),
-                    wp2.transform.location + carla.Location(z=0.3),
-                    thickness=0.2,
-                    color=color,
-                    life_time=60.0
-                )
+        renderer = get_renderer(world)
+        if renderer.enabled:
+            wps = [self.graph.get_waypoint(n) for n in node_path]
+            renderer.polyline([wp for wp in wps if wp], color=color,
+                              thickness=0.2, life_time=60.0, z=0.3)
 
 
     def compute_route_distance(self, route):
@@ -217,11 +424,31 @@ class RouteGenerator:
                     break
         return total
 
+    def compute_route_cost(self, route):
+        """
+        What the search minimises: the distance plus, edge‑based, the
+        transition penalties between consecutive edge types (inf through a
+        restricted or forbidden turn).
+        """
+        total = self.compute_route_distance(route)
+        if not self.edge_based:
+            return total
+        types, trans = self.graph.edge_types, config.TRANSITION_PENALTIES
+        restricted   = self.graph.turn_restrictions
+        for a, b, c in zip(route, route[1:], route[2:]):
+            if a == c or (a, b, c) in restricted:
+                return math.inf
+            extra = trans.get((types.get((a, b), FORWARD), types.get((b, c), FORWARD)), 0.0)
+            if extra is None:
+                return math.inf
+            total += extra
+        return total
+
 # wrapper that lets you pass Locations directly
     def dijkstra_locations(self, start_loc: carla.Location, end_loc: carla.Location):
         s_id = self.graph.get_closest_node(start_loc)
         e_id = self.graph.get_closest_node(end_loc)
         if s_id is None or e_id is None:
-            print("⚠️  start or end not on any drivable waypoint")
+            log.warning("start or end not on any drivable waypoint")
             return []
         return self.dijkstra(s_id, e_id)
\ No newline at end of file
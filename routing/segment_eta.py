@@ -0,0 +1,201 @@
+# routing/segment_eta.py
+#
+# Per‑edge ETA engine: route time = Σ predicted edge times.
+#   • every graph edge is compiled once into a row of static attributes
+#     (free‑flow time, length, junction, lane change, U‑turn, left / right
+#     heading change)
+#   • edge time = w · φ(edge, context), linear in a few context interactions
+#     (rush hour, rain, cloud × free‑flow time).  Because the model is linear,
+#     a whole‑route label trains it directly: Σ_e φ(e) · w = route seconds
+#   • the per‑edge time array is cached for the current context bucket
+#     (hour, weather code) and recomputed only when the bucket changes
+#   • route_eta() is one gather + sum over the route's edge indices;
+#     time_graph() turns the array into search weights (seconds)
+#
+#   seg = SegmentETA(graph)
+#   seg.fit(samples)                       # [(route, (hour, weather), seconds)]
+#   eta = seg.route_eta(route, feature_context(world))
+
+import math
+import pickle
+
+import numpy as np
+
+from core.logger import get_logger
+from routing.graph_builder import CarlaGraph, JUNCTION_TURN, LANE_CHANGE, U_TURN, node_position
+
+log = get_logger("segment_eta")
+
+STATIC = ("free_flow_s", "length_m", "junction", "lane_change", "u_turn",
+          "right_deg", "left_deg", "bias")
+CONTEXT = ("rush_free_flow", "rain_free_flow", "cloud_free_flow")
+FEATURES = STATIC + CONTEXT
+RUSH_HOURS = frozenset((7, 8, 9, 16, 17, 18))
+
+
+def context_vector(context):
+    """(hour, weather_code) → multipliers for the free‑flow column."""
+    if context is None:
+        return np.zeros(len(CONTEXT))
+    hour, weather = context
+    return np.array([float(hour in RUSH_HOURS), float(weather == 2), float(weather == 1)])
+
+
+class SegmentETA:
+    def __init__(self, graph: CarlaGraph, ridge=1e-2):
+        self.graph  = graph
+        self.ridge  = ridge
+        self.coef   = None
+        self._bucket = None                 # context the cached times are for
+        self._times  = None
+        self._compile()
+
+    # ---------- compile -----------------------------------------------------
+
+    def _compile(self):
+        graph, rows, edge_id = self.graph, [], {}
+        for u, edges in graph.graph.items():
+            wu = graph.get_waypoint(u)
+            for v, _ in edges:
+                wv     = graph.get_waypoint(v)
+                length = math.dist(node_position(u), node_position(v))
+                limit  = getattr(wu, "speed_limit", 30.0) if wu is not None else 30.0
+                kind   = graph.edge_type(u, v)
+                dyaw   = 0.0
+                if wu is not None and wv is not None:
+                    dyaw = (wv.yaw - wu.yaw + 180.0) % 360.0 - 180.0
+                junction = kind == JUNCTION_TURN or bool(wu is not None and wu.is_junction)
+                edge_id[(u, v)] = len(rows)
+                rows.append((length / max(limit / 3.6, 1.0), length, float(junction),
+                             float(kind == LANE_CHANGE), float(kind == U_TURN),
+                             max(dyaw, 0.0), max(-dyaw, 0.0), 1.0))
+        self.edge_id = edge_id
+        self.static  = np.asarray(rows, dtype=float).reshape(-1, len(STATIC))
+        self._bucket = self._times = None
+        log.debug("edges compiled", edges=len(rows))
+
+    def _edge_indices(self, route):
+        eid = self.edge_id
+        try:
+            return np.fromiter((eid[(a, b)] for a, b in zip(route[:-1], route[1:])),
+                               dtype=np.int64, count=max(0, len(route) - 1))
+        except KeyError as e:
+            a, b = e.args[0]
+            raise ValueError(f"Route edge {a} → {b} is not in the compiled graph "
+                             f"(route from another graph or resolution?)") from None
+
+    def _design(self, indices, context):
+        """Σ φ over the given edges – one training / prediction row."""
+        static = self.static[indices].sum(axis=0)
+        return np.concatenate([static, static[0] * context_vector(context)])
+
+    # ---------- training ----------------------------------------------------
+
+    def fit(self, samples, segment_store=None):
+        """
+        samples: [(route node IDs, (hour, weather) or None, seconds)].
+        segment_store: driving_graph‑style {str((x, y)): {str((x, y)): {total_time,
+        samples}}} – each recorded edge adds one context‑free row.
+        """
+        X, y = [], []
+        for route, context, seconds in samples:
+            try:
+                X.append(self._design(self._edge_indices(route), context))
+            except ValueError:               # route uses an edge this graph doesn't have
+                continue
+            y.append(seconds)
+        if segment_store:
+            by_pos = {(round(u[0] / 10.0, 1), round(u[1] / 10.0, 1),
+                       round(v[0] / 10.0, 1), round(v[1] / 10.0, 1)): i
+                      for (u, v), i in self.edge_id.items()}
+            for a, succ in segment_store.items():
+                ax, ay = (float(t) for t in a.strip("()").split(","))
+                for b, seg in succ.items():
+                    bx, by = (float(t) for t in b.strip("()").split(","))
+                    i = by_pos.get((ax, ay, bx, by))
+                    if i is not None and seg.get("samples"):
+                        X.append(self._design(np.array([i]), None))
+                        y.append(seg["total_time"] / seg["samples"])
+        if not X:
+            raise ValueError("No training rows matched this graph's edges")
+        X, y = np.asarray(X), np.asarray(y)
+        # ridge least squares on column‑scaled features
+        scale = np.maximum(np.abs(X).max(axis=0), 1e-9)
+        Xs    = X / scale
+        A     = Xs.T @ Xs + self.ridge * np.eye(Xs.shape[1])
+        self.coef    = np.linalg.solve(A, Xs.T @ y) / scale
+        self._bucket = self._times = None
+        mae = float(np.mean(np.abs(X @ self.coef - y)))
+        log.info("segment eta fitted", rows=len(y), train_mae=round(mae, 2))
+        return mae
+
+    @classmethod
+    def free_flow(cls, graph, junction_s=4.0, lane_change_s=2.0, u_turn_s=8.0):
+        """Untrained prior: free‑flow time plus fixed manoeuvre delays."""
+        model = cls(graph)
+        coef  = dict.fromkeys(FEATURES, 0.0)
+        coef.update(free_flow_s=1.0, junction=junction_s, lane_change=lane_change_s,
+                    u_turn=u_turn_s)
+        model.coef = np.array([coef[name] for name in FEATURES])
+        return model
+
+    # ---------- prediction --------------------------------------------------
+
+    def edge_times(self, context=None):
+        """Seconds per compiled edge for this context bucket (cached)."""
+        if self.coef is None:
+            raise RuntimeError("SegmentETA must be fitted or loaded before predicting.")
+        bucket = tuple(context) if context is not None else None
+        if bucket != self._bucket or self._times is None:
+            n   = len(STATIC)
+            ctx = context_vector(context) @ self.coef[n:]
+            times = self.static @ self.coef[:n] + self.static[:, 0] * ctx
+            self._times  = np.maximum(times, 1e-3)      # Dijkstra needs positive weights
+            self._bucket = bucket
+        return self._times
+
+    def route_eta(self, route, context=None):
+        if len(route) < 2:
+            return 0.0
+        return float(self.edge_times(context)[self._edge_indices(route)].sum())
+
+    def routes_eta(self, routes, context=None):
+        """
+        ETA for many candidate routes with a single gather + bincount; routes
+        of fewer than 2 nodes cost 0.0, as in route_eta().
+        """
+        times   = self.edge_times(context)
+        parts   = [self._edge_indices(r) for r in routes]
+        owner   = np.repeat(np.arange(len(parts)), [len(p) for p in parts])
+        edges   = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+        sums    = np.bincount(owner, weights=times[edges], minlength=len(parts))
+        return sums.tolist()
+
+    def time_graph(self, context=None):
+        """Same topology with predicted seconds as weights (for fastest‑route search)."""
+        times = self.edge_times(context)
+        adjacency = {u: [(v, float(times[self.edge_id[(u, v)]])) for v, _ in edges]
+                     for u, edges in self.graph.graph.items()}
+        view = CarlaGraph.from_adjacency(adjacency, world=self.graph.world)
+        view.resolution        = self.graph.resolution
+        view.node_lookup       = self.graph.node_lookup
+        view.edge_types        = self.graph.edge_types
+        view.turn_restrictions = self.graph.turn_restrictions
+        view.weights_version   = hash(("seconds", self._bucket, self.graph.weights_version))
+        return view
+
+    # ---------- persistence -------------------------------------------------
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump({"features": FEATURES, "coef": self.coef, "ridge": self.ridge}, f)
+
+    @classmethod
+    def load(cls, path, graph):
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if tuple(data["features"]) != FEATURES:
+            raise ValueError(f"Segment ETA model in {path} was trained on other features")
+        model = cls(graph, ridge=data["ridge"])
+        model.coef = data["coef"]
+        return model
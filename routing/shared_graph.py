@@ -0,0 +1,228 @@
+# routing/shared_graph.py
+#
+# Flat, read‑only form of a CarlaGraph + per‑segment ETA model that many
+# processes can map at once.
+#   • compile_shared() writes plain arrays (.npy) into one directory:
+#       node_ids   N×4 int64   original (x*10, y*10, road, lane) node IDs
+#       xs, ys     N float64   positions for the spatial index
+#       indptr / indices / length        forward CSR, edges in node order
+#       rev_indptr / rev_src / rev_edge  incoming edges (for backward search)
+#       cell_start / cell_nodes          uniform grid spatial index
+#       static     E×8 float64 SegmentETA edge attributes, coef the weights
+#   • the directory is written under a temp name and renamed into place, so
+#     workers never see a half‑written graph
+#   • SharedGraph(path) opens every array with mmap_mode="r": all workers hit
+#     the same page‑cache pages (in /dev/shm: RAM, no disk) and, unlike a
+#     forked dict‑of‑tuples graph, reading never dirties them
+#   • searches walk memoryviews of the arrays – Python ints / floats come out
+#     without building per‑process copies of the graph
+#   • node‑based search: turn restrictions / transition penalties of the
+#     edge‑based RouteGenerator are not modelled here (as in headless_sim)
+#
+#   path   = compile_shared(graph, "grid6", model=seg_eta)
+#   shared = SharedGraph(path)
+#   etas   = shared.times_to(shared.nearest_node(x, y), taxi_nodes, context)
+
+import heapq
+import json
+import math
+import os
+import shutil
+import time
+
+import numpy as np
+
+import config
+from core.logger import get_logger
+from routing.graph_builder import node_position
+from routing.segment_eta import FEATURES, STATIC, SegmentETA, context_vector
+
+log = get_logger("shared_graph")
+
+SHARED_FORMAT = 1
+_ARRAYS = ("node_ids", "xs", "ys", "indptr", "indices", "length", "rev_indptr",
+           "rev_src", "rev_edge", "cell_start", "cell_nodes", "static", "coef")
+
+
+def _spatial_index(xs, ys, cell):
+    x0, y0 = float(xs.min()), float(ys.min())
+    nx = int((xs.max() - x0) // cell) + 1
+    ny = int((ys.max() - y0) // cell) + 1
+    cells = ((xs - x0) // cell).astype(np.int64) * ny + ((ys - y0) // cell).astype(np.int64)
+    order = np.argsort(cells, kind="stable")
+    start = np.searchsorted(cells[order], np.arange(nx * ny + 1)).astype(np.int32)
+    return order.astype(np.int32), start, {"x0": x0, "y0": y0, "nx": nx, "ny": ny, "cell": cell}
+
+
+def compile_shared(graph, name, model=None, root=None, cell=10.0):
+    """Write `graph` (+ SegmentETA `model`, free‑flow if None) under root/name."""
+    t0    = time.perf_counter()
+    root  = root or config.SHARED_GRAPH_DIR
+    model = model or SegmentETA.free_flow(graph)
+    nodes = sorted(set(graph.node_lookup) | set(graph.graph))
+    index = {nid: i for i, nid in enumerate(nodes)}
+
+    indptr, indices, length, rows = [0], [], [], []
+    for nid in nodes:
+        for v, cost in graph.graph.get(nid, ()):
+            indices.append(index[v])
+            length.append(cost)
+            rows.append(model.edge_id[(nid, v)])
+        indptr.append(len(indices))
+    indptr  = np.asarray(indptr, dtype=np.int32)
+    indices = np.asarray(indices, dtype=np.int32)
+    src     = np.repeat(np.arange(len(nodes), dtype=np.int32), np.diff(indptr))
+    by_dst  = np.argsort(indices, kind="stable")
+
+    pos = np.array([node_position(nid)[:2] for nid in nodes], dtype=float).reshape(-1, 2)
+    cell_nodes, cell_start, grid = _spatial_index(pos[:, 0], pos[:, 1], cell)
+    arrays = {
+        "node_ids":   np.asarray(nodes, dtype=np.int64).reshape(-1, 4),
+        "xs":         np.ascontiguousarray(pos[:, 0]),
+        "ys":         np.ascontiguousarray(pos[:, 1]),
+        "indptr":     indptr,
+        "indices":    indices,
+        "length":     np.asarray(length, dtype=float),
+        "rev_indptr": np.searchsorted(indices[by_dst], np.arange(len(nodes) + 1)).astype(np.int32),
+        "rev_src":    src[by_dst],
+        "rev_edge":   by_dst.astype(np.int32),
+        "cell_start": cell_start,
+        "cell_nodes": cell_nodes,
+        "static":     np.ascontiguousarray(model.static[np.asarray(rows, dtype=np.int64)]
+                                           .reshape(-1, len(STATIC))),
+        "coef":       np.asarray(model.coef, dtype=float),
+    }
+
+    final = os.path.join(root, name)
+    tmp   = f"{final}.tmp{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    for key, arr in arrays.items():
+        np.save(os.path.join(tmp, f"{key}.npy"), arr)
+    manifest = dict(grid, format=SHARED_FORMAT, features=list(FEATURES), nodes=len(nodes),
+                    edges=len(indices), resolution=graph.resolution,
+                    weights_version=graph.weights_version)
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    if os.path.exists(final):
+        shutil.rmtree(final)
+    os.replace(tmp, final)
+    nbytes = sum(a.nbytes for a in arrays.values())
+    log.info("shared graph compiled", path=final, nodes=len(nodes), edges=len(indices),
+             mb=round(nbytes / 2**20, 2), seconds=round(time.perf_counter() - t0, 3))
+    return final
+
+
+class SharedGraph:
+    """Zero‑copy view of a compile_shared() directory."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.meta = json.load(f)
+        if self.meta["format"] != SHARED_FORMAT or tuple(self.meta["features"]) != FEATURES:
+            raise ValueError(f"Shared graph in {path} has an incompatible layout")
+        self.path = path
+        for key in _ARRAYS:
+            setattr(self, key, np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r"))
+        # memoryviews: indexing yields plain Python numbers, no numpy scalars
+        self._indptr, self._indices = memoryview(self.indptr), memoryview(self.indices)
+        self._rptr, self._rsrc, self._redge = (memoryview(self.rev_indptr),
+                                               memoryview(self.rev_src), memoryview(self.rev_edge))
+        self._xs, self._ys = memoryview(self.xs), memoryview(self.ys)
+        self._cstart, self._cnodes = memoryview(self.cell_start), memoryview(self.cell_nodes)
+        self._bucket = self._times = None
+
+    def __len__(self):
+        return self.meta["nodes"]
+
+    def node_id(self, i):
+        return tuple(int(v) for v in self.node_ids[i])
+
+    # ---------- spatial index ---------------------------------------------------
+
+    def nearest_node(self, x, y):
+        m = self.meta
+        cell, nx, ny = m["cell"], m["nx"], m["ny"]
+        cx = min(max(int((x - m["x0"]) // cell), 0), nx - 1)
+        cy = min(max(int((y - m["y0"]) // cell), 0), ny - 1)
+        best, best_d = None, math.inf
+        xs, ys, start, members = self._xs, self._ys, self._cstart, self._cnodes
+        for r in range(max(nx, ny)):
+            for i in range(cx - r, cx + r + 1):
+                if not 0 <= i < nx:
+                    continue
+                for j in range(cy - r, cy + r + 1):
+                    if not 0 <= j < ny or (abs(i - cx) != r and abs(j - cy) != r):
+                        continue
+                    c = i * ny + j
+                    for k in range(start[c], start[c + 1]):
+                        n = members[k]
+                        d = (xs[n] - x) ** 2 + (ys[n] - y) ** 2
+                        if d < best_d:
+                            best, best_d = n, d
+            if best is not None and math.sqrt(best_d) <= r * cell:
+                break
+        return best
+
+    # ---------- model -----------------------------------------------------------
+
+    def edge_times(self, context=None):
+        """Seconds per edge for this context bucket (the only per‑process array)."""
+        bucket = tuple(context) if context is not None else None
+        if bucket != self._bucket or self._times is None:
+            n     = len(STATIC)
+            ctx   = context_vector(context) @ self.coef[n:]
+            times = self.static @ self.coef[:n] + self.static[:, 0] * ctx
+            self._times  = memoryview(np.maximum(times, 1e-3))
+            self._bucket = bucket
+        return self._times
+
+    # ---------- search ----------------------------------------------------------
+
+    def times_to(self, target, sources, context=None):
+        """Backward Dijkstra from `target`: {source index: seconds} for reachable sources."""
+        times   = self.edge_times(context)
+        rptr, rsrc, redge = self._rptr, self._rsrc, self._redge
+        pending = set(sources)
+        dist    = {target: 0.0}
+        heap    = [(0.0, target)]
+        done    = set()
+        found   = {}
+        while heap and pending:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            done.add(u)
+            if u in pending:
+                pending.discard(u)
+                found[u] = d
+            for k in range(rptr[u], rptr[u + 1]):
+                v  = rsrc[k]
+                nd = d + times[redge[k]]
+                if nd < dist.get(v, math.inf):
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return found
+
+    def shortest_path(self, source, target, context=None):
+        """Fastest node‑index path source → target ([] if unreachable)."""
+        times = self.edge_times(context)
+        ptr, idx = self._indptr, self._indices
+        dist, prev = {source: 0.0}, {source: None}
+        heap, done = [(0.0, source)], set()
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u == target:
+                path = []
+                while u is not None:
+                    path.append(u)
+                    u = prev[u]
+                return path[::-1]
+            if u in done:
+                continue
+            done.add(u)
+            for k in range(ptr[u], ptr[u + 1]):
+                v, nd = idx[k], d + times[k]
+                if nd < dist.get(v, math.inf):
+                    dist[v], prev[v] = nd, u
+                    heapq.heappush(heap, (nd, v))
+        return []
@@ -0,0 +1,56 @@
+# routing/snapshot.py
+#
+# Save / load a built CarlaGraph without the simulator.
+# Nodes are stored as NodeRecord rows (routing.node_record) – the same
+# records a freshly built graph holds – so a loaded graph is
+# indistinguishable from a built one.  Format 1/2 rows (no section_id, s,
+# lane_type) still load.  Format 4 adds the ALT landmark tables
+# (routing.landmarks) when the graph has them.
+
+import pickle
+
+from routing.graph_builder import CarlaGraph
+from routing.landmarks import Landmarks
+from routing.node_record import NodeRecord
+
+SNAPSHOT_FORMAT = 4          # 2: + edge types, turn restrictions, directed flag
+                             # 3: node rows carry section_id, s, lane_type
+                             # 4: + landmark distance tables
+
+
+def save_snapshot(graph, path):
+    data = {
+        "format":     SNAPSHOT_FORMAT,
+        "map":        getattr(graph.map, "name", None),
+        "resolution": graph.resolution,
+        "graph":      {nid: list(edges) for nid, edges in graph.graph.items()},
+        "nodes":      {nid: rec.row() for nid, rec in graph.node_lookup.items()},
+        "edge_types": dict(graph.edge_types),
+        "turn_restrictions": sorted(graph.turn_restrictions),
+        "directed":   graph.directed,
+        "landmarks":  _landmark_state(graph),
+    }
+    with open(path, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_snapshot(path, world=None):
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    if data.get("format") not in (1, 2, 3, SNAPSHOT_FORMAT):
+        raise ValueError(f"Unsupported graph snapshot format in {path}")
+    graph = CarlaGraph.from_adjacency(data["graph"], world=world)
+    graph.resolution  = data["resolution"]
+    graph.map_name    = data["map"]
+    graph.node_lookup = {nid: NodeRecord(*row) for nid, row in data["nodes"].items()}
+    graph.edge_types  = data.get("edge_types", {})
+    graph.turn_restrictions = set(data.get("turn_restrictions", ()))
+    graph.directed    = data.get("directed", False)
+    if data.get("landmarks"):
+        graph.landmarks = Landmarks.from_state(data["landmarks"], version=graph.metric_version)
+    return graph
+
+
+def _landmark_state(graph):
+    lm = getattr(graph, "landmarks", None)
+    return lm.state() if lm is not None and lm.valid_for(graph) else None
@@ -1,74 +1,107 @@
 # run_simulation.py
 
+import config
+
 from carla_interface.scenario_controller import initialize_scenario
 from carla_interface.taxi_agent import TaxiAgent
-from routing.graph_builder import CarlaGraph
-from routing.route_generator import RouteGenerator
+from routing.graph_registry import default_registry
+from routing.route_gen import RouteGenerator
 from routing.evaluation import log_evaluation
+from routing.extract_features import extract_features
 from utils.helpers import load_driving_graph, save_driving_graph
 from core.request_manager import RequestManager
 from core.fleet_manager import FleetManager
-from core.ai_router import AIRouter
 from core.dispatcher import Dispatcher
+from core.trace import TraceRecorder, decision_policy, graph_hash
 
-def run_single_simulation():
+def run_single_simulation(map_name="Town04", resolution=None, registry=None,
+                          seed=None, trace_path=None):
+    """trace_path: record this run for core.replay (seeded, so it can be re‑run)."""
     import carla
     import random
 
+    if seed is not None:
+        random.seed(seed)
+
     # === SETUP ===
     client = carla.Client("localhost", 2000)
     client.set_timeout(10.0)
-    world, tm, vehicle = initialize_scenario(client, map_name="Town04")
+    world, tm, vehicle = initialize_scenario(client, map_name=map_name)
 
     spawn_points = world.get_map().get_spawn_points()
     request_manager = RequestManager(spawn_points)
 
-    graph = CarlaGraph(world)
-    graph.build_graph()
+    # snapshot lookup per map; only the first run on a new map builds
+    registry   = registry or default_registry()
+    resolution = resolution or config.GRAPH_RESOLUTION
+    graph = registry.get(map_name, resolution, world=world, workers=8)
 
     route_gen = RouteGenerator(graph)
     driving_graph = load_driving_graph("data/driving_graph.json")
 
-    ai_router = AIRouter(graph, world, driving_graph)
-    fleet = FleetManager(vehicle)
-    dispatcher = Dispatcher(fleet, ai_router)
+    fleet = FleetManager([vehicle])
+    dispatcher = Dispatcher(fleet, graph, route_gen, world, driving_graph)
+    policy = decision_policy()
+
+    recorder = None
+    if trace_path:
+        lights = [tuple(getattr(l.get_transform().location, a) for a in "xyz")
+                  for l in world.get_actors().filter("traffic.traffic_light")]
+        recorder = TraceRecorder(trace_path, {
+            "map": map_name, "resolution": resolution, "graph_hash": graph_hash(graph),
+            "seeds": {"requests": seed}, "ego_id": vehicle.id, "taxi_ids": list(fleet.taxis),
+            "traffic_lights": lights, "policy": policy}).attach(world, fleet, ego_id=vehicle.id)
+
+    try:
+        _ride(world, vehicle, tm, graph, route_gen, driving_graph, dispatcher, policy,
+              request_manager, recorder)
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+
+def _ride(world, vehicle, tm, graph, route_gen, driving_graph, dispatcher, policy,
+          request_manager, recorder):
+    import datetime
 
     # === RIDE REQUEST ===
     pickup, dropoff = request_manager.generate_request()
-    ride_request = type("RideRequest", (), {"pickup": pickup, "dropoff": dropoff})()
-
-    # === DISPATCH ===
-    taxi = dispatcher.dispatch(ride_request)
+    ride_request = type("RideRequest", (), {"id": 1, "pickup": pickup, "dropoff": dropoff})()
+    now = world.get_snapshot().timestamp.elapsed_seconds
+    if recorder:
+        recorder.request(now, 1, datetime.datetime.now().hour, pickup, dropoff)
+
+    # === DISPATCH + ROUTE (best predicted ETA of the k shortest) ===
+    taxi, pickup_eta, selected_route, predicted_eta = dispatcher.plan_ride(
+        ride_request, policy["k"], policy["selector"])
+    if recorder:
+        recorder.decision(now, 1, taxi.id if taxi else None, pickup_eta, selected_route, predicted_eta)
     if not taxi:
         print("No taxi dispatched.")
         return
-
-    # === ROUTES ===
-    routes = route_gen.generate_k_shortest_routes(pickup, dropoff, k=3)
-    if not routes:
+    if not selected_route:
         print("No valid routes found.")
         return
-
-    best_idx, etas = ai_router.predict_best_route(routes)
-    selected_route = routes[best_idx]
-    baseline_route = routes[0]
+    baseline_route = route_gen.find_shortest_route(pickup, dropoff)
 
     # === DRIVE ===
     agent = TaxiAgent(world, vehicle, tm)
     actual_time = agent.drive_and_log_segments(
-        [graph.get_waypoint(n) for n in selected_route],
+        route_gen.route_waypoints(selected_route, spacing=config.FOLLOW_SPACING),
         driving_graph
     )
-    baseline_time = agent.drive_route([graph.get_waypoint(n) for n in baseline_route])
+    baseline_time = agent.drive_route(route_gen.route_waypoints(baseline_route,
+                                                            spacing=config.FOLLOW_SPACING))
 
     # === LOG ===
     log_evaluation(
         ride_id=1,
-        predicted_eta=etas[best_idx],
+        predicted_eta=predicted_eta,
         actual_time=actual_time,
         baseline_time=baseline_time,
         selected_route=selected_route,
-        baseline_route=baseline_route
+        baseline_route=baseline_route,
+        features=extract_features(selected_route, graph, world, driving_graph)
     )
 
     save_driving_graph(driving_graph, "data/driving_graph.json")
@@ -0,0 +1,382 @@
+# utils/fake_map.py
+#
+# Minimal stand‑in for carla.World / carla.Map / carla.Waypoint so graph
+# building, routing and benchmarks run without a simulator.
+# Only the calls this repo makes are implemented.  `rpc_latency` sleeps on the
+# calls that are round‑trips in the real client (next, lateral lanes,
+# get_waypoint) so threading effects show up as they would against CARLA.
+
+import math
+import threading
+import time
+
+try:
+    import carla
+    DRIVING = carla.LaneType.Driving
+except ImportError:
+    carla   = None
+    DRIVING = "Driving"
+
+
+class FakeLocation:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = x, y, z
+
+    def distance(self, other):
+        return math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2 +
+                         (self.z - other.z) ** 2)
+
+    def __add__(self, other):
+        return FakeLocation(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        return FakeLocation(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __repr__(self):
+        return f"FakeLocation(x={self.x:.2f}, y={self.y:.2f}, z={self.z:.2f})"
+
+
+class FakeRotation:
+    __slots__ = ("pitch", "yaw", "roll")
+
+    def __init__(self, pitch=0.0, yaw=0.0, roll=0.0):
+        self.pitch, self.yaw, self.roll = pitch, yaw, roll
+
+
+class FakeTransform:
+    __slots__ = ("location", "rotation")
+
+    def __init__(self, location, rotation):
+        self.location, self.rotation = location, rotation
+
+    def get_forward_vector(self):
+        yaw = math.radians(self.rotation.yaw)
+        return FakeLocation(math.cos(yaw), math.sin(yaw), 0.0)
+
+
+class FakeVehicleControl:
+    __slots__ = ("throttle", "steer", "brake")
+
+    def __init__(self, throttle=0.0, steer=0.0, brake=0.0):
+        self.throttle, self.steer, self.brake = throttle, steer, brake
+
+
+# ---------------------------------------------------------------------------
+# Lanes & waypoints
+# ---------------------------------------------------------------------------
+
+class FakeLane:
+    """One directed lane: polyline in driving direction + connectivity."""
+
+    def __init__(self, road_id, lane_id, points, is_junction=False, speed_limit=30.0):
+        self.road_id     = road_id
+        self.lane_id     = lane_id
+        self.points      = points               # [(x, y, z)] in driving order
+        self.is_junction = is_junction
+        self.speed_limit = speed_limit
+        self.successors  = []
+        self.left        = None                 # (lane, same_direction)
+        self.right       = None
+        self.cum         = [0.0]
+        for a, b in zip(points[:-1], points[1:]):
+            self.cum.append(self.cum[-1] + math.dist(a, b))
+        self.length = self.cum[-1]
+
+    def pose(self, s):
+        s = min(max(s, 0.0), self.length)
+        i = 1
+        while i < len(self.cum) - 1 and self.cum[i] < s:
+            i += 1
+        a, b   = self.points[i - 1], self.points[i]
+        seg    = self.cum[i] - self.cum[i - 1]
+        t      = (s - self.cum[i - 1]) / seg if seg else 0.0
+        x, y, z = (a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1]),
+                   a[2] + t * (b[2] - a[2]))
+        yaw = math.degrees(math.atan2(b[1] - a[1], b[0] - a[0]))
+        return x, y, z, yaw
+
+
+class FakeWaypoint:
+    def __init__(self, fmap, lane, s):
+        self._map        = fmap
+        self._lane       = lane
+        self.s           = s
+        self.road_id     = lane.road_id
+        self.lane_id     = lane.lane_id
+        self.section_id  = 0
+        self.is_junction = lane.is_junction
+        self.lane_type   = DRIVING
+        self.lane_width  = 3.5
+        self.speed_limit = lane.speed_limit
+        self.id          = hash((lane.road_id, lane.lane_id, round(s, 3)))
+        self._pose       = lane.pose(s)
+
+    @property
+    def transform(self):
+        # like carla.Waypoint: every access builds a new Transform / Location
+        x, y, z, yaw = self._pose
+        return FakeTransform(FakeLocation(x, y, z), FakeRotation(yaw=yaw))
+
+    def next(self, distance):
+        self._map._rpc()
+        return self._advance(self._lane, self.s + distance)
+
+    def _advance(self, lane, s):
+        if s < lane.length - 1e-6 or (not lane.successors and s <= lane.length + 1e-6):
+            return [FakeWaypoint(self._map, lane, s)]
+        out = []
+        for succ in lane.successors:
+            out.extend(self._advance(succ, s - lane.length))
+        return out
+
+    def previous(self, distance):
+        self._map._rpc()
+        return [FakeWaypoint(self._map, self._lane, max(0.0, self.s - distance))]
+
+    def _side(self, side):
+        self._map._rpc()
+        if side is None:
+            return None
+        lane, same_dir = side
+        s = self.s if same_dir else lane.length - self.s
+        return FakeWaypoint(self._map, lane, min(s, lane.length))
+
+    def get_left_lane(self):
+        return self._side(self._lane.left)
+
+    def get_right_lane(self):
+        return self._side(self._lane.right)
+
+
+# ---------------------------------------------------------------------------
+# Map / world
+# ---------------------------------------------------------------------------
+
+class FakeMap:
+    def __init__(self, lanes, name="FakeTown", rpc_latency=0.0, fail_after_calls=None):
+        self.lanes            = lanes
+        self.name             = name
+        self.rpc_latency      = rpc_latency
+        self.fail_after_calls = fail_after_calls   # simulate a dropped connection
+        self.rpc_calls        = 0
+        self._lock            = threading.Lock()
+
+    def _rpc(self):
+        with self._lock:
+            self.rpc_calls += 1
+            calls = self.rpc_calls
+        if self.fail_after_calls is not None and calls > self.fail_after_calls:
+            raise RuntimeError("fake RPC timeout")
+        if self.rpc_latency:
+            time.sleep(self.rpc_latency)
+
+    def generate_waypoints(self, distance):
+        wps = []
+        for lane in self.lanes:
+            s = 0.0
+            while s < lane.length:
+                wps.append(FakeWaypoint(self, lane, s))
+                s += distance
+        return wps
+
+    def get_topology(self):
+        return [(FakeWaypoint(self, l, 0.0), FakeWaypoint(self, l, l.length))
+                for l in self.lanes]
+
+    def get_waypoint(self, location, project_to_road=True, lane_type=None):
+        self._rpc()
+        best, best_d = None, math.inf
+        for lane in self.lanes:
+            for i, (x, y, _) in enumerate(lane.points):
+                d = (x - location.x) ** 2 + (y - location.y) ** 2
+                if d < best_d:
+                    best, best_d = (lane, lane.cum[i]), d
+        return FakeWaypoint(self, *best) if best else None
+
+    def get_waypoint_xodr(self, road_id, lane_id, s):
+        self._rpc()
+        for lane in self.lanes:
+            if lane.road_id == road_id and lane.lane_id == lane_id:
+                return FakeWaypoint(self, lane, min(max(s, 0.0), lane.length))
+        return None
+
+    def get_spawn_points(self):
+        return [FakeTransform(FakeLocation(*l.pose(0.0)[:3]), FakeRotation(yaw=l.pose(0.0)[3]))
+                for l in self.lanes if not l.is_junction]
+
+
+class _FakeDebug:
+    def __init__(self):
+        self.calls = 0
+
+    def draw_string(self, *args, **kwargs):
+        self.calls += 1
+
+    def draw_line(self, *args, **kwargs):
+        self.calls += 1
+
+    def draw_point(self, *args, **kwargs):
+        self.calls += 1
+
+
+class _FakeWeather:
+    precipitation = 0.0
+    cloudiness    = 10.0
+
+
+class _FakeActors(list):
+    def filter(self, pattern):
+        return _FakeActors()
+
+
+class _FakeActor:
+    def __init__(self, transform):
+        self._transform = transform
+
+    def get_transform(self):
+        return self._transform
+
+    def set_transform(self, transform):
+        self._transform = transform
+
+
+class FakeWorld:
+    def __init__(self, fmap):
+        self._map      = fmap
+        self.debug     = _FakeDebug()
+        self.spectator = _FakeActor(FakeTransform(FakeLocation(), FakeRotation()))
+
+    def get_spectator(self):
+        return self.spectator
+
+    def get_map(self):
+        return self._map
+
+    def get_weather(self):
+        return _FakeWeather()
+
+    def get_actors(self):
+        return _FakeActors()
+
+
+# ---------------------------------------------------------------------------
+# Town generators
+# ---------------------------------------------------------------------------
+
+def _offset(points, normal, d):
+    return [(x + normal[0] * d, y + normal[1] * d, z) for x, y, z in points]
+
+
+def _bezier(p0, p1, p2, steps=6):
+    pts = []
+    for i in range(steps + 1):
+        t = i / steps
+        pts.append(tuple((1 - t) ** 2 * a + 2 * (1 - t) * t * b + t ** 2 * c
+                         for a, b, c in zip(p0, p1, p2)))
+    return pts
+
+
+def _two_way_road(road_id, a, b, lanes, lane_width, speed_limit):
+    """Lanes −1…−n run a→b, +1…+n run b→a (CARLA sign convention)."""
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    norm   = math.hypot(dx, dy)
+    right  = (-dy / norm, dx / norm)
+    line   = [(a[0], a[1], 0.0), (b[0], b[1], 0.0)]
+    fwd = [FakeLane(road_id, -k, _offset(line, right, (k - 0.5) * lane_width),
+                    speed_limit=speed_limit) for k in range(1, lanes + 1)]
+    bwd = [FakeLane(road_id, k, _offset(line[::-1], right, -(k - 0.5) * lane_width),
+                    speed_limit=speed_limit) for k in range(1, lanes + 1)]
+    for group, other in ((fwd, bwd), (bwd, fwd)):
+        for i, lane in enumerate(group):
+            lane.left  = (group[i - 1], True) if i > 0 else (other[0], False)
+            lane.right = (group[i + 1], True) if i + 1 < len(group) else None
+    return fwd, bwd
+
+
+def _connect_junctions(lanes, ends, next_road_id):
+    """Add junction connector lanes between every incoming/outgoing lane pair."""
+    incoming, outgoing = {}, {}
+    for lane, (start_node, end_node) in ends.items():
+        incoming.setdefault(end_node, []).append(lane)
+        outgoing.setdefault(start_node, []).append(lane)
+
+    connectors = []
+    for node in sorted(incoming):
+        for lin in incoming[node]:
+            for lout in outgoing.get(node, []):
+                if lout.road_id == lin.road_id or abs(lout.lane_id) != abs(lin.lane_id):
+                    continue
+                conn = FakeLane(next_road_id, -1,
+                                _bezier(lin.points[-1], (node[0], node[1], 0.0), lout.points[0]),
+                                is_junction=True, speed_limit=lin.speed_limit)
+                next_road_id += 1
+                conn.successors.append(lout)
+                lin.successors.append(conn)
+                connectors.append(conn)
+    return lanes + connectors
+
+
+def _town_from_roads(roads, lanes, lane_width, speed_limit, junction_margin):
+    """roads: [(node_a, node_b)] or [(node_a, node_b, lanes, speed_limit)]."""
+    all_lanes, ends = [], {}
+    for road_id, road in enumerate(roads, start=1):
+        na, nb = road[0], road[1]
+        n_lanes = road[2] if len(road) > 2 else lanes
+        limit   = road[3] if len(road) > 3 else speed_limit
+        dx, dy = nb[0] - na[0], nb[1] - na[1]
+        norm   = math.hypot(dx, dy)
+        ux, uy = dx / norm, dy / norm
+        a = (na[0] + ux * junction_margin, na[1] + uy * junction_margin)
+        b = (nb[0] - ux * junction_margin, nb[1] - uy * junction_margin)
+        fwd, bwd = _two_way_road(road_id, a, b, n_lanes, lane_width, limit)
+        for lane in fwd:
+            ends[lane] = (na, nb)
+        for lane in bwd:
+            ends[lane] = (nb, na)
+        all_lanes.extend(fwd + bwd)
+    return _connect_junctions(all_lanes, ends, next_road_id=len(roads) + 1)
+
+
+def grid_town(rows=6, cols=6, block=80.0, lanes=1, lane_width=3.5,
+              speed_limit=30.0, junction_margin=8.0, **map_kwargs):
+    """Manhattan grid of two‑way roads with connector lanes in every junction."""
+    roads = []
+    for r in range(rows):
+        for c in range(cols):
+            here = (c * block, r * block)
+            if c + 1 < cols:
+                roads.append((here, ((c + 1) * block, r * block)))
+            if r + 1 < rows:
+                roads.append((here, (c * block, (r + 1) * block)))
+    lanes_ = _town_from_roads(roads, lanes, lane_width, speed_limit, junction_margin)
+    return FakeWorld(FakeMap(lanes_, name=f"FakeGrid{rows}x{cols}", **map_kwargs))
+
+
+def ring_town(segments=24, radius=300.0, spokes=4, lanes=2, lane_width=3.5,
+              speed_limit=50.0, junction_margin=8.0, **map_kwargs):
+    """Ring road (polygon of `segments` sides) with radial spokes to a hub."""
+    hub  = (0.0, 0.0)
+    ring = [(radius * math.cos(2 * math.pi * i / segments),
+             radius * math.sin(2 * math.pi * i / segments)) for i in range(segments)]
+    roads = [(ring[i], ring[(i + 1) % segments]) for i in range(segments)]
+    step  = max(1, segments // max(spokes, 1))
+    roads += [(hub, ring[i], 1, 30.0) for i in range(0, segments, step)][:spokes]
+    lanes_ = _town_from_roads(roads, lanes, lane_width, speed_limit, junction_margin)
+    return FakeWorld(FakeMap(lanes_, name=f"FakeRing{segments}", **map_kwargs))
+
+
+def highway_town(length=3000.0, lanes=3, exits=5, ramp_length=150.0,
+                 lane_width=3.5, speed_limit=90.0, junction_margin=10.0, **map_kwargs):
+    """Straight multi‑lane highway with single‑lane ramps at `exits` interchanges."""
+    nodes = [(length * i / (exits + 1), 0.0) for i in range(exits + 2)]
+    roads = [(nodes[i], nodes[i + 1], lanes, speed_limit) for i in range(len(nodes) - 1)]
+    for x, y in nodes[1:-1]:
+        roads.append(((x, y), (x, y + ramp_length), 1, 40.0))
+        roads.append(((x, y), (x, y - ramp_length), 1, 40.0))
+    lanes_ = _town_from_roads(roads, lanes, lane_width, speed_limit, junction_margin)
+    return FakeWorld(FakeMap(lanes_, name=f"FakeHighway{lanes}x{exits}", **map_kwargs))
+
+
+TOWNS = {"grid": grid_town, "ring": ring_town, "highway": highway_town}
@@ -12,3 +12,18 @@ def load_driving_graph(path):
 def save_driving_graph(graph, path):
     with open(path, 'w') as f:
         json.dump(graph, f, indent=2)
+
+def to_xy(point):
+    """(x, y) of a carla.Location / Transform / Waypoint, a NodeRecord or a tuple."""
+    return to_xyz(point)[:2]
+
+def to_xyz(point):
+    """(x, y, z) of the same inputs as to_xy (z = 0 for 2‑tuples)."""
+    if not hasattr(point, "x"):
+        if hasattr(point, "transform"):
+            point = point.transform.location
+        elif hasattr(point, "location"):
+            point = point.location
+    if hasattr(point, "x"):
+        return point.x, point.y, point.z
+    return point[0], point[1], point[2] if len(point) > 2 else 0.0